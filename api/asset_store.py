@@ -0,0 +1,120 @@
+"""
+Asset Store por Job (imagens em memória)
+=========================================
+Antes, cada imagem fazia o ciclo: provedor → `assets/<job>/chapter_N.png`
+→ `file://` no HTML → WeasyPrint relê do disco → EPUB relê a capa.
+
+Aqui os bytes ficam em memória, endereçados por `asset://<job>/<nome>`:
+  - o HTML do livro referencia essas URIs
+  - o url_fetcher do render serve os bytes direto do store (os que cada
+    documento usa seguem junto com o job para o worker de render)
+  - o EPUB lê a capa do mesmo lugar
+
+Acima de ASSET_STORE_MAX_MB por job, os próximos assets vão para o disco
+(`assets/<job>/`), mantendo a mesma URI. `release()` apaga o que foi
+despejado, então o job não deixa órfãos em `assets/`.
+"""
+
+import os
+import shutil
+import threading
+from pathlib import Path
+
+
+SCHEME = "asset"
+_LIMITE_MEMORIA = int(float(os.getenv("ASSET_STORE_MAX_MB", "64")) * 1024 * 1024)
+
+_ASSINATURAS = (
+    (b"\x89PNG", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+    (b"RIFF", "image/webp"),
+    (b"<svg", "image/svg+xml"),
+    (b"<?xml", "image/svg+xml"),
+)
+
+
+def sniff_mime(data: bytes) -> str:
+    """Tipo da imagem pelos primeiros bytes (os provedores não são consistentes na extensão)."""
+    for assinatura, mime in _ASSINATURAS:
+        if data.startswith(assinatura):
+            return mime
+    return "application/octet-stream"
+
+
+def is_asset_uri(ref: str | None) -> bool:
+    return bool(ref) and ref.startswith(f"{SCHEME}://")
+
+
+class AssetStore:
+    """Bytes de imagens de um job, em memória com despejo para disco acima do limite."""
+
+    def __init__(self, job_id: str, spill_dir: str | Path, max_memory_bytes: int = _LIMITE_MEMORIA):
+        self.job_id = job_id
+        self.spill_dir = Path(spill_dir)
+        self.max_memory_bytes = max_memory_bytes
+        self._memoria: dict[str, tuple[bytes, str]] = {}
+        self._disco: dict[str, tuple[Path, str]] = {}
+        self._bytes_memoria = 0
+        self._lock = threading.Lock()
+
+    def uri(self, name: str) -> str:
+        return f"{SCHEME}://{self.job_id}/{name}"
+
+    def put(self, name: str, data: bytes, mime: str | None = None) -> str:
+        """Guarda a imagem e retorna a URI `asset://` usada no HTML/EPUB."""
+        mime = mime or sniff_mime(data)
+        uri = self.uri(name)
+        with self._lock:
+            self._remover(uri)
+            if self._bytes_memoria + len(data) <= self.max_memory_bytes:
+                self._memoria[uri] = (data, mime)
+                self._bytes_memoria += len(data)
+                return uri
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        caminho = self.spill_dir / name
+        caminho.write_bytes(data)
+        with self._lock:
+            self._disco[uri] = (caminho, mime)
+        return uri
+
+    def _remover(self, uri: str):
+        antigo = self._memoria.pop(uri, None)
+        if antigo is not None:
+            self._bytes_memoria -= len(antigo[0])
+        self._disco.pop(uri, None)
+
+    def get(self, uri: str) -> tuple[bytes, str] | None:
+        with self._lock:
+            item = self._memoria.get(uri)
+            if item is not None:
+                return item
+            despejado = self._disco.get(uri)
+        if despejado is None:
+            return None
+        caminho, mime = despejado
+        return caminho.read_bytes(), mime
+
+    def __contains__(self, uri: str) -> bool:
+        with self._lock:
+            return uri in self._memoria or uri in self._disco
+
+    def payload(self, uris) -> dict[str, tuple[bytes, str]]:
+        """Subconjunto `uri → (bytes, mime)` para enviar junto com um job de render."""
+        return {uri: item for uri in uris if is_asset_uri(uri) and (item := self.get(uri)) is not None}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "em_memoria": len(self._memoria),
+                "bytes_memoria": self._bytes_memoria,
+                "em_disco": len(self._disco),
+            }
+
+    def release(self):
+        """Descarta os bytes e apaga os arquivos despejados."""
+        with self._lock:
+            self._memoria.clear()
+            self._disco.clear()
+            self._bytes_memoria = 0
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
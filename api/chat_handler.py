@@ -10,6 +10,9 @@ import os
 import re
 import google.generativeai as genai
 
+from api import chat_sessions, llm_cache, provider_health
+from api.rate_limiter import get_limiter, is_rate_limit_error
+
 
 _configured = False
 _MODELS = [
@@ -43,8 +46,9 @@ Seu papel é conversar com o usuário para entender exatamente que e-book ele qu
    - **theme**: Tema visual (já vem configurado na sidebar)
    - **chapters**: Lista com título e quantidade de páginas de cada capítulo
 
-3. As mensagens virão com metadata [CONFIGURAÇÕES DO USUÁRIO: ...] no final.
-   Use essas configurações ao gerar o e-book. NÃO mencione essa metadata na resposta.
+3. As configurações do usuário estão no bloco [CONFIGURAÇÕES DO USUÁRIO] ao final
+   destas instruções (as mensagens chegam sem metadata). Use essas configurações ao
+   gerar o e-book. NÃO mencione esse bloco na resposta.
    Adapte o idioma da resposta conforme o campo "Idioma" das configurações.
 
 4. Se o usuário der informações parciais, pergunte o que falta de forma natural.
@@ -72,13 +76,49 @@ Seu papel é conversar com o usuário para entender exatamente que e-book ele qu
 
 
 
+def _montar_instrucao(theme: str, style: str, audience: str, language: str, resumo: str = "") -> str:
+    instrucao = SYSTEM_PROMPT + f"""
+            
+[CONFIGURAÇÕES DO USUÁRIO]
+Idioma: {language}
+Público-Alvo: {audience}
+Estilo da Escrita: {style}
+Tema Visual do Livro (Importante para as Capas): {theme}
+"""
+    if resumo:
+        instrucao += f"""
+[RESUMO DA CONVERSA ATÉ AQUI]
+{resumo}
+"""
+    return instrucao
+
+
+def _montar_resultado(response_text: str) -> dict:
+    # Extrair dados do ebook se presentes
+    ebook_data = _extrair_ebook_data(response_text)
+
+    # Limpar tags do texto de resposta
+    clean_text = re.sub(
+        r'<<<EBOOK_DATA>>>.*?<<<END_EBOOK_DATA>>>',
+        '',
+        response_text,
+        flags=re.DOTALL
+    ).strip()
+
+    return {
+        "response": clean_text,
+        "ebook_data": ebook_data,
+    }
+
+
 def processar_mensagem(
     historico: list[dict], 
     mensagem_usuario: str,
     theme: str = "Minimalista Moderno",
     style: str = "Profissional",
     audience: str = "Geral",
-    language: str = "PT-BR"
+    language: str = "PT-BR",
+    usar_cache: bool = True,
 ) -> dict:
     """
     Processa uma mensagem do usuário via chat.
@@ -88,8 +128,12 @@ def processar_mensagem(
     dict com:
         - response: texto da resposta do bot
         - ebook_data: dict com dados do ebook (ou None se ainda coletando)
+
+    A resposta bruta do modelo fica no cache em disco (chave: modelo + instrução
+    de sistema + histórico + mensagem); `usar_cache=False` força nova chamada.
     """
     _configure()
+    cache = llm_cache.get_cache()
 
     # Construir histórico para o Gemini
     gemini_history = []
@@ -99,45 +143,38 @@ def processar_mensagem(
 
     last_error = None
     for model_name in _MODELS:
+        # Pula modelos que já sabemos estar fora (404 em cache ou circuito aberto)
+        if not provider_health.should_try("gemini", model_name):
+            continue
         try:
-            custom_instruction = SYSTEM_PROMPT + f"""
-            
-[CONFIGURAÇÕES DO USUÁRIO]
-Idioma: {language}
-Público-Alvo: {audience}
-Estilo da Escrita: {style}
-Tema Visual do Livro (Importante para as Capas): {theme}
-"""
-            model = genai.GenerativeModel(
-                model_name,
-                system_instruction=custom_instruction,
+            custom_instruction = _montar_instrucao(theme, style, audience, language)
+            chave = llm_cache.make_key(
+                model=f"gemini/{model_name}",
+                prompt=json.dumps([gemini_history, mensagem_usuario], ensure_ascii=False),
+                system=custom_instruction,
             )
-            chat = model.start_chat(history=gemini_history)
-            response = chat.send_message(mensagem_usuario)
-            response_text = response.text
-
-            # Extrair dados do ebook se presentes
-            ebook_data = _extrair_ebook_data(response_text)
-
-            # Limpar tags do texto de resposta
-            clean_text = re.sub(
-                r'<<<EBOOK_DATA>>>.*?<<<END_EBOOK_DATA>>>',
-                '',
-                response_text,
-                flags=re.DOTALL
-            ).strip()
-
-            return {
-                "response": clean_text,
-                "ebook_data": ebook_data,
-            }
+            response_text = cache.get(chave) if cache and usar_cache else None
+            if response_text is None:
+                model = genai.GenerativeModel(
+                    model_name,
+                    system_instruction=custom_instruction,
+                )
+                chat = model.start_chat(history=gemini_history)
+                with get_limiter("gemini", model_name).acquire():
+                    response = chat.send_message(mensagem_usuario)
+                response_text = response.text
+                provider_health.record_success("gemini", model_name)
+                if cache:
+                    cache.set(chave, response_text)
+
+            return _montar_resultado(response_text)
 
         except Exception as e:
             last_error = e
             error_str = str(e)
-            if "429" in error_str or "quota" in error_str.lower():
-                import time
-                time.sleep(10)
+            provider_health.record_failure("gemini", model_name, e)
+            if is_rate_limit_error(e):
+                # Sem sleep: o limitador deste modelo já recuou, tenta o próximo
                 continue
             elif "404" in error_str:
                 continue
@@ -147,6 +184,149 @@ Tema Visual do Livro (Importante para as Capas): {theme}
     raise RuntimeError(f"Chat falhou em todos os modelos. Erro: {last_error}")
 
 
+def processar_mensagem_sessao(
+    mensagem_usuario: str,
+    session_id: str | None = None,
+    historico: list[dict] | None = None,
+    theme: str = "Minimalista Moderno",
+    style: str = "Profissional",
+    audience: str = "Geral",
+    language: str = "PT-BR",
+    usar_cache: bool = True,
+) -> dict:
+    """
+    Como `processar_mensagem`, mas com a conversa guardada no servidor.
+
+    O cliente manda só a mensagem nova e o `session_id`. O objeto de chat do
+    Gemini fica vivo entre mensagens, e turnos antigos viram um resumo corrido
+    quando passam do orçamento de tokens. Se a sessão não existir (ou expirou),
+    uma nova é criada a partir de `historico`.
+
+    A resposta bruta também passa pelo cache em disco (chave: modelo + instrução
+    de sistema com o resumo + turnos + mensagem); `usar_cache=False` força nova chamada.
+
+    Returns
+    -------
+    dict com response, ebook_data e session_id.
+    """
+    _configure()
+    cache = llm_cache.get_cache()
+    store = chat_sessions.get_store()
+    settings = {"theme": theme, "style": style, "audience": audience, "language": language}
+
+    sessao = store.get(session_id) if session_id else None
+    if sessao is None:
+        turnos = [
+            {"role": "user" if m["role"] == "user" else "model", "content": m["content"]}
+            for m in historico or []
+        ]
+        # O frontend antigo manda a mensagem atual também no histórico
+        if turnos and turnos[-1] == {"role": "user", "content": mensagem_usuario}:
+            turnos.pop()
+        sessao = store.create(settings, turns=turnos)
+
+    with sessao.lock:
+        if sessao.settings != settings:
+            sessao.settings = settings
+            sessao.chat = None
+
+        last_error = None
+        for model_name in _MODELS:
+            if not provider_health.should_try("gemini", model_name):
+                continue
+            try:
+                chave = llm_cache.make_key(
+                    model=f"gemini/{model_name}",
+                    prompt=json.dumps([sessao.turns, mensagem_usuario], ensure_ascii=False),
+                    system=_montar_instrucao(resumo=sessao.summary, **sessao.settings),
+                )
+                response_text = cache.get(chave) if cache and usar_cache else None
+                if response_text is None:
+                    chat = _chat_da_sessao(sessao, model_name)
+                    with get_limiter("gemini", model_name).acquire():
+                        response = chat.send_message(mensagem_usuario)
+                    response_text = response.text
+                    provider_health.record_success("gemini", model_name)
+                    if cache:
+                        cache.set(chave, response_text)
+                else:
+                    sessao.chat = None  # o chat vivo não viu este turno; reconstrói dos turnos
+            except Exception as e:
+                last_error = e
+                provider_health.record_failure("gemini", model_name, e)
+                sessao.chat = None  # o histórico do SDK pode ter ficado pela metade
+                if is_rate_limit_error(e) or provider_health.is_not_found_error(e):
+                    continue
+                raise
+
+            sessao.turns.append({"role": "user", "content": mensagem_usuario})
+            sessao.turns.append({"role": "model", "content": response_text})
+            if sessao.precisa_compactar():
+                _compactar(sessao)
+            store.save(sessao)
+
+            resultado = _montar_resultado(response_text)
+            resultado["session_id"] = sessao.session_id
+            return resultado
+
+    raise RuntimeError(f"Chat falhou em todos os modelos. Erro: {last_error}")
+
+
+def _chat_da_sessao(sessao, model_name: str):
+    """Reaproveita o chat vivo da sessão; só reconstrói se mudou modelo, configurações ou resumo."""
+    fingerprint = f"{model_name}|{json.dumps(sessao.settings, sort_keys=True)}|{hash(sessao.summary)}"
+    if sessao.chat is not None and sessao.chat_fingerprint == fingerprint:
+        return sessao.chat
+
+    model = genai.GenerativeModel(
+        model_name,
+        system_instruction=_montar_instrucao(resumo=sessao.summary, **sessao.settings),
+    )
+    sessao.chat = model.start_chat(history=[
+        {"role": "user" if t["role"] == "user" else "model", "parts": [t["content"]]}
+        for t in sessao.turns
+    ])
+    sessao.chat_model = model_name
+    sessao.chat_fingerprint = fingerprint
+    return sessao.chat
+
+
+def _compactar(sessao):
+    """Resume os turnos mais antigos (mantendo os últimos) num resumo corrido."""
+    antigos = sessao.turns[:-chat_sessions.TURNOS_PRESERVADOS]
+    transcricao = "\n".join(
+        f"{'Usuário' if t['role'] == 'user' else 'BookBot'}: {t['content']}" for t in antigos
+    )
+    prompt = f"""Atualize o resumo de uma conversa entre um usuário e o BookBot (assistente de criação de e-books).
+Preserve TODAS as decisões tomadas: título, autor, tema, lista de capítulos com páginas,
+preferências e pedidos de ajuste. Seja conciso (no máximo 200 palavras), em tópicos.
+
+Resumo anterior:
+{sessao.summary or "(vazio)"}
+
+Novos trechos da conversa:
+{transcricao}
+
+Resumo atualizado:"""
+
+    for model_name in _MODELS:
+        if not provider_health.should_try("gemini", model_name):
+            continue
+        try:
+            with get_limiter("gemini", model_name).acquire():
+                resposta = genai.GenerativeModel(model_name).generate_content(prompt)
+            provider_health.record_success("gemini", model_name)
+        except Exception as e:
+            provider_health.record_failure("gemini", model_name, e)
+            continue
+        sessao.summary = resposta.text.strip()
+        sessao.turns = sessao.turns[-chat_sessions.TURNOS_PRESERVADOS:]
+        sessao.chat = None  # reconstrói com o resumo na instrução de sistema
+        print(f"[Chat] Sessão {sessao.session_id[:8]} compactada: {len(antigos)} turnos → resumo.")
+        return
+    print(f"[Chat] Compactação da sessão {sessao.session_id[:8]} adiada (modelos indisponíveis).")
+
+
 def _extrair_ebook_data(text: str) -> dict | None:
     """Extrai JSON de ebook_data do texto se presente."""
     match = re.search(
@@ -0,0 +1,154 @@
+"""
+Sessões de Chat no Servidor
+============================
+Guarda cada conversa do /chat no servidor, indexada por `session_id`,
+para que o cliente envie só a mensagem nova em vez do histórico inteiro.
+
+- LRU em memória (CHAT_SESSIONS_MAX) com o objeto de chat vivo do Gemini
+- Persistência opcional em SQLite (CHAT_SESSIONS_DB) para sobreviver a
+  reinícios e a evicções do LRU
+- Compactação: quando os turnos passam de CHAT_HISTORY_TOKEN_BUDGET, os
+  mais antigos viram um resumo corrido e saem do histórico enviado ao modelo
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+
+_MAX_SESSOES = int(os.getenv("CHAT_SESSIONS_MAX", "500"))
+TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "4000"))
+# Turnos mais recentes que nunca entram no resumo
+TURNOS_PRESERVADOS = 6
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimativa barata (≈4 caracteres por token), suficiente para o orçamento."""
+    return len(texto) // 4 + 1
+
+
+@dataclass
+class ChatSession:
+    session_id: str
+    settings: dict = field(default_factory=dict)
+    summary: str = ""
+    turns: list[dict] = field(default_factory=list)
+    updated_at: float = field(default_factory=time.time)
+    # Não persistidos: objeto de chat do SDK e o modelo/config a que está preso
+    chat: Any = None
+    chat_model: str | None = None
+    chat_fingerprint: str | None = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def tokens_turnos(self) -> int:
+        return sum(estimar_tokens(t["content"]) for t in self.turns)
+
+    def precisa_compactar(self) -> bool:
+        return (
+            len(self.turns) > TURNOS_PRESERVADOS
+            and self.tokens_turnos() > TOKEN_BUDGET
+        )
+
+
+class SessionStore:
+    """LRU em memória com backing SQLite opcional."""
+
+    def __init__(self, max_sessions: int = _MAX_SESSOES, db_path: str | None = None):
+        self.max_sessions = max_sessions
+        self._sessoes: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS chat_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    settings TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    turns TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            self._conn.commit()
+
+    def get(self, session_id: str) -> ChatSession | None:
+        with self._lock:
+            sessao = self._sessoes.get(session_id)
+            if sessao is not None:
+                self._sessoes.move_to_end(session_id)
+                return sessao
+            if self._conn is None:
+                return None
+            row = self._conn.execute(
+                "SELECT settings, summary, turns, updated_at FROM chat_sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            sessao = ChatSession(
+                session_id=session_id,
+                settings=json.loads(row[0]),
+                summary=row[1],
+                turns=json.loads(row[2]),
+                updated_at=row[3],
+            )
+            self._inserir(sessao)
+            return sessao
+
+    def create(self, settings: dict, turns: list[dict] | None = None) -> ChatSession:
+        sessao = ChatSession(session_id=uuid.uuid4().hex, settings=settings, turns=list(turns or []))
+        with self._lock:
+            self._inserir(sessao)
+        self.save(sessao)
+        return sessao
+
+    def save(self, sessao: ChatSession):
+        sessao.updated_at = time.time()
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_sessions (session_id, settings, summary, turns, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    sessao.session_id,
+                    json.dumps(sessao.settings, ensure_ascii=False),
+                    sessao.summary,
+                    json.dumps(sessao.turns, ensure_ascii=False),
+                    sessao.updated_at,
+                ),
+            )
+            self._conn.commit()
+
+    def _inserir(self, sessao: ChatSession):
+        self._sessoes[sessao.session_id] = sessao
+        self._sessoes.move_to_end(sessao.session_id)
+        while len(self._sessoes) > self.max_sessions:
+            self._sessoes.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessoes_em_memoria": len(self._sessoes),
+                "max_sessoes": self.max_sessions,
+                "sqlite": self._conn is not None,
+            }
+
+
+_store: SessionStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> SessionStore:
+    """Singleton do store (SQLite só se CHAT_SESSIONS_DB estiver definido)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore(db_path=os.getenv("CHAT_SESSIONS_DB") or None)
+        return _store
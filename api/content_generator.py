@@ -3,12 +3,26 @@ Módulo de Geração de Conteúdo via Google Gemini
 =================================================
 Gera conteúdo extenso e confiável para cada capítulo do e-book.
 Inclui fallback entre modelos e retry automático para rate limits.
+Os capítulos de um livro são gerados concorrentemente via clientes assíncronos;
+capítulos longos demais para uma única chamada são divididos em seções paralelas.
 """
 
+import asyncio
+import json
+import math
 import os
+import re
 import time
+import weakref
+from collections import deque
+from typing import AsyncIterator, Callable, Optional
+
 import google.generativeai as genai
 
+from api import executors, llm_cache, provider_health
+from api.deadline import Orcamento
+from api.rate_limiter import get_limiter, is_rate_limit_error
+
 
 # Modelos em ordem de preferência (fallback automático)
 # Prioriza modelos com quotas separadas do gemini-2.0-flash
@@ -17,7 +31,32 @@ _MODELS = [
     "gemini-2.5-flash",
 ]
 
+_GROQ_MODEL = "llama3-70b-8192"
+_SYSTEM_ESCRITOR = "Você é um escritor profissional e conhecedor excepcional de literatura."
+
+# Parâmetros de geração por provedor (também fazem parte da chave do cache)
+_GERACAO = {
+    "groq": {"temperature": 0.7, "max_tokens": 8000},
+    "gemini": {"temperature": 0.7, "max_output_tokens": 8192},
+}
+
+# Hedging (opt-in): se o primário não responder até o percentil P das latências
+# recentes, dispara o próximo da cadeia e fica com a primeira resposta.
+_HEDGING_ATIVO = os.getenv("LLM_HEDGING", "0") == "1"
+_HEDGE_PERCENTIL = float(os.getenv("LLM_HEDGE_PERCENTILE", "90"))
+_HEDGE_LIMIAR_INICIAL_S = float(os.getenv("LLM_HEDGE_INITIAL_S", "30"))
+_HEDGE_MIN_AMOSTRAS = 5
+
+# Uma única chamada (max_tokens=8000) não passa de ~3000 palavras com folga;
+# capítulos maiores são planejados em seções geradas em paralelo.
+_PALAVRAS_POR_CHAMADA = int(os.getenv("LONG_CHAPTER_WORDS", "3000"))
+_PALAVRAS_POR_PAGINA = 500
+
+# Quantos capítulos podem estar em geração ao mesmo tempo (fan-out limitado)
+_CONCORRENCIA_PADRAO = int(os.getenv("CHAPTER_CONCURRENCY", "4"))
+
 _configured = False
+_groq_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, object]" = weakref.WeakKeyDictionary()
 
 
 def _configure():
@@ -31,75 +70,393 @@ def _configure():
     _configured = True
 
 
-def _gerar_com_retry(prompt: str, max_retries: int = 2) -> str:
+def _gerar_com_retry(prompt: str, max_retries: int = 2, usar_cache: bool = True) -> str:
+    """Versão síncrona de `_gerar_com_retry_async` (para chamadas fora de um event loop)."""
+    return asyncio.run(_gerar_com_retry_async(prompt, max_retries, usar_cache=usar_cache))
+
+
+def _get_groq_client(api_key: str):
     """
-    Tenta gerar conteúdo de forma Híbrida. 
-    Prioridade 1: GroqCloud (Llama 3 70B LPU) - Foco em extrema velocidade e zero throttling.
-    Prioridade 2: Google Gemini (Fallback)
+    Reutiliza um `AsyncGroq` por event loop (o pool httpx fica preso ao loop
+    que o criou), em vez de construir um cliente novo a cada capítulo.
     """
-    groq_api_key = os.getenv("GROQ_API_KEY", "")
-    
-    # 1. Tentar Groq (Llama 3)
-    if groq_api_key:
+    from groq import AsyncGroq
+
+    loop = asyncio.get_running_loop()
+    client = _groq_clients.get(loop)
+    if client is None:
+        client = AsyncGroq(api_key=api_key)
+        _groq_clients[loop] = client
+    return client
+
+
+class _JanelaLatencia:
+    """Últimas N latências de sucesso por (provedor, modelo), para percentis."""
+
+    def __init__(self, tamanho: int = 100):
+        self._amostras: dict[tuple[str, str], deque] = {}
+        self._tamanho = tamanho
+
+    def registrar(self, candidato: tuple[str, str], segundos: float):
+        self._amostras.setdefault(candidato, deque(maxlen=self._tamanho)).append(segundos)
+
+    def percentil(self, candidato: tuple[str, str], p: float) -> float | None:
+        amostras = sorted(self._amostras.get(candidato, ()))
+        if len(amostras) < _HEDGE_MIN_AMOSTRAS:
+            return None
+        return amostras[min(len(amostras) - 1, int(p / 100 * len(amostras)))]
+
+
+_latencias = _JanelaLatencia()
+_hedge_stats = {"requisicoes": 0, "disparados": 0, "vencidos_pelo_hedge": 0}
+
+
+def hedge_stats() -> dict:
+    """Quantas vezes o hedging disparou e quantas vezes a segunda requisição venceu."""
+    stats = dict(_hedge_stats)
+    stats["ativo"] = _HEDGING_ATIVO
+    stats["percentil"] = _HEDGE_PERCENTIL
+    return stats
+
+
+def _candidatos() -> list[tuple[str, str]]:
+    """Cadeia de fallback (provedor, modelo) em ordem de preferência, sem os que estão fora."""
+    cadeia = []
+    if os.getenv("GROQ_API_KEY", ""):
+        cadeia.append(("groq", _GROQ_MODEL))
+    if os.getenv("GEMINI_API_KEY", ""):
+        cadeia.extend(("gemini", m) for m in _MODELS)
+    return [c for c in cadeia if provider_health.is_available(*c)]
+
+
+def _mais_rapidos(candidatos: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    """Cadeia reordenada pela latência mediana medida (sem amostras, vale o limiar inicial do hedge)."""
+    return sorted(candidatos, key=lambda c: _latencias.percentil(c, 50) or _HEDGE_LIMIAR_INICIAL_S)
+
+
+async def _chamar_groq(prompt: str) -> str:
+    client = _get_groq_client(os.getenv("GROQ_API_KEY", ""))
+    print("[Groq LPU] Iniciando Roteirização Engine via Llama-3-70b...")
+    async with get_limiter("groq", _GROQ_MODEL).acquire_async():
+        response = await client.chat.completions.create(
+            messages=[
+                {"role": "system", "content": _SYSTEM_ESCRITOR},
+                {"role": "user", "content": prompt}
+            ],
+            model=_GROQ_MODEL,
+            **_GERACAO["groq"],
+        )
+    content = response.choices[0].message.content
+    if not content:
+        raise RuntimeError("Groq retornou conteúdo vazio")
+    print("[Groq LPU] Geração concluída com sucesso em hiper-velocidade.")
+    return content
+
+
+async def _chamar_gemini(prompt: str, model_name: str, max_retries: int) -> str:
+    _configure()
+    for attempt in range(max_retries):
         try:
-            from groq import Groq
-            client = Groq(api_key=groq_api_key)
-            print("[Groq LPU] Iniciando Roteirização Engine via Llama-3-70b...")
-            response = client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": "Você é um escritor profissional e conhecedor excepcional de literatura."},
-                    {"role": "user", "content": prompt}
-                ],
-                model="llama3-70b-8192",
-                temperature=0.7,
-                max_tokens=8000,
-            )
-            content = response.choices[0].message.content
-            if content:
-                print("[Groq LPU] Geração concluída com sucesso em hiper-velocidade.")
-                return content
+            model = genai.GenerativeModel(model_name)
+            async with get_limiter("gemini", model_name).acquire_async():
+                response = await model.generate_content_async(
+                    prompt,
+                    generation_config=genai.types.GenerationConfig(**_GERACAO["gemini"]),
+                )
+            return response.text
         except Exception as e:
-            print(f"[Groq LPU] Erro na geração com Llama 3: {str(e)}. Fazendo Fallback para Gemini...")
+            if is_rate_limit_error(e) and attempt + 1 < max_retries:
+                # O limitador já reduziu a vazão; a próxima permissão espera na fila
+                print(f"[Gemini] Rate limit em {model_name}, reenfileirando (tentativa {attempt+1})...")
+                continue
+            raise
 
-    # 2. Fallback para Gemini
-    _configure()
+
+async def _chamar(candidato: tuple[str, str], prompt: str, max_retries: int) -> str:
+    """Chama um candidato da cadeia, alimentando o registro de saúde e as latências."""
+    provedor, modelo = candidato
+    inicio = time.monotonic()
+    try:
+        if provedor == "groq":
+            texto = await _chamar_groq(prompt)
+        else:
+            texto = await _chamar_gemini(prompt, modelo, max_retries)
+    except asyncio.CancelledError:
+        provider_health.get_breaker(provedor, modelo).record_neutral()
+        raise
+    except Exception as e:
+        provider_health.record_failure(provedor, modelo, e)
+        raise
+    provider_health.record_success(provedor, modelo)
+    _latencias.registrar(candidato, time.monotonic() - inicio)
+    cache = llm_cache.get_cache()
+    if cache:
+        await executors.run_disk(cache.set, _chave_cache(candidato, prompt), texto)
+    return texto
+
+
+def _chave_cache(candidato: tuple[str, str], prompt: str) -> str:
+    provedor, modelo = candidato
+    return llm_cache.make_key(
+        model=f"{provedor}/{modelo}",
+        prompt=prompt,
+        system=_SYSTEM_ESCRITOR if provedor == "groq" else None,
+        config=_GERACAO[provedor],
+    )
+
+
+def _buscar_no_cache(cache: llm_cache.LLMCache, candidatos: list[tuple[str, str]], prompt: str):
+    """Primeira resposta em cache entre os candidatos, como (candidato, texto); bloqueante (SQLite)."""
+    for candidato in candidatos:
+        texto = cache.get(_chave_cache(candidato, prompt))
+        if texto is not None:
+            return candidato, texto
+    return None, None
+
+
+async def _gerar_sequencial(prompt: str, candidatos: list[tuple[str, str]], max_retries: int) -> str:
     last_error = None
+    for candidato in candidatos:
+        provedor, modelo = candidato
+        if not provider_health.should_try(provedor, modelo):
+            print(f"[{provedor}] {modelo} indisponível/circuito aberto, pulando...")
+            continue
+        try:
+            return await _chamar(candidato, prompt, max_retries)
+        except Exception as e:
+            last_error = e
+            print(f"[{provedor}] Erro em {modelo}: {str(e)[:200]}. Tentando próximo...")
 
-    print("[Gemini Fallback] Iniciando roteirização via Google Neural Net...")
-    for model_name in _MODELS:
-        for attempt in range(max_retries):
-            try:
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(
-                    prompt,
-                    generation_config=genai.types.GenerationConfig(
-                        max_output_tokens=8192,
-                        temperature=0.7,
-                    ),
+    raise RuntimeError(
+        f"Todos os motores falharam (Groq e Gemini). Último erro: {last_error}"
+    )
+
+
+async def _gerar_com_hedge(prompt: str, candidatos: list[tuple[str, str]], max_retries: int) -> str:
+    """
+    Dispara o primário; se ele passar do limiar (percentil das latências
+    recentes), dispara o próximo da cadeia e fica com a primeira resposta
+    válida, cancelando a outra.
+    """
+    vivos = [c for c in candidatos if provider_health.is_healthy(*c)]
+    # Os que estão com circuito aberto ficam no fim da cadeia, como último recurso
+    cauda = [c for c in candidatos if c not in vivos]
+    if len(vivos) < 2:
+        return await _gerar_sequencial(prompt, vivos + cauda, max_retries)
+    if not provider_health.should_try(*vivos[0]):
+        return await _gerar_sequencial(prompt, vivos[1:] + cauda, max_retries)
+
+    primario, secundario = vivos[0], vivos[1]
+    limiar = _latencias.percentil(primario, _HEDGE_PERCENTIL) or _HEDGE_LIMIAR_INICIAL_S
+    _hedge_stats["requisicoes"] += 1
+
+    t_primario = asyncio.create_task(_chamar(primario, prompt, max_retries))
+    done, _ = await asyncio.wait({t_primario}, timeout=limiar)
+    if not done and provider_health.should_try(*secundario):
+        print(f"[Hedge] {primario[1]} passou de {limiar:.1f}s, disparando {secundario[1]} em paralelo...")
+        _hedge_stats["disparados"] += 1
+        t_hedge = asyncio.create_task(_chamar(secundario, prompt, max_retries))
+        pendentes = {t_primario, t_hedge}
+        try:
+            while pendentes:
+                done, pendentes = await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
+                for tarefa in done:
+                    if tarefa.exception() is None:
+                        if tarefa is t_hedge:
+                            _hedge_stats["vencidos_pelo_hedge"] += 1
+                        return tarefa.result()
+        finally:
+            for tarefa in pendentes:
+                tarefa.cancel()
+        return await _gerar_sequencial(prompt, vivos[2:] + cauda, max_retries)
+
+    try:
+        return await t_primario
+    except Exception as e:
+        print(f"[Hedge] Primário {primario[1]} falhou ({str(e)[:120]}), seguindo a cadeia...")
+        return await _gerar_sequencial(prompt, vivos[1:] + cauda, max_retries)
+
+
+async def _gerar_com_retry_async(
+    prompt: str,
+    max_retries: int = 2,
+    hedge: bool | None = None,
+    usar_cache: bool = True,
+    rapido: bool = False,
+) -> str:
+    """
+    Tenta gerar conteúdo de forma Híbrida, com clientes assíncronos.
+    Prioridade 1: GroqCloud (Llama 3 70B LPU) - Foco em extrema velocidade e zero throttling.
+    Prioridade 2: Google Gemini (Fallback)
+    Provedores/modelos com circuito aberto ou marcados como indisponíveis são pulados.
+    Com `hedge` (ou LLM_HEDGING=1), requisições lentas ganham uma cópia no próximo da cadeia.
+    Respostas ficam no cache em disco; `usar_cache=False` ignora a leitura (força nova geração).
+    Com `rapido` (prazo do job em risco), vai direto ao modelo mais rápido medido,
+    sem hedging e sem reenfileirar em rate limit.
+    """
+    candidatos = _mais_rapidos(_candidatos()) if rapido else _candidatos()
+    cache = llm_cache.get_cache() if usar_cache else None
+    if cache:
+        # O SQLite roda no executor de disco: nunca bloqueia o event loop
+        candidato, texto = await executors.run_disk(_buscar_no_cache, cache, candidatos, prompt)
+        if texto is not None:
+            print(f"[Cache LLM] Resposta reaproveitada de {candidato[0]}/{candidato[1]}.")
+            return texto
+    if rapido:
+        return await _gerar_sequencial(prompt, candidatos, 1)
+    if _HEDGING_ATIVO if hedge is None else hedge:
+        return await _gerar_com_hedge(prompt, candidatos, max_retries)
+    return await _gerar_sequencial(prompt, candidatos, max_retries)
+
+
+async def _stream_groq(prompt: str) -> AsyncIterator[str]:
+    client = _get_groq_client(os.getenv("GROQ_API_KEY", ""))
+    async with get_limiter("groq", _GROQ_MODEL).acquire_async():
+        stream = await client.chat.completions.create(
+            messages=[
+                {"role": "system", "content": _SYSTEM_ESCRITOR},
+                {"role": "user", "content": prompt}
+            ],
+            model=_GROQ_MODEL,
+            stream=True,
+            **_GERACAO["groq"],
+        )
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+
+async def _stream_gemini(prompt: str, model_name: str) -> AsyncIterator[str]:
+    _configure()
+    model = genai.GenerativeModel(model_name)
+    async with get_limiter("gemini", model_name).acquire_async():
+        response = await model.generate_content_async(
+            prompt,
+            generation_config=genai.types.GenerationConfig(**_GERACAO["gemini"]),
+            stream=True,
+        )
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+def _prompt_continuacao(prompt: str, parcial: str) -> str:
+    """Prompt para terminar um capítulo cujo streaming caiu depois de `parcial`."""
+    return (
+        f"{prompt}\n\n---\nO início deste capítulo já foi escrito e está abaixo. "
+        "Continue EXATAMENTE de onde o texto parou (mesmo no meio de uma frase), "
+        "sem repetir nada do que já está escrito e sem comentários:\n\n"
+        f"{parcial}"
+    )
+
+
+async def _gerar_stream(prompt: str, usar_cache: bool = True, rapido: bool = False) -> AsyncIterator[str]:
+    """
+    Emite o Markdown em pedaços conforme chega do provedor. Se o provedor falhar
+    antes do primeiro pedaço, o próximo da cadeia assume o streaming; se falhar
+    no meio, o restante do capítulo vem da geração sem streaming, continuando o
+    texto já emitido. Com `rapido`, a cadeia começa pelo modelo mais rápido medido.
+    """
+    candidatos = _mais_rapidos(_candidatos()) if rapido else _candidatos()
+    cache = llm_cache.get_cache()
+    if cache and usar_cache:
+        _, texto = await executors.run_disk(_buscar_no_cache, cache, candidatos, prompt)
+        if texto is not None:
+            yield texto
+            return
+
+    last_error = None
+    for candidato in candidatos:
+        provedor, modelo = candidato
+        if not provider_health.should_try(provedor, modelo):
+            continue
+        inicio = time.monotonic()
+        partes = []
+        try:
+            stream = _stream_groq(prompt) if provedor == "groq" else _stream_gemini(prompt, modelo)
+            async for delta in stream:
+                partes.append(delta)
+                yield delta
+        except (asyncio.CancelledError, GeneratorExit):
+            # Cancelado por nós (job falhou, loop encerrando): não diz nada do provedor,
+            # mas a prova do half-open precisa ser devolvida
+            provider_health.get_breaker(provedor, modelo).record_neutral()
+            raise
+        except Exception as e:
+            provider_health.record_failure(provedor, modelo, e)
+            if partes:
+                print(f"[{provedor}] Streaming caiu no meio em {modelo}: {str(e)[:200]}. Continuando sem streaming...")
+                yield await _gerar_com_retry_async(
+                    _prompt_continuacao(prompt, "".join(partes)), usar_cache=usar_cache, rapido=rapido,
                 )
-                return response.text
-
-            except Exception as e:
-                last_error = e
-                error_str = str(e)
-
-                if "429" in error_str or "quota" in error_str.lower():
-                    wait = 15
-                    print(f"[Gemini] Rate limit em {model_name}, aguardando {wait}s (tentativa {attempt+1})...")
-                    time.sleep(wait)
-                    continue
-                elif "404" in error_str or "not found" in error_str.lower():
-                    print(f"[Gemini] Modelo {model_name} indisponível, tentando próximo...")
-                    break  # próximo modelo
-                else:
-                    print(f"[Gemini] Erro em {model_name}: {error_str}")
-                    break  # próximo modelo
+                return
+            last_error = e
+            print(f"[{provedor}] Erro no streaming em {modelo}: {str(e)[:200]}. Tentando próximo...")
+            continue
+
+        provider_health.record_success(provedor, modelo)
+        _latencias.registrar(candidato, time.monotonic() - inicio)
+        if cache:
+            await executors.run_disk(cache.set, _chave_cache(candidato, prompt), "".join(partes))
+        return
 
     raise RuntimeError(
         f"Todos os motores falharam (Groq e Gemini). Último erro: {last_error}"
     )
 
 
+def _proximo_corte(buffer: str) -> int | None:
+    """Posição do primeiro parágrafo em branco que não está dentro de um bloco ```."""
+    pos = 0
+    while (i := buffer.find("\n\n", pos)) != -1:
+        if buffer[:i].count("```") % 2 == 0:
+            return i
+        pos = i + 2
+    return None
+
+
+async def blocos_markdown(deltas: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Agrupa os pedaços do stream em blocos Markdown completos (parágrafos, listas, código)."""
+    buffer = ""
+    async for delta in deltas:
+        buffer += delta
+        while (corte := _proximo_corte(buffer)) is not None:
+            bloco, buffer = buffer[:corte], buffer[corte:].lstrip("\n")
+            if bloco.strip():
+                yield bloco
+    if buffer.strip():
+        yield buffer
+
+
+async def gerar_capitulo_incremental(
+    deltas: AsyncIterator[str],
+    corretor: Optional[Callable[[str], str]] = None,
+    ao_trecho_inicial: Optional[Callable[[str], None]] = None,
+) -> str:
+    """
+    Consome o stream de um capítulo (ver `gerar_conteudo_capitulo_stream`) bloco a bloco: cada parágrafo fechado já vai
+    para o `corretor` (em thread) e, assim que existem 700 caracteres,
+    `ao_trecho_inicial` recebe o trecho que alimenta o prompt de imagem.
+    Retorna o Markdown completo (corrigido, se houver corretor).
+    """
+    texto = ""
+    trecho_enviado = False
+    blocos: list = []
+
+    async for bloco in blocos_markdown(deltas):
+        texto += bloco + "\n\n"
+        if ao_trecho_inicial and not trecho_enviado and len(texto) >= 700:
+            ao_trecho_inicial(texto[:700])
+            trecho_enviado = True
+        blocos.append(asyncio.create_task(asyncio.to_thread(corretor, bloco)) if corretor else bloco)
+
+    if ao_trecho_inicial and not trecho_enviado:
+        ao_trecho_inicial(texto[:700])
+
+    return "\n\n".join([await b if corretor else b for b in blocos])
+
+
 def gerar_conteudo_capitulo(
     titulo_livro: str,
     titulo_capitulo: str,
@@ -111,9 +468,256 @@ def gerar_conteudo_capitulo(
     idioma: str = "Português",
     publico_alvo: str = "Geral",
     estilo_escrita: str = "Profissional",
+    usar_cache: bool = True,
 ) -> str:
     """Gera o conteúdo completo de um capítulo em Markdown dinâmico baseado no Painel."""
-    palavras_alvo = paginas * 500
+    return asyncio.run(gerar_conteudo_capitulo_async(
+        titulo_livro, titulo_capitulo, numero_capitulo, total_capitulos, paginas,
+        tema_historia, ideia_principal, idioma, publico_alvo, estilo_escrita, usar_cache,
+    ))
+
+
+async def gerar_conteudo_capitulo_async(
+    titulo_livro: str,
+    titulo_capitulo: str,
+    numero_capitulo: int,
+    total_capitulos: int,
+    paginas: int,
+    tema_historia: str,
+    ideia_principal: str,
+    idioma: str = "Português",
+    publico_alvo: str = "Geral",
+    estilo_escrita: str = "Profissional",
+    usar_cache: bool = True,
+    rapido: bool = False,
+) -> str:
+    """Versão assíncrona de `gerar_conteudo_capitulo`. Capítulos longos vão para `gerar_capitulo_longo_async`."""
+    if _e_capitulo_longo(paginas):
+        return await gerar_capitulo_longo_async(
+            titulo_livro, titulo_capitulo, numero_capitulo, total_capitulos, paginas,
+            tema_historia, ideia_principal, idioma, publico_alvo, estilo_escrita, usar_cache, rapido,
+        )
+    return await _gerar_com_retry_async(_montar_prompt_capitulo(
+        titulo_livro, titulo_capitulo, numero_capitulo, total_capitulos, paginas,
+        tema_historia, ideia_principal, idioma, publico_alvo, estilo_escrita,
+    ), usar_cache=usar_cache, rapido=rapido)
+
+
+async def gerar_conteudo_capitulo_stream(
+    titulo_livro: str,
+    titulo_capitulo: str,
+    numero_capitulo: int,
+    total_capitulos: int,
+    paginas: int,
+    tema_historia: str,
+    ideia_principal: str,
+    idioma: str = "Português",
+    publico_alvo: str = "Geral",
+    estilo_escrita: str = "Profissional",
+    usar_cache: bool = True,
+    rapido: bool = False,
+) -> AsyncIterator[str]:
+    """
+    Versão em streaming de `gerar_conteudo_capitulo`: emite o Markdown conforme chega.
+    Capítulos longos emitem uma seção inteira por vez, na ordem do plano.
+    """
+    args = (
+        titulo_livro, titulo_capitulo, numero_capitulo, total_capitulos, paginas,
+        tema_historia, ideia_principal, idioma, publico_alvo, estilo_escrita,
+    )
+    if _e_capitulo_longo(paginas):
+        stream = _secoes_capitulo_longo(*args, usar_cache, rapido)
+    else:
+        stream = _gerar_stream(_montar_prompt_capitulo(*args), usar_cache, rapido)
+    async for delta in stream:
+        yield delta
+
+
+def _e_capitulo_longo(paginas: int) -> bool:
+    return paginas * _PALAVRAS_POR_PAGINA > _PALAVRAS_POR_CHAMADA
+
+
+async def _planejar_secoes(
+    titulo_livro: str,
+    titulo_capitulo: str,
+    numero_capitulo: int,
+    total_capitulos: int,
+    n_secoes: int,
+    tema_historia: str,
+    ideia_principal: str,
+    idioma: str,
+    usar_cache: bool,
+    rapido: bool = False,
+) -> list[dict]:
+    """Chamada barata que devolve o plano do capítulo: [{"title", "summary"}, ...]."""
+    prompt = f"""Planeje o capítulo {numero_capitulo} de {total_capitulos} do livro "{titulo_livro}".
+
+**Ideia Principal do Livro:** {ideia_principal}
+**Título do Capítulo:** {titulo_capitulo}
+**Gênero/Tema da História:** {tema_historia}
+**Idioma Obrigatório:** {idioma}
+
+Divida o capítulo em exatamente {n_secoes} seções sequenciais, sem sobreposição de conteúdo.
+Responda APENAS com um array JSON, sem texto antes ou depois, no formato:
+[{{"title": "Título da seção", "summary": "O que a seção cobre, em 1-2 frases"}}]"""
+
+    try:
+        resposta = await _gerar_com_retry_async(prompt, usar_cache=usar_cache, rapido=rapido)
+        match = re.search(r"\[.*\]", resposta, flags=re.DOTALL)
+        plano = json.loads(match.group(0)) if match else []
+        plano = [
+            {"title": str(s.get("title", "")).strip(), "summary": str(s.get("summary", "")).strip()}
+            for s in plano if isinstance(s, dict) and s.get("title")
+        ]
+    except (json.JSONDecodeError, RuntimeError) as e:
+        print(f"[Capítulo Longo] Plano inválido ({str(e)[:120]}), usando seções genéricas...")
+        plano = []
+
+    if not plano:
+        plano = [{"title": f"Parte {i + 1}", "summary": ""} for i in range(n_secoes)]
+    return plano
+
+
+def _montar_prompt_secao(
+    titulo_livro: str,
+    titulo_capitulo: str,
+    numero_capitulo: int,
+    total_capitulos: int,
+    plano: list[dict],
+    indice_secao: int,
+    palavras_secao: int,
+    tema_historia: str,
+    ideia_principal: str,
+    idioma: str,
+    publico_alvo: str,
+    estilo_escrita: str,
+) -> str:
+    secao = plano[indice_secao]
+    roteiro = "\n".join(
+        f"{i + 1}. {s['title']}" + (f" — {s['summary']}" if s["summary"] else "")
+        for i, s in enumerate(plano)
+    )
+    ultima = indice_secao == len(plano) - 1
+    fechamento = (
+        "Termine com um parágrafo de transição para o próximo capítulo."
+        if ultima else
+        "NÃO conclua o capítulo: a próxima seção continua logo em seguida."
+    )
+
+    return f"""Você é um escritor profissional e conhecedor excepcional de literatura. 
+Você está escrevendo UMA seção do capítulo {numero_capitulo} de {total_capitulos} do livro "{titulo_livro}".
+
+**Ideia Principal do Livro:** {ideia_principal}
+**Título do Capítulo:** {titulo_capitulo}
+**Gênero/Tema da História:** {tema_historia}
+**Público-Alvo:** {publico_alvo}
+**Tom/Estilo de Escrita:** {estilo_escrita}
+**Idioma Obrigatório:** {idioma}
+
+**Roteiro completo do capítulo (outras seções são escritas em paralelo):**
+{roteiro}
+
+**Sua seção:** {indice_secao + 1}. {secao['title']}
+**Extensão:** Aproximadamente {palavras_secao} palavras
+
+## Regras OBRIGATÓRIAS:
+
+1. **SOMENTE INFORMAÇÕES REAIS E VERIFICÁVEIS** — Use fatos, dados e uma narrativa que se conecte estritamente com a Ideia Principal do livro especificada.
+2. Escreva OBRIGATORIAMENTE no idioma: **{idioma}**.
+3. Cubra APENAS o conteúdo da sua seção; não repita o que pertence às outras seções do roteiro.
+4. Comece com o cabeçalho `## {secao['title']}` e use `###`, **negrito**, *itálico*, listas e `> citações` quando apropriado.
+5. NÃO inclua o título do capítulo nem introduções genéricas ao capítulo.
+6. {fechamento}
+
+Escreva a seção completa agora:"""
+
+
+async def _secoes_capitulo_longo(
+    titulo_livro: str,
+    titulo_capitulo: str,
+    numero_capitulo: int,
+    total_capitulos: int,
+    paginas: int,
+    tema_historia: str,
+    ideia_principal: str,
+    idioma: str,
+    publico_alvo: str,
+    estilo_escrita: str,
+    usar_cache: bool = True,
+    rapido: bool = False,
+) -> AsyncIterator[str]:
+    """Planeja o capítulo, gera todas as seções em paralelo e as emite na ordem do plano."""
+    palavras_alvo = paginas * _PALAVRAS_POR_PAGINA
+    n_secoes = math.ceil(palavras_alvo / _PALAVRAS_POR_CHAMADA)
+    plano = await _planejar_secoes(
+        titulo_livro, titulo_capitulo, numero_capitulo, total_capitulos, n_secoes,
+        tema_historia, ideia_principal, idioma, usar_cache, rapido,
+    )
+    palavras_secao = palavras_alvo // len(plano)
+    print(f"[Capítulo Longo] '{titulo_capitulo}': {len(plano)} seções de ~{palavras_secao} palavras em paralelo...")
+
+    tarefas = [
+        asyncio.create_task(_gerar_com_retry_async(
+            _montar_prompt_secao(
+                titulo_livro, titulo_capitulo, numero_capitulo, total_capitulos,
+                plano, i, palavras_secao, tema_historia, ideia_principal,
+                idioma, publico_alvo, estilo_escrita,
+            ),
+            usar_cache=usar_cache,
+            rapido=rapido,
+        ))
+        for i in range(len(plano))
+    ]
+    try:
+        for tarefa in tarefas:
+            yield (await tarefa).strip() + "\n\n"
+    finally:
+        for tarefa in tarefas:
+            tarefa.cancel()
+
+
+async def gerar_capitulo_longo_async(
+    titulo_livro: str,
+    titulo_capitulo: str,
+    numero_capitulo: int,
+    total_capitulos: int,
+    paginas: int,
+    tema_historia: str,
+    ideia_principal: str,
+    idioma: str = "Português",
+    publico_alvo: str = "Geral",
+    estilo_escrita: str = "Profissional",
+    usar_cache: bool = True,
+    rapido: bool = False,
+) -> str:
+    """
+    Modo capítulo longo: um plano de seções (chamada barata) seguido das
+    seções geradas concorrentemente com contexto compartilhado e costuradas
+    num único Markdown. Leva ~o tempo de uma seção em vez de uma cadeia de
+    continuações, e respeita a extensão pedida mesmo acima do limite de tokens.
+    """
+    secoes = [
+        secao async for secao in _secoes_capitulo_longo(
+            titulo_livro, titulo_capitulo, numero_capitulo, total_capitulos, paginas,
+            tema_historia, ideia_principal, idioma, publico_alvo, estilo_escrita, usar_cache, rapido,
+        )
+    ]
+    return "".join(secoes).strip()
+
+
+def _montar_prompt_capitulo(
+    titulo_livro: str,
+    titulo_capitulo: str,
+    numero_capitulo: int,
+    total_capitulos: int,
+    paginas: int,
+    tema_historia: str,
+    ideia_principal: str,
+    idioma: str,
+    publico_alvo: str,
+    estilo_escrita: str,
+) -> str:
+    palavras_alvo = paginas * _PALAVRAS_POR_PAGINA
 
     prompt = f"""Você é um escritor profissional e conhecedor excepcional de literatura. 
 Escreva o capítulo {numero_capitulo} de {total_capitulos} para o livro "{titulo_livro}".
@@ -145,13 +749,128 @@ Escreva o capítulo {numero_capitulo} de {total_capitulos} para o livro "{titulo
 
 Escreva o capítulo completo agora:"""
 
-    return _gerar_com_retry(prompt)
+    return prompt
+
+
+async def gerar_capitulos_em_paralelo(
+    titulo_livro: str,
+    capitulos: list[dict],
+    tema_historia: str,
+    ideia_principal: str,
+    idioma: str = "Português",
+    publico_alvo: str = "Geral",
+    estilo_escrita: str = "Profissional",
+    concorrencia: int | None = None,
+    ao_concluir: Optional[Callable[[int, int], None]] = None,
+    usar_cache: bool = True,
+    corretor: Optional[Callable[[str], str]] = None,
+    ao_trecho_inicial: Optional[Callable[[int, str], None]] = None,
+    orcamento: Optional[Orcamento] = None,
+) -> list[str]:
+    """
+    Gera todos os capítulos concorrentemente, com no máximo `concorrencia`
+    chamadas de LLM em voo ao mesmo tempo.
+
+    Parameters
+    ----------
+    capitulos : list[dict]
+        Lista de dicts com 'title' e (opcional) 'pages'.
+    ao_concluir : callable, opcional
+        Chamado como ``ao_concluir(indice, concluidos)`` assim que cada capítulo
+        termina (na ordem de chegada), útil para atualizar o progresso do job.
+    usar_cache : bool
+        False ignora respostas em cache e força nova geração.
+    corretor, ao_trecho_inicial : callable, opcionais
+        Se informados, cada capítulo é gerado em streaming (ver
+        `gerar_capitulo_incremental`): parágrafos são corrigidos assim que
+        fecham e ``ao_trecho_inicial(indice, trecho)`` recebe os primeiros
+        700 caracteres antes do capítulo terminar.
+    orcamento : Orcamento, opcional
+        Prazo do job (ver api.deadline): capítulos que só começam com o prazo
+        em risco usam o modelo mais rápido e/ou dispensam o `corretor`.
+
+    Returns
+    -------
+    list[str]
+        Markdown de cada capítulo, na mesma ordem de `capitulos`.
+    """
+    total = len(capitulos)
+    semaforo = asyncio.Semaphore(max(1, concorrencia or _CONCORRENCIA_PADRAO))
+    concluidos = 0
+
+    async def _um_capitulo(idx: int, ch: dict) -> str:
+        nonlocal concluidos
+        async with semaforo:
+            rapido = orcamento is not None and orcamento.degradar("llm_rapido", idx)
+            revisor = corretor
+            if corretor and orcamento is not None and orcamento.degradar("sem_revisao", idx):
+                revisor = None
+            if corretor or ao_trecho_inicial:
+                content_md = await gerar_capitulo_incremental(
+                    gerar_conteudo_capitulo_stream(
+                        titulo_livro, ch["title"], idx + 1, total, ch.get("pages", 3),
+                        tema_historia, ideia_principal, idioma, publico_alvo, estilo_escrita,
+                        usar_cache, rapido,
+                    ),
+                    corretor=revisor,
+                    ao_trecho_inicial=(lambda trecho: ao_trecho_inicial(idx, trecho)) if ao_trecho_inicial else None,
+                )
+            else:
+                content_md = await gerar_conteudo_capitulo_async(
+                    titulo_livro=titulo_livro,
+                    titulo_capitulo=ch["title"],
+                    numero_capitulo=idx + 1,
+                    total_capitulos=total,
+                    paginas=ch.get("pages", 3),
+                    tema_historia=tema_historia,
+                    ideia_principal=ideia_principal,
+                    idioma=idioma,
+                    publico_alvo=publico_alvo,
+                    estilo_escrita=estilo_escrita,
+                    usar_cache=usar_cache,
+                    rapido=rapido,
+                )
+        concluidos += 1
+        if ao_concluir:
+            ao_concluir(idx, concluidos)
+        return content_md
+
+    # gather preserva a ordem de entrada, independente da ordem de conclusão
+    return list(await asyncio.gather(
+        *(_um_capitulo(idx, ch) for idx, ch in enumerate(capitulos))
+    ))
+
+
+async def gerar_todos_capitulos_async(
+    titulo_livro: str,
+    capitulos: list[dict],
+    usar_cache: bool = True,
+    orcamento: Optional[Orcamento] = None,
+    tema_historia: str = "Geral",
+) -> list[dict]:
+    """
+    Gera os capítulos do formulário e devolve dicts prontos para a pipeline.
+    O tema visual do livro não entra aqui: ele não muda o texto, e assim
+    regerar o livro com outra capa reaproveita os capítulos do cache.
+    """
+    conteudos = await gerar_capitulos_em_paralelo(
+        titulo_livro=titulo_livro,
+        capitulos=capitulos,
+        tema_historia=tema_historia,
+        ideia_principal=titulo_livro,
+        usar_cache=usar_cache,
+        orcamento=orcamento,
+    )
+    return [
+        {"title": ch["title"], "content": content_md, "content_md": content_md}
+        for ch, content_md in zip(capitulos, conteudos)
+    ]
 
 
 def gerar_todos_capitulos(
     titulo_livro: str,
     capitulos: list[dict],
-    tema: str,
+    usar_cache: bool = True,
 ) -> list[dict]:
-    # Mantido para compatibilidade legado, app.py agora chama gerar_conteudo_capitulo diretamente.
-    pass
+    """Versão síncrona de `gerar_todos_capitulos_async` (mantida para compatibilidade)."""
+    return asyncio.run(gerar_todos_capitulos_async(titulo_livro, capitulos, usar_cache))
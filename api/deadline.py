@@ -0,0 +1,124 @@
+"""
+Orçamento de Tempo do Job
+==========================
+Sem prazo, um job com provedores lentos simplesmente demora (e o frontend
+fica consultando /api/status indefinidamente). Com `deadline_s`, o job
+recebe um `Orcamento` que acompanha todas as etapas; cada degradação entra
+quando a fração do prazo já consumida passa do seu limiar:
+
+    llm_rapido      (35%) → capítulos que começam agora usam só o modelo mais
+                            rápido medido (sem re-tentativas nem hedging)
+    sem_revisao     (45%) → LanguageTool pulado nos capítulos restantes
+    menos_imagens   (55%) → frequência de imagens um degrau abaixo
+                            (Todos → a cada 2 → a cada 3 → só capa e índice)
+    arte_pillow     (70%) → provedores de imagem pulados, arte procedural local (FALLBACK_ART);
+                            chamadas já em voo são interrompidas nesse ponto
+
+O PDF nunca é degradado: o restante do prazo fica reservado para ele.
+As degradações aplicadas (com os capítulos afetados) saem em `relatorio()`.
+JOB_DEADLINE_S define um prazo padrão para quem não informar (0 = sem prazo).
+"""
+
+import math
+import os
+import threading
+import time
+
+
+DEFAULT_DEADLINE_S = float(os.getenv("JOB_DEADLINE_S", "0")) or None
+
+# Fração do prazo a partir da qual cada degradação é aplicada (em ordem de entrada)
+LIMIARES = {
+    "llm_rapido": 0.35,
+    "sem_revisao": 0.45,
+    "menos_imagens": 0.55,
+    "arte_pillow": 0.70,
+}
+
+# Modos de `should_generate_image`, do mais ao menos ilustrado
+_ESCADA_FREQUENCIA = (
+    "Em todos os Capítulos",
+    "A cada 2 Capítulos",
+    "A cada 3 Capítulos",
+    "Apenas Capa e Índice",
+)
+
+
+class Orcamento:
+    """Prazo de um job e as degradações aplicadas para cumpri-lo (thread-safe)."""
+
+    def __init__(self, segundos: float | None = None):
+        self.segundos = segundos if segundos and segundos > 0 else None
+        self._inicio = time.monotonic()
+        self._degradacoes: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ativo(self) -> bool:
+        return self.segundos is not None
+
+    def decorrido(self) -> float:
+        return time.monotonic() - self._inicio
+
+    def restante(self) -> float:
+        """Segundos até o prazo (infinito sem prazo; negativo se estourou)."""
+        return self.segundos - self.decorrido() if self.ativo else math.inf
+
+    def ate(self, degradacao: str) -> float | None:
+        """Segundos até o limiar da degradação (None sem prazo); útil como timeout."""
+        if not self.ativo:
+            return None
+        return max(0.0, self.segundos * LIMIARES[degradacao] - self.decorrido())
+
+    def em_risco(self, degradacao: str) -> bool:
+        return self.ativo and self.decorrido() >= self.segundos * LIMIARES[degradacao]
+
+    def degradar(self, degradacao: str, capitulo: int | None = None, detalhe: str | None = None) -> bool:
+        """
+        Se o limiar da degradação já passou, registra-a (para o capítulo, se
+        informado) e retorna True — o chamador então aplica a versão degradada.
+        """
+        if not self.em_risco(degradacao):
+            return False
+        self.registrar(degradacao, capitulo, detalhe)
+        return True
+
+    def registrar(self, degradacao: str, capitulo: int | None = None, detalhe: str | None = None):
+        """Registra uma degradação já aplicada (ex.: chamada interrompida pelo prazo)."""
+        with self._lock:
+            item = self._degradacoes.get(degradacao)
+            if item is None:
+                item = self._degradacoes[degradacao] = {
+                    "tipo": degradacao,
+                    "desde_s": round(self.decorrido(), 1),
+                    "capitulos": [],
+                    "detalhe": detalhe,
+                }
+                print(f"[Prazo] Degradação '{degradacao}' aplicada aos {item['desde_s']}s de {self.segundos:.0f}s.")
+            if capitulo is not None and capitulo + 1 not in item["capitulos"]:
+                item["capitulos"].append(capitulo + 1)
+                item["capitulos"].sort()
+
+    def frequencia(self, pedida: str) -> str:
+        """Modo de frequência de imagens a usar agora: um degrau abaixo do pedido se em risco."""
+        if not self.em_risco("menos_imagens"):
+            return pedida
+        # Modos fora da escada (ex.: "Apenas Imagem de Capa e Hero") ilustram todos os capítulos
+        nivel = _ESCADA_FREQUENCIA.index(pedida) if pedida in _ESCADA_FREQUENCIA else 0
+        return _ESCADA_FREQUENCIA[min(nivel + 1, len(_ESCADA_FREQUENCIA) - 1)]
+
+    def relatorio(self) -> dict:
+        with self._lock:
+            degradacoes = [dict(d, capitulos=list(d["capitulos"])) for d in self._degradacoes.values()]
+        decorrido = self.decorrido()
+        return {
+            "prazo_s": self.segundos,
+            "decorrido_s": round(decorrido, 1),
+            "estourado": self.ativo and decorrido > self.segundos,
+            "degradacoes": sorted(degradacoes, key=lambda d: LIMIARES[d["tipo"]]),
+        }
+
+
+def novo_orcamento(segundos: float | None = None) -> Orcamento:
+    """Orçamento de um job novo (None → JOB_DEADLINE_S)."""
+    return Orcamento(segundos if segundos is not None else DEFAULT_DEADLINE_S)
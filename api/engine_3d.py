@@ -8,16 +8,30 @@ interativo que desenha um livro em 3D giratório no navegador.
 import base64
 import os
 
-def generate_3d_html_cover(cover_image_path: str, title: str, output_html_path: str) -> str:
-    """Gera um arquivo HTML contendo um motor Three.js para renderizar o livro realístico em 3D."""
-    
-    if not os.path.exists(cover_image_path):
+from api import renditions
+from api.asset_store import AssetStore, is_asset_uri
+
+def generate_3d_html_cover(cover_image_path: str, title: str, output_html_path: str, assets: AssetStore = None) -> str:
+    """
+    Gera um arquivo HTML contendo um motor Three.js para renderizar o livro realístico em 3D.
+    A capa entra como a rendition "texture" (potência de dois, sem redimensionamento no WebGL,
+    já recortada na proporção 2:3 da face do livro para não sair esticada);
+    `cover_image_path` pode ser um caminho ou uma URI `asset://` do store do job.
+    """
+    if is_asset_uri(cover_image_path) and assets is not None:
+        item = assets.get(renditions.rendition(assets, cover_image_path, "texture"))
+        if item is None:
+            return None
+        textura, mime = item
+    elif cover_image_path and os.path.exists(cover_image_path):
+        with open(cover_image_path, "rb") as image_file:
+            textura, mime = renditions.gerar(image_file.read(), ["texture"])["texture"]
+    else:
         return None
-        
-    with open(cover_image_path, "rb") as image_file:
-        encoded_string = base64.b64encode(image_file.read()).decode()
-        img_data_uri = f"data:image/jpeg;base64,{encoded_string}"
-        
+
+    encoded_string = base64.b64encode(textura).decode()
+    img_data_uri = f"data:{mime};base64,{encoded_string}"
+
     html_code = f"""<!DOCTYPE html>
 <html lang="pt-BR">
 <head>
@@ -8,13 +8,18 @@ Este módulo contém funções para:
 
 import os
 import re
+from html import escape
+from io import BytesIO
 from pathlib import Path
 import qrcode
 from PIL import Image
 from ebooklib import epub
 
-def generate_qr_code(url: str, output_path: str, color: tuple = (124, 58, 237)):
-    """Gera um QR code elegante para a URL fornecida e salva em output_path."""
+from api import renditions
+from api.asset_store import AssetStore, is_asset_uri
+
+def generate_qr_code(url: str, output_path: str | None, color: tuple = (124, 58, 237)):
+    """Gera um QR code elegante para a URL fornecida e salva em output_path (bytes PNG se None)."""
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -28,14 +33,19 @@ def generate_qr_code(url: str, output_path: str, color: tuple = (124, 58, 237)):
     # Background branco redondo para contraste
     bg = Image.new('RGBA', img.size, (255, 255, 255, 255))
     out = Image.alpha_composite(bg, img)
+    if output_path is None:
+        buffer = BytesIO()
+        out.save(buffer, "PNG")
+        return buffer.getvalue()
     out.save(output_path, "PNG")
     return output_path
 
 
-def inject_qr_codes(content_html: str, assets_dir: str, chapter_idx: int) -> str:
+def inject_qr_codes(content_html: str, assets_dir: str, chapter_idx: int, store: AssetStore = None) -> str:
     """
     Procura links (<a href="...">) no HTML do capítulo.
     Se encontrar, gera QR codes e insere um bloco visual no final do capítulo.
+    Com `store`, os PNGs ficam no asset store do job em vez de `assets_dir`.
     """
     urls = re.findall(r'href=[\'"]?([^\'" >]+)', content_html)
     # Filtra links internos (começam com #)
@@ -50,8 +60,11 @@ def inject_qr_codes(content_html: str, assets_dir: str, chapter_idx: int) -> str
 
     for i, url in enumerate(urls[:4]): # Limita a 4 QRs por cap para espaço
         qr_filename = f"qr_cap{chapter_idx}_{i}.png"
-        qr_path = str(Path(assets_dir) / qr_filename)
-        generate_qr_code(url, qr_path)
+        if store is not None:
+            qr_path = store.put(qr_filename, generate_qr_code(url, None), "image/png")
+        else:
+            qr_path = str(Path(assets_dir) / qr_filename)
+            generate_qr_code(url, qr_path)
         
         qr_block += f"""
         <div style='text-align: center; width: 120px;'>
@@ -69,9 +82,16 @@ def create_epub(
     author: str,
     chapters_data: list[dict],
     output_path: str,
-    cover_image_path: str = None
+    cover_image_path: str = None,
+    assets: AssetStore = None,
+    chapter_images: list[str] = None,
 ) -> str:
-    """Compila os dados dos capítulos em um arquivo .epub usando EbookLib."""
+    """
+    Compila os dados dos capítulos em um arquivo .epub usando EbookLib.
+    `cover_image_path` pode ser um caminho ou uma URI `asset://` do store do job
+    (nesse caso entra a rendition "epub" da imagem).
+    De `chapter_images`, só a arte vetorial (SVG, alguns KB) entra no topo de cada capítulo.
+    """
     book = epub.EpubBook()
 
     # Metadata
@@ -80,7 +100,13 @@ def create_epub(
     book.set_language('pt')
     book.add_author(author)
 
-    if cover_image_path and os.path.exists(cover_image_path):
+    if is_asset_uri(cover_image_path) and assets is not None:
+        item = assets.get(renditions.rendition(assets, cover_image_path, "epub"))
+        if item is not None:
+            data, mime = item
+            extensao = {"image/png": "png", "image/svg+xml": "svg"}.get(mime, "jpg")
+            book.set_cover(f"cover.{extensao}", data)
+    elif cover_image_path and os.path.exists(cover_image_path):
         with open(cover_image_path, 'rb') as f:
             book.set_cover("cover.jpg", f.read())
 
@@ -97,6 +123,14 @@ def create_epub(
         # Estrutura HTML limpa para EPUB
         html_body = chapter.get('content_html') or chapter.get('content', '')
         content = f"<h1>{chapter['title']}</h1><br/>{html_body}"
+
+        ref = chapter_images[i] if chapter_images and i < len(chapter_images) else None
+        arte = assets.get(ref) if assets is not None and is_asset_uri(ref) else None
+        if arte is not None and arte[1] == "image/svg+xml":
+            book.add_item(epub.EpubItem(
+                uid=f"arte_{i}", file_name=f"images/chapter_{i + 1}.svg", media_type="image/svg+xml", content=arte[0]
+            ))
+            content = f'<img src="images/chapter_{i + 1}.svg" alt="{escape(chapter["title"])}"/>' + content
         
         c.content = content
         c.add_item(nav_css)
@@ -0,0 +1,89 @@
+"""
+Executores Dedicados para Trabalho Bloqueante
+==============================================
+Os endpoints da API são `async def`: qualquer chamada bloqueante feita
+direto neles (SDK do Gemini, LanguageTool, Pillow, WeasyPrint, zipfile)
+congela o event loop e, com ele, o /health e o chat de todos os usuários.
+
+Cada tipo de trabalho tem o seu pool, dimensionado separadamente, para que
+uma fila de renders não roube threads das chamadas de LLM (e vice-versa):
+
+- llm    → I/O de rede com provedores (muitas threads, quase sempre esperando)
+- render → CPU: correção, imagens Pillow, layout WeasyPrint, EPUB
+- disk   → escrita de arquivos e empacotamento ZIP
+
+O loop só orquestra: `await run_llm(f, ...)`, `await run_render(f, ...)`...
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+_TAMANHOS = {
+    "llm": int(os.getenv("LLM_IO_WORKERS", "32")),
+    "render": int(os.getenv("RENDER_WORKERS", str(max(1, (os.cpu_count() or 2) - 1)))),
+    "disk": int(os.getenv("DISK_WORKERS", "4")),
+}
+
+_pools: dict[str, ThreadPoolExecutor] = {}
+_pendentes = {nome: 0 for nome in _TAMANHOS}
+_lock = threading.Lock()
+
+
+def get_executor(nome: str) -> ThreadPoolExecutor:
+    """Pool compartilhado do tipo `nome` ("llm", "render" ou "disk"), criado sob demanda."""
+    with _lock:
+        pool = _pools.get(nome)
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=_TAMANHOS[nome], thread_name_prefix=f"bookbot-{nome}")
+            _pools[nome] = pool
+        return pool
+
+
+async def _executar(nome: str, fn, *args, **kwargs):
+    pool = get_executor(nome)
+    with _lock:
+        _pendentes[nome] += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            pool, functools.partial(fn, *args, **kwargs)
+        )
+    finally:
+        with _lock:
+            _pendentes[nome] -= 1
+
+
+async def run_llm(fn, *args, **kwargs):
+    """Executa uma chamada bloqueante de LLM (SDK síncrono) fora do event loop."""
+    return await _executar("llm", fn, *args, **kwargs)
+
+
+async def run_render(fn, *args, **kwargs):
+    """Executa trabalho de CPU (correção, imagens, PDF, EPUB) fora do event loop."""
+    return await _executar("render", fn, *args, **kwargs)
+
+
+async def run_disk(fn, *args, **kwargs):
+    """Executa I/O de disco (ZIP, cópias) fora do event loop."""
+    return await _executar("disk", fn, *args, **kwargs)
+
+
+def stats() -> dict:
+    """Tamanho de cada pool e quantas tarefas estão em execução ou na fila."""
+    with _lock:
+        return {
+            nome: {"workers": _TAMANHOS[nome], "pendentes": _pendentes[nome]}
+            for nome in _TAMANHOS
+        }
+
+
+def shutdown():
+    """Encerra os pools (chamado no shutdown da aplicação)."""
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,169 @@
+"""
+Cache Persistente de Imagens Geradas
+=====================================
+Cache em disco (SQLite) compartilhado entre jobs, endereçado por conteúdo:
+a chave é o SHA-256 de (provedor, prompt normalizado, dimensões, tema).
+Mesmo título/tema/modo colorido → mesma arte, sem nova cobrança nem espera.
+
+- Evicção LRU quando o tamanho total passa de IMAGE_CACHE_MAX_MB
+- Desligável com IMAGE_CACHE_DISABLED=1; `usar_cache=False` no chamador
+  pula a leitura (força arte nova) mas ainda grava o resultado
+- Com o cache ligado, os provedores recebem uma seed derivada da chave
+  (`seed_for`), para que a mesma entrada gere a mesma imagem também do lado deles
+
+O fallback Pillow não é guardado: é determinístico e barato, e guardá-lo
+impediria que um job futuro tentasse de novo os provedores de IA.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+from api.asset_store import sniff_mime
+
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+_DEFAULT_PATH = _PROJECT_ROOT / ".cache" / "image_cache.sqlite3"
+_DEFAULT_MAX_BYTES = int(float(os.getenv("IMAGE_CACHE_MAX_MB", "512")) * 1024 * 1024)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Forma canônica do prompt: Unicode NFC e espaços colapsados."""
+    return " ".join(unicodedata.normalize("NFC", prompt).split())
+
+
+def make_key(provider: str, prompt: str, width: int, height: int, theme: str) -> str:
+    """Hash estável de tudo que define a imagem pedida ao provedor."""
+    payload = json.dumps(
+        {
+            "provider": provider,
+            "prompt": normalize_prompt(prompt),
+            "size": [width, height],
+            "theme": theme,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def seed_for(key: str) -> int:
+    """Seed determinística (31 bits) para o provedor, derivada da chave do cache."""
+    return int(key[:8], 16) & 0x7FFFFFFF
+
+
+class ImageCache:
+    """Cache SQLite de bytes de imagem com evicção LRU por tamanho total."""
+
+    def __init__(self, path: str | Path, max_bytes: int = _DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS images (
+                key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                data BLOB NOT NULL,
+                mime TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_images_last_access ON images(last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> bytes | None:
+        data = self.peek(key)
+        self.record(data is not None)
+        return data
+
+    def peek(self, key: str) -> bytes | None:
+        """Como `get`, mas sem contar hit/miss: quem consulta várias chaves registra uma vez com `record`."""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM images WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE images SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return bytes(row[0])
+
+    def record(self, hit: bool):
+        """Conta o resultado de uma consulta (um capítulo = uma consulta, qualquer que seja o provedor)."""
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def set(self, key: str, provider: str, data: bytes):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO images (key, provider, data, mime, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, sqlite3.Binary(data), sniff_mime(data), len(data), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Remove as imagens menos usadas recentemente até caber em max_bytes."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM images").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excesso = total - self.max_bytes
+        liberado = 0
+        vitimas = []
+        for key, size in self._conn.execute("SELECT key, size FROM images ORDER BY last_access ASC"):
+            vitimas.append((key,))
+            liberado += size
+            if liberado >= excesso:
+                break
+        self._conn.executemany("DELETE FROM images WHERE key = ?", vitimas)
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM images"
+            ).fetchone()
+            por_provedor = dict(self._conn.execute("SELECT provider, COUNT(*) FROM images GROUP BY provider"))
+        consultas = self._hits + self._misses
+        return {
+            "entries": count,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / consultas, 3) if consultas else None,
+            "por_provedor": por_provedor,
+        }
+
+
+_cache: ImageCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ImageCache | None:
+    """Singleton do cache, ou None se desativado via IMAGE_CACHE_DISABLED=1."""
+    global _cache
+    if os.getenv("IMAGE_CACHE_DISABLED", "0") == "1":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ImageCache(os.getenv("IMAGE_CACHE_PATH", str(_DEFAULT_PATH)))
+            except sqlite3.Error as e:
+                print(f"[Cache Imagens] Desativado (Erro: {e})")
+                return None
+        return _cache
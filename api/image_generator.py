@@ -4,83 +4,91 @@ Gerador de Imagens para E-books — IA Gemini + Pillow Fallback
 Gera imagens com IA generativa (Gemini) para cada capítulo.
 Se o modelo de imagem falhar (quota, etc.), cria arte geométrica
 profissional com Pillow como fallback.
+
+Os provedores são chamados de forma assíncrona (httpx com pool de conexões,
+downloads em streaming): os capítulos de um livro geram as imagens em paralelo.
+
+Com FALLBACK_ART=vector, o fallback (e o placeholder do rascunho) é a mesma
+composição em SVG: alguns KB, sem custo de raster nem de compressão, nítida
+em qualquer DPI de impressão.
 """
 
-import base64
+import asyncio
 import hashlib
 import os
 import math
 import random
+import re
+import time
+from functools import lru_cache
+from xml.sax.saxutils import escape
 from io import BytesIO
 from pathlib import Path
 
+import httpx
+import numpy as np
 from PIL import Image, ImageDraw, ImageFilter, ImageFont
 
+from api import executors, image_cache, image_router, themes
+from api.asset_store import AssetStore, sniff_mime
+from api.deadline import Orcamento
+from api.rate_limiter import get_limiter, is_rate_limit_error
+
 # ---------------------------------------------------------------
-# Paletas de cores por tema
+# Paletas de cores por tema (registro único em templates/themes/)
 # ---------------------------------------------------------------
-THEME_PALETTES = {
-    "Minimalista Moderno": {
-        "bg": [(10, 10, 10), (26, 26, 26)],
-        "accent": [(34, 34, 34), (85, 85, 85)],
-        "glow": (100, 100, 100),
-    },
-    "Fantasia Épica": {
-        "bg": [(26, 15, 8), (44, 30, 22)],
-        "accent": [(139, 69, 19), (205, 133, 63)],
-        "glow": (139, 69, 19),
-    },
-    "Corporativo Clean": {
-        "bg": [(10, 22, 40), (21, 34, 56)],
-        "accent": [(0, 51, 102), (26, 115, 232)],
-        "glow": (0, 80, 158),
-    },
-    "Sci-Fi Neon": {
-        "bg": [(5, 6, 8), (11, 12, 16)],
-        "accent": [(69, 162, 158), (102, 252, 241)],
-        "glow": (102, 252, 241),
-    },
-    "Romance Clássico": {
-        "bg": [(26, 15, 18), (45, 31, 36)],
-        "accent": [(183, 110, 121), (209, 141, 150)],
-        "glow": (183, 110, 121),
-    },
-    "Cyberpunk": {
-        "bg": [(5, 1, 8), (18, 4, 29)],
-        "accent": [(255, 0, 255), (243, 230, 0)],
-        "glow": (255, 0, 255),
-    },
-    "Vintage / Retrô": {
-        "bg": [(26, 16, 12), (62, 39, 35)],
-        "accent": [(141, 110, 99), (161, 136, 127)],
-        "glow": (141, 110, 99),
-    },
-    "Aquarela Suave": {
-        "bg": [(10, 25, 41), (26, 47, 69)],
-        "accent": [(93, 173, 226), (174, 214, 241)],
-        "glow": (93, 173, 226),
-    },
-}
+def _get_palette(theme: str) -> dict:
+    return themes.get_theme(theme).palette
 
 
-def _get_palette(theme: str) -> dict:
-    return THEME_PALETTES.get(theme, THEME_PALETTES["Minimalista Moderno"])
+def _dimensoes(colorful_mode: bool) -> tuple[int, int]:
+    """Tamanho final das imagens: página inteira no modo colorido, faixa 16:9 no normal."""
+    return (800, 1200) if colorful_mode else (800, 450)
+
+
+# ---------------------------------------------------------------
+# Cliente HTTP assíncrono (um por lote de imagens)
+# ---------------------------------------------------------------
+# Teto global de imagens simultâneas; cada provedor tem o seu no rate limiter
+IMAGE_CONCURRENCY = int(os.getenv("IMAGE_CONCURRENCY", "8"))
+_MAX_DOWNLOAD_BYTES = 20 * 1024 * 1024
+# Arte procedural do fallback: "raster" (JPEG via Pillow) ou "vector" (SVG)
+FALLBACK_ART = os.getenv("FALLBACK_ART", "raster")
+
+
+def novo_cliente_http() -> httpx.AsyncClient:
+    """Cliente com pool de conexões, compartilhado por todas as imagens de um lote (ou job)."""
+    return httpx.AsyncClient(
+        headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"},
+        limits=httpx.Limits(max_connections=IMAGE_CONCURRENCY * 2, max_keepalive_connections=IMAGE_CONCURRENCY),
+        follow_redirects=True,
+    )
+
+
+async def _baixar(client: httpx.AsyncClient, url: str, timeout: float) -> bytes:
+    """Download em streaming (com teto de tamanho) da imagem gerada pelo provedor."""
+    dados = bytearray()
+    async with client.stream("GET", url, timeout=timeout) as resposta:
+        resposta.raise_for_status()
+        async for bloco in resposta.aiter_bytes():
+            dados.extend(bloco)
+            if len(dados) > _MAX_DOWNLOAD_BYTES:
+                raise ValueError(f"Imagem maior que {_MAX_DOWNLOAD_BYTES // (1024 * 1024)} MB")
+    return bytes(dados)
 
 
 # ---------------------------------------------------------------
 # Tentativa 1: Nano Banana (gemini-2.5-flash-image-preview)
 # ---------------------------------------------------------------
-def _try_gemini_image(prompt: str, output_path: str, colorful_mode: bool = False) -> bool:
+async def _try_gemini_image(prompt: str, colorful_mode: bool = False, seed: int | None = None) -> bytes | None:
     """Tenta gerar imagem via Gemini Nano Banana (gemini-2.5-flash-image).
     Usa generate_content com response_modalities=['image'] para native image generation.
-    Implementa backoff exponencial conforme regras Antigravity.
-    Retorna True se sucesso.
+    O backoff fica a cargo do rate limiter compartilhado (sem sleep no caminho da requisição).
+    Retorna os bytes (JPEG) se sucesso.
     """
-    import time
-
     api_key = os.getenv("GEMINI_API_KEY", "")
     if not api_key:
-        return False
+        return None
 
     try:
         from google import genai
@@ -88,342 +96,714 @@ def _try_gemini_image(prompt: str, output_path: str, colorful_mode: bool = False
 
         client = genai.Client(api_key=api_key)
 
-        # Backoff exponencial: 3 tentativas (1s, 2s, 4s)
+        # 3 tentativas; após um 429 o limitador reduz a vazão e a próxima espera na fila
+        limiter = get_limiter("gemini-image", "gemini-2.5-flash-image")
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                response = client.models.generate_content(
-                    model="gemini-2.5-flash-image",
-                    contents=prompt,
-                    config=types.GenerateContentConfig(
-                        response_modalities=["IMAGE"],
-                    ),
-                )
+                async with limiter.acquire_async():
+                    response = await client.aio.models.generate_content(
+                        model="gemini-2.5-flash-image",
+                        contents=prompt,
+                        config=types.GenerateContentConfig(
+                            response_modalities=["IMAGE"],
+                            seed=seed,
+                        ),
+                    )
 
                 # Extract image from response parts
                 if response.candidates and response.candidates[0].content.parts:
                     for part in response.candidates[0].content.parts:
                         if part.inline_data and part.inline_data.mime_type.startswith("image/"):
-                            img_bytes = part.inline_data.data
-                            img = Image.open(BytesIO(img_bytes))
-
-                            # Resize to match ebook constraints
-                            if colorful_mode:
-                                img = img.resize((800, 1200), Image.LANCZOS)
-                            else:
-                                img = img.resize((800, 450), Image.LANCZOS)
-
-                            img.save(output_path, format="JPEG", quality=92)
-                            print(f"[IMG] ✓ Nano Banana gerou imagem: {output_path}")
-                            return True
+                            data = await asyncio.to_thread(_ajustar_gemini, part.inline_data.data, colorful_mode)
+                            print("[IMG] ✓ Nano Banana gerou imagem.")
+                            return data
 
                 print(f"[IMG] Nano Banana: resposta sem imagem (tentativa {attempt+1})")
-                return False
+                return None
 
             except Exception as retry_err:
                 err_str = str(retry_err)
-                if "429" in err_str or "quota" in err_str.lower() or "rate" in err_str.lower():
-                    wait = 2 ** attempt  # 1s, 2s, 4s
-                    print(f"[IMG] Rate limit Nano Banana, aguardando {wait}s (tentativa {attempt+1}/{max_retries})...")
-                    time.sleep(wait)
+                if is_rate_limit_error(retry_err) or "rate" in err_str.lower():
+                    print(f"[IMG] Rate limit Nano Banana, reenfileirando (tentativa {attempt+1}/{max_retries})...")
                     continue
                 else:
                     print(f"[IMG] Nano Banana erro: {err_str[:120]}")
-                    return False
+                    return None
 
-        return False
+        return None
 
     except Exception as e:
         print(f"[IMG] Nano Banana falhou: {str(e)[:120]}")
-        return False
+        return None
+
+
+def _ajustar_gemini(img_bytes: bytes, colorful_mode: bool) -> bytes:
+    """Redimensiona para o formato do e-book e reencoda em JPEG (CPU: roda fora do loop)."""
+    img = Image.open(BytesIO(img_bytes))
+    if colorful_mode:
+        img = img.resize((800, 1200), Image.LANCZOS)
+    else:
+        img = img.resize((800, 450), Image.LANCZOS)
+    buffer = BytesIO()
+    img.convert("RGB").save(buffer, format="JPEG", quality=92)
+    return buffer.getvalue()
 
 
 # ---------------------------------------------------------------
 # Fallback 1: Pollinations.ai (Free Text-to-Image AI)
 # ---------------------------------------------------------------
-def _try_pollinations_image(prompt: str, output_path: str, colorful_mode: bool = False) -> bool:
+async def _try_pollinations_image(
+    client: httpx.AsyncClient, prompt: str, colorful_mode: bool = False, seed: int | None = None
+) -> bytes | None:
     """Fallback gratuito que gera imagens por IA caso o Gemini seja barrado por Payload/Billing."""
     try:
-        import urllib.request
         from urllib.parse import quote_plus
         
-        W, H = (800, 1200) if colorful_mode else (800, 450)
-        # Adding seed to bypass cache occasionally, though not strictly required
-        seed = random.randint(1, 999999)
+        W, H = _dimensoes(colorful_mode)
+        # Seed fixa com o cache de imagens ligado (mesma entrada → mesma arte); senão, aleatória
+        if seed is None:
+            seed = random.randint(1, 999999)
         url = f"https://image.pollinations.ai/prompt/{quote_plus(prompt)}?width={W}&height={H}&nologo=true&seed={seed}"
         
-        req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'})
-        with urllib.request.urlopen(req, timeout=6) as response, open(output_path, 'wb') as out_file:
-            out_file.write(response.read())
+        async with get_limiter("pollinations").acquire_async():
+            data = await _baixar(client, url, timeout=6)
             
-        print(f"[IMG] ✓ Pollinations.ai gerou imagem: {output_path}")
-        return True
+        print("[IMG] ✓ Pollinations.ai gerou imagem.")
+        return data
     except Exception as e:
         print(f"[IMG] Pollinations falhou: {str(e)[:100]}, usando fallback geométrico Pillow")
-        return False
+        return None
 
 
 # ---------------------------------------------------------------
 # Fallback 1.5: Replicate (Flux.1 / SDXL LoRAs)
 # ---------------------------------------------------------------
-def _try_replicate_image(prompt: str, output_path: str, colorful_mode: bool = False, theme: str = "") -> bool:
+async def _try_replicate_image(
+    client: httpx.AsyncClient, prompt: str, colorful_mode: bool = False, theme: str = "", seed: int | None = None
+) -> bytes | None:
     """Motor Visual Premium via API Replicate (Modelos Open-Source State-of-the-Art)"""
     replicate_api_token = os.getenv("REPLICATE_API_TOKEN", "")
     if not replicate_api_token:
-        return False
+        return None
         
     try:
         import replicate
-        import urllib.request
         
         # Flux.1-schnell (Extremamente rápido e altamente responsivo a estilos complexos)
         model_id = "black-forest-labs/flux-schnell" 
         print(f"[IMG] Replicate LPU (Flux.1) acionado. Processando renderização para o estilo '{theme}'...")
+        entrada = {
+            "prompt": prompt,
+            "go_fast": True,
+            "num_outputs": 1,
+            "aspect_ratio": "9:16" if colorful_mode else "16:9",
+            "output_format": "jpg",
+            "output_quality": 85
+        }
+        if seed is not None:
+            entrada["seed"] = seed
         
-        output = replicate.run(
-            model_id,
-            input={
-                "prompt": prompt,
-                "go_fast": True,
-                "num_outputs": 1,
-                "aspect_ratio": "9:16" if colorful_mode else "16:9",
-                "output_format": "jpg",
-                "output_quality": 85
-            }
-        )
+        async with get_limiter("replicate", model_id).acquire_async():
+            if hasattr(replicate, "async_run"):
+                output = await replicate.async_run(model_id, input=entrada)
+            else:
+                output = await asyncio.to_thread(replicate.run, model_id, input=entrada)
         
         if output and len(output) > 0:
             url = output[0]
             if not isinstance(url, str):
                  url = str(url) # Parser de obj para str
             
-            req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-            with urllib.request.urlopen(req, timeout=20) as response, open(output_path, 'wb') as out_file:
-                out_file.write(response.read())
-            print(f"[IMG] ✓ Replicate LPU gerou a ilustração com sucesso: {output_path}")
-            return True
+            data = await _baixar(client, url, timeout=20)
+            print("[IMG] ✓ Replicate LPU gerou a ilustração com sucesso.")
+            return data
             
-        return False
+        return None
     except Exception as e:
         print(f"[IMG] Replicate LPU falhou (Pode estar sem GPU allocada ou key invalida): {str(e)[:100]}")
-        return False
+        return None
 
 
 # ---------------------------------------------------------------
 # Fallback 2: Pillow — Arte Geométrica Profissional
 # ---------------------------------------------------------------
+# Família do título no pacote de fontes (templates/fonts, ver url_fetcher);
+# sem o pacote, DejaVu (fonts-dejavu no Dockerfile) e por fim a fonte do Pillow
+_FONTE_FAMILIA = "Inter"
+_FONTES_SISTEMA = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "DejaVuSans.ttf",
+    "segoeui.ttf",
+)
+
+# Anéis do orbe de brilho (raio 120 → 2, de 2 em 2, alpha crescente para o centro).
+# Cada anel sobrescreve o anterior: o pixel fica com o alpha do menor anel que o cobre
+# → tabela indexada pela distância ao centro, aplicada de uma vez.
+_GLOW_RAIOS = np.arange(120, 0, -2)
+_GLOW_ALPHAS = (40 * (1 - _GLOW_RAIOS / 120)).astype(int) / 255.0
+
+
+@lru_cache(maxsize=1)
+def _arquivo_fonte() -> str | None:
+    """Arquivo TTF da família do título no pacote local (peso 600), se baixado."""
+    from api.url_fetcher import FONTS_DIR
+
+    css = FONTS_DIR / "fonts.css"
+    if not css.exists():
+        return None
+    for bloco in re.findall(r"@font-face\s*{([^}]*)}", css.read_text(encoding="utf-8")):
+        if f"'{_FONTE_FAMILIA}'" in bloco and "font-style: normal" in bloco and "font-weight: 600" in bloco:
+            arquivo = re.search(r"url\(([^)]+)\)", bloco)
+            if arquivo and (FONTS_DIR / arquivo.group(1)).exists():
+                return str(FONTS_DIR / arquivo.group(1))
+    return None
+
+
+@lru_cache(maxsize=8)
+def _fonte(tamanho: int) -> ImageFont.ImageFont:
+    """Fonte do card, resolvida uma vez por tamanho e reaproveitada entre imagens."""
+    for candidato in (_arquivo_fonte(), *_FONTES_SISTEMA):
+        if not candidato:
+            continue
+        try:
+            return ImageFont.truetype(candidato, tamanho)
+        except OSError:
+            continue
+    return ImageFont.load_default(tamanho)
+
+
+def _misturar(buf: np.ndarray, ys: slice, xs: slice, cor, alpha: float, mascara=None):
+    """Compõe `cor` sobre a região do buffer (in-place), com cobertura opcional por pixel."""
+    regiao = buf[ys, xs]
+    if regiao.size == 0:
+        return
+    peso = alpha if mascara is None else (alpha * mascara)[..., None]
+    regiao += (np.asarray(cor, dtype=np.float32) - regiao) * peso
+
+
+def _recorte(inicio: float, fim: float, limite: int) -> slice:
+    """Intervalo [inicio, fim] recortado à imagem (vazio se estiver todo fora)."""
+    comeco = min(limite, max(0, int(math.floor(inicio))))
+    return slice(comeco, max(comeco, min(limite, int(math.ceil(fim)) + 1)))
+
+
 def _create_pillow_image(
     chapter_title: str,
     chapter_index: int,
     theme: str,
-    output_path: str,
     colorful_mode: bool = False,
-) -> str:
-    """Cria arte geométrica profissional com Pillow."""
+) -> bytes:
+    """
+    Cria arte geométrica profissional (JPEG), determinística por título.
+
+    Gradiente, formas e brilho são calculados com NumPy num único buffer
+    float (cada forma só toca a própria caixa); o Pillow fica com o blur,
+    o card arredondado e o texto.
+    """
     palette = _get_palette(theme)
-    W, H = (800, 1200) if colorful_mode else (800, 450)
+    W, H = _dimensoes(colorful_mode)
     seed = int(hashlib.md5(chapter_title.encode()).hexdigest()[:8], 16)
     rng = random.Random(seed)
 
-    # Gradient background
-    img = Image.new("RGB", (W, H))
-    draw = ImageDraw.Draw(img)
-    bg1, bg2 = palette["bg"]
-    for y in range(H):
-        r = int(bg1[0] + (bg2[0] - bg1[0]) * y / H)
-        g = int(bg1[1] + (bg2[1] - bg1[1]) * y / H)
-        b = int(bg1[2] + (bg2[2] - bg1[2]) * y / H)
-        draw.line([(0, y), (W, y)], fill=(r, g, b))
+    # Gradient background (broadcast de uma coluna para a largura toda)
+    bg1, bg2 = (np.asarray(c, dtype=np.float32) for c in palette["bg"])
+    coluna = np.floor(bg1 + (bg2 - bg1) * (np.arange(H, dtype=np.float32) / H)[:, None])
+    buf = np.ascontiguousarray(np.broadcast_to(coluna[:, None, :], (H, W, 3)))
 
-    # Geometric shapes
+    # Geometric shapes (mesma sequência do rng: mesmas formas por título)
     accent1, accent2 = palette["accent"]
     for _ in range(rng.randint(8, 15)):
         shape_type = rng.choice(["circle", "line", "rect"])
-        alpha = rng.randint(15, 60)
-        overlay = Image.new("RGBA", (W, H), (0, 0, 0, 0))
-        odraw = ImageDraw.Draw(overlay)
-        col = (
-            rng.choice([accent1, accent2, palette["glow"]])
-            + (alpha,)
-        )
+        alpha = rng.randint(15, 60) / 255.0
+        col = rng.choice([accent1, accent2, palette["glow"]])
 
         if shape_type == "circle":
             cx = rng.randint(-100, W + 100)
             cy = rng.randint(-100, H + 100)
             radius = rng.randint(40, 200)
-            odraw.ellipse([cx - radius, cy - radius, cx + radius, cy + radius], fill=col)
+            ys, xs = _recorte(cy - radius, cy + radius, H), _recorte(cx - radius, cx + radius, W)
+            yy = np.arange(ys.start, ys.stop, dtype=np.float32)[:, None] - cy
+            xx = np.arange(xs.start, xs.stop, dtype=np.float32)[None, :] - cx
+            _misturar(buf, ys, xs, col, alpha, (xx * xx + yy * yy <= radius * radius).astype(np.float32))
         elif shape_type == "line":
             x1, y1 = rng.randint(0, W), rng.randint(0, H)
             angle = rng.uniform(0, math.pi * 2)
             length = rng.randint(100, 500)
             x2 = int(x1 + math.cos(angle) * length)
             y2 = int(y1 + math.sin(angle) * length)
-            odraw.line([(x1, y1), (x2, y2)], fill=col, width=rng.randint(1, 4))
+            meia = rng.randint(1, 4) / 2
+            ys = _recorte(min(y1, y2) - meia, max(y1, y2) + meia, H)
+            xs = _recorte(min(x1, x2) - meia, max(x1, x2) + meia, W)
+            # Distância de cada pixel da caixa ao segmento
+            py = np.arange(ys.start, ys.stop, dtype=np.float32)[:, None] - y1
+            px = np.arange(xs.start, xs.stop, dtype=np.float32)[None, :] - x1
+            dx, dy = x2 - x1, y2 - y1
+            t = np.clip((px * dx + py * dy) / max(dx * dx + dy * dy, 1), 0, 1)
+            dist2 = (px - t * dx) ** 2 + (py - t * dy) ** 2
+            _misturar(buf, ys, xs, col, alpha, (dist2 <= max(meia, 0.5) ** 2).astype(np.float32))
         else:
             x1 = rng.randint(-50, W - 50)
             y1 = rng.randint(-50, H - 50)
             w = rng.randint(30, 150)
             h = rng.randint(30, 150)
-            odraw.rectangle([x1, y1, x1 + w, y1 + h], fill=col)
-
-        img = Image.alpha_composite(img.convert("RGBA"), overlay).convert("RGB")
+            _misturar(buf, _recorte(y1, y1 + h, H), _recorte(x1, x1 + w, W), col, alpha)
 
     # Apply blur for soft look
-    img = img.filter(ImageFilter.GaussianBlur(radius=3))
+    img = Image.fromarray(buf.astype(np.uint8), "RGB").filter(ImageFilter.GaussianBlur(radius=3))
 
-    # Glow orb
-    glow_overlay = Image.new("RGBA", (W, H), (0, 0, 0, 0))
-    gdraw = ImageDraw.Draw(glow_overlay)
+    # Glow orb: os 60 anéis viram uma consulta na tabela pela distância ao centro
     gx = rng.randint(W // 4, 3 * W // 4)
     gy = rng.randint(H // 4, 3 * H // 4)
-    for r in range(120, 0, -2):
-        a = int(40 * (1 - r / 120))
-        gdraw.ellipse(
-            [gx - r, gy - r, gx + r, gy + r],
-            fill=palette["glow"] + (a,),
-        )
-    img = Image.alpha_composite(img.convert("RGBA"), glow_overlay).convert("RGB")
-
-    # Glass card overlay with chapter title
+    ys, xs = _recorte(gy - 120, gy + 120, H), _recorte(gx - 120, gx + 120, W)
+    yy = np.arange(ys.start, ys.stop, dtype=np.float32)[:, None] - gy
+    xx = np.arange(xs.start, xs.stop, dtype=np.float32)[None, :] - gx
+    dist = np.sqrt(xx * xx + yy * yy)
+    # Anéis que cobrem o pixel (raio ≥ distância) são os índices 0..k; vale o k
+    k = np.searchsorted(-_GLOW_RAIOS, -dist, side="right") - 1
+    peso = np.where(k >= 0, _GLOW_ALPHAS[np.maximum(k, 0)], 0.0).astype(np.float32)
+    glow = np.asarray(palette["glow"], dtype=np.float32)
+    caixa = (xs.start, ys.start, xs.stop, ys.stop)
+    regiao = np.asarray(img.crop(caixa), dtype=np.float32)
+    img.paste(Image.fromarray((regiao + (glow - regiao) * peso[..., None]).astype(np.uint8), "RGB"), caixa[:2])
+    img = img.convert("RGBA")
+
+    # Glass card overlay with chapter title (composto só na área do card)
     card_w, card_h = 420, 100
     card_x = (W - card_w) // 2
     card_y = (H - card_h) // 2
-    card_overlay = Image.new("RGBA", (W, H), (0, 0, 0, 0))
+    card_overlay = Image.new("RGBA", (card_w + 1, card_h + 1), (0, 0, 0, 0))
     cdraw = ImageDraw.Draw(card_overlay)
-    cdraw.rounded_rectangle(
-        [card_x, card_y, card_x + card_w, card_y + card_h],
-        radius=16,
-        fill=(20, 20, 40, 140),
-    )
-    cdraw.rounded_rectangle(
-        [card_x, card_y, card_x + card_w, card_y + card_h],
-        radius=16,
-        outline=accent1 + (80,),
-        width=1,
-    )
+    cdraw.rounded_rectangle([0, 0, card_w, card_h], radius=16, fill=(20, 20, 40, 140))
+    cdraw.rounded_rectangle([0, 0, card_w, card_h], radius=16, outline=accent1 + (80,), width=1)
 
     # Title text
-    try:
-        font = ImageFont.truetype("segoeui.ttf", 22)
-    except OSError:
-        font = ImageFont.load_default()
+    font = _fonte(22)
     text = chapter_title[:40]
     bbox = cdraw.textbbox((0, 0), text, font=font)
     tw = bbox[2] - bbox[0]
-    tx = card_x + (card_w - tw) // 2
-    ty = card_y + (card_h - 28) // 2
-    cdraw.text((tx, ty), text, font=font, fill=(255, 255, 255, 230))
+    cdraw.text(((card_w - tw) // 2, (card_h - 28) // 2), text, font=font, fill=(255, 255, 255, 230))
 
     # Chapter number badge
-    num_text = f"Cap. {chapter_index + 1}"
-    try:
-        small_font = ImageFont.truetype("segoeui.ttf", 12)
-    except OSError:
-        small_font = ImageFont.load_default()
-    cdraw.text((card_x + 15, card_y + 10), num_text, font=small_font, fill=accent2 + (200,))
-
-    img = Image.alpha_composite(img.convert("RGBA"), card_overlay).convert("RGB")
-    img.save(output_path, quality=92)
-    print(f"[IMG] ✓ Pillow gerou imagem: {output_path}")
-    return output_path
+    cdraw.text((15, 10), f"Cap. {chapter_index + 1}", font=_fonte(12), fill=accent2 + (200,))
+
+    img.alpha_composite(card_overlay, dest=(card_x, card_y))
+    # JPEG como os provedores de IA (o encode PNG custava tanto quanto o resto da arte);
+    # sem subamostragem de cor para o texto do card continuar nítido
+    buffer = BytesIO()
+    img.convert("RGB").save(buffer, format="JPEG", quality=92, subsampling=0)
+    print(f"[IMG] ✓ Pillow gerou imagem: capítulo {chapter_index + 1}")
+    return buffer.getvalue()
+
+
+# ---------------------------------------------------------------
+# Fallback 2 (vetorial): mesma composição em SVG
+# ---------------------------------------------------------------
+def _rgb(cor) -> str:
+    return "rgb({},{},{})".format(*cor[:3])
+
+
+def _create_svg_image(
+    chapter_title: str,
+    chapter_index: int,
+    theme: str,
+    colorful_mode: bool = False,
+) -> bytes:
+    """
+    A arte de `_create_pillow_image` como SVG: mesma seed e mesma sequência do
+    rng, logo as mesmas formas por título. O blur fica de fora (o renderizador
+    SVG do WeasyPrint não aplica feGaussianBlur) e os anéis do brilho viram um
+    gradiente radial. Os ids levam o índice do capítulo, pois o SVG vai inline no HTML.
+    """
+    palette = _get_palette(theme)
+    W, H = _dimensoes(colorful_mode)
+    seed = int(hashlib.md5(chapter_title.encode()).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    n = chapter_index + 1
+
+    bg1, bg2 = palette["bg"]
+    accent1, accent2 = palette["accent"]
+    formas = []
+    for _ in range(rng.randint(8, 15)):
+        shape_type = rng.choice(["circle", "line", "rect"])
+        alpha = rng.randint(15, 60) / 255.0
+        col = _rgb(rng.choice([accent1, accent2, palette["glow"]]))
+
+        if shape_type == "circle":
+            cx = rng.randint(-100, W + 100)
+            cy = rng.randint(-100, H + 100)
+            radius = rng.randint(40, 200)
+            formas.append(f'<circle cx="{cx}" cy="{cy}" r="{radius}" fill="{col}" fill-opacity="{alpha:.3f}"/>')
+        elif shape_type == "line":
+            x1, y1 = rng.randint(0, W), rng.randint(0, H)
+            angle = rng.uniform(0, math.pi * 2)
+            length = rng.randint(100, 500)
+            x2 = int(x1 + math.cos(angle) * length)
+            y2 = int(y1 + math.sin(angle) * length)
+            largura = rng.randint(1, 4)
+            formas.append(
+                f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" stroke="{col}" '
+                f'stroke-opacity="{alpha:.3f}" stroke-width="{largura}"/>'
+            )
+        else:
+            x1 = rng.randint(-50, W - 50)
+            y1 = rng.randint(-50, H - 50)
+            w = rng.randint(30, 150)
+            h = rng.randint(30, 150)
+            formas.append(f'<rect x="{x1}" y="{y1}" width="{w}" height="{h}" fill="{col}" fill-opacity="{alpha:.3f}"/>')
+
+    gx = rng.randint(W // 4, 3 * W // 4)
+    gy = rng.randint(H // 4, 3 * H // 4)
+    card_w, card_h = 420, 100
+    card_x = (W - card_w) // 2
+    card_y = (H - card_h) // 2
+    fonte = f"{_FONTE_FAMILIA}, DejaVu Sans, sans-serif"
+
+    svg = f"""<svg xmlns="http://www.w3.org/2000/svg" width="{W}" height="{H}" viewBox="0 0 {W} {H}" preserveAspectRatio="xMidYMid slice">
+<defs>
+<linearGradient id="fundo-{n}" x1="0" y1="0" x2="0" y2="1"><stop offset="0" stop-color="{_rgb(bg1)}"/><stop offset="1" stop-color="{_rgb(bg2)}"/></linearGradient>
+<radialGradient id="brilho-{n}"><stop offset="0" stop-color="{_rgb(palette["glow"])}" stop-opacity="{40 / 255:.3f}"/><stop offset="1" stop-color="{_rgb(palette["glow"])}" stop-opacity="0"/></radialGradient>
+</defs>
+<rect width="{W}" height="{H}" fill="url(#fundo-{n})"/>
+{chr(10).join(formas)}
+<circle cx="{gx}" cy="{gy}" r="120" fill="url(#brilho-{n})"/>
+<rect x="{card_x}" y="{card_y}" width="{card_w}" height="{card_h}" rx="16" fill="rgb(20,20,40)" fill-opacity="{140 / 255:.3f}" stroke="{_rgb(accent1)}" stroke-opacity="{80 / 255:.3f}"/>
+<text x="{W // 2}" y="{card_y + card_h // 2}" font-family="{fonte}" font-size="22" font-weight="600" fill="#fff" fill-opacity="{230 / 255:.3f}" text-anchor="middle" dominant-baseline="central">{escape(chapter_title[:40])}</text>
+<text x="{card_x + 15}" y="{card_y + 22}" font-family="{fonte}" font-size="12" fill="{_rgb(accent2)}" fill-opacity="{200 / 255:.3f}">Cap. {n}</text>
+</svg>"""
+    print(f"[IMG] ✓ SVG gerado: capítulo {n}")
+    return svg.encode("utf-8")
+
+
+def _criar_arte(chapter_title: str, chapter_index: int, theme: str, colorful_mode: bool = False) -> bytes:
+    """Arte procedural no formato de FALLBACK_ART (SVG ou JPEG)."""
+    criar = _create_svg_image if FALLBACK_ART == "vector" else _create_pillow_image
+    return criar(chapter_title=chapter_title, chapter_index=chapter_index, theme=theme, colorful_mode=colorful_mode)
 
 
 # ---------------------------------------------------------------
 # API Pública
 # ---------------------------------------------------------------
-def generate_all_images(
-    chapters: list[dict],
+def should_generate_image(index: int, frequency: str, orcamento: Orcamento | None = None) -> bool:
+    """
+    Regra de Frequência de Imagens (reduz chamadas à API).
+    Com o prazo do job em risco, vale a frequência um degrau abaixo (ver Orcamento.frequencia).
+    """
+    if orcamento is not None and should_generate_image(index, frequency):
+        reduzida = orcamento.frequencia(frequency)
+        if not should_generate_image(index, reduzida):
+            orcamento.registrar("menos_imagens", index, f"{frequency} → {reduzida}")
+            return False
+        return True
+    if frequency == "Nenhuma Imagem":
+        return False
+    elif frequency == "Apenas Capa e Índice" and index > 1:
+        return False
+    elif frequency == "A cada 2 Capítulos" and index % 2 != 0:
+        return False
+    elif frequency == "A cada 3 Capítulos" and index % 3 != 0:
+        return False
+    return True
+
+
+def build_image_prompt(chapter_title: str, content_snippet: str, theme: str, colorful_mode: bool = False) -> str:
+    """Prompt dinâmico de IA (Ilustração vs Corporativo/Educação) a partir do início do capítulo."""
+    chapter_content_snippet = content_snippet[:700].replace("\n", " ").strip()
+
+    is_corporate = any(kw in theme for kw in ["Wireframes", "Business", "Infográficos", "Gráficos", "Minimalista"])
+    
+    if is_corporate:
+        if colorful_mode:
+             return (
+                f"Vertical portrait wallpaper 9:16 aspect ratio. Create a clean, professional, high-end {theme} background "
+                f"for a business or academic chapter titled '{chapter_title}'. The visual should be abstract, conceptual, "
+                f"or a clean diagram loosely inspired by: '{chapter_content_snippet}'. No text in the image. "
+                f"Corporate, clean presentation style."
+            )
+        else:
+             return (
+                f"Create a clean, professional, high-end {theme} specific graphic, chart, or illustration "
+                f"for a business or academic chapter titled '{chapter_title}'. Ensure it looks like a premium "
+                f"editorial asset, loosely inspired by: '{chapter_content_snippet}'. No text in the image. "
+                f"Corporate, clean presentation style."
+            )
+
+    # IA inteligente para ler cenas: Se tiver dialogo ou lutas e for mangá/ficção:
+    is_action_scene = any(word in chapter_content_snippet.lower() for word in ["espada", "luta", "correu", "tiro", "sangue", "grito"])
+    is_dialog_scene = ("\"" in chapter_content_snippet or "—" in chapter_content_snippet or "disse" in chapter_content_snippet.lower())
+    
+    scene_focus = "focus on the characters, hero, and environment"
+    if is_action_scene:
+        scene_focus = "focus heavily on the high-stakes action scene, combat motion, and dramatic environment"
+    elif is_dialog_scene:
+        scene_focus = "focus on an expressive dialogue scene between characters, showing their emotions and interactions"
+
+    if colorful_mode:
+        return (
+            f"Vertical portrait wallpaper 9:16 aspect ratio. Create a highly detailed illustration for a book chapter titled "
+            f"'{chapter_title}'. The visual MUST vividly {scene_focus} described in this excerpt: "
+            f"'{chapter_content_snippet}'. Style: {theme}. The image should be an edge-to-edge wallpaper, "
+            f"immersively capturing the specific scene moment. No text."
+        )
+    return (
+        f"Create a highly detailed, elegant illustration for a book chapter titled "
+        f"'{chapter_title}'. The visual MUST vividly {scene_focus} described in this excerpt: "
+        f"'{chapter_content_snippet}'. Style: {theme}. The image should be atmospheric "
+        f"and capture the scene specifically. No text in the image. "
+        f"Wide format (16:9), high quality, editorial illustration style."
+    )
+
+
+async def generate_chapter_image_async(
+    client: httpx.AsyncClient,
+    chapter_title: str,
+    chapter_index: int,
+    content_snippet: str,
     theme: str,
-    assets_dir: str,
+    assets_dir: str = None,
     colorful_mode: bool = False,
-    frequency: str = "Em todos os Capítulos"
-) -> list[str]:
-    """Gera imagens para cada capítulo (Gemini → Pillow fallback). Respeita frequência definida."""
-    Path(assets_dir).mkdir(parents=True, exist_ok=True)
-    paths = []
-
-    for i, chapter in enumerate(chapters):
-        # Validação da Regra de Frequência de Imagens (Reduz chamadas a API)
-        should_generate = True
-        if frequency == "Nenhuma Imagem":
-            should_generate = False
-        elif frequency == "Apenas Capa e Índice" and i > 1:
-            should_generate = False
-        elif frequency == "A cada 2 Capítulos" and i % 2 != 0:
-            should_generate = False
-        elif frequency == "A cada 3 Capítulos" and i % 3 != 0:
-            should_generate = False
-            
-        if not should_generate:
-            paths.append(None)
+    store: AssetStore = None,
+    usar_cache: bool = True,
+    rota_saida: dict = None,
+    orcamento: Orcamento = None,
+) -> str:
+    """
+    Gera a imagem de um único capítulo (provedores de IA na ordem do roteador → Pillow).
+
+    Com `store`, os bytes ficam no asset store do job e o retorno é a URI
+    `asset://`; sem ele, a imagem é gravada em `assets_dir` e o retorno é o caminho.
+    Antes de qualquer provedor, consulta o cache de imagens (ver image_cache);
+    `usar_cache=False` ignora a leitura (força arte nova).
+    `rota_saida` recebe a decisão de roteamento (ver image_router.planejar).
+    Com `orcamento`, a arte vai direto para o Pillow quando o prazo do job entra
+    em risco, e uma chamada em voo é interrompida nesse mesmo ponto.
+    """
+    ai_prompt = build_image_prompt(chapter_title, content_snippet, theme, colorful_mode)
+    nome = f"chapter_{chapter_index + 1}"
+
+    # Provedores de IA; a ordem de cada chamada vem do roteador (saúde + latência + qualidade)
+    replicate_prompt = ai_prompt + f" Detailed aesthetics: {theme}"
+    cadeia = {
+        "replicate": (replicate_prompt, lambda seed: _try_replicate_image(client, replicate_prompt, colorful_mode, theme, seed)),
+        "gemini-image": (ai_prompt, lambda seed: _try_gemini_image(ai_prompt, colorful_mode, seed)),
+        "pollinations": (replicate_prompt, lambda seed: _try_pollinations_image(client, replicate_prompt, colorful_mode, seed)),
+    }
+    rota = image_router.planejar()
+    if rota_saida is not None:
+        rota_saida.update(rota)
+        rota = rota_saida
+
+    cache = image_cache.get_cache()
+    W, H = _dimensoes(colorful_mode)
+    chaves = {provedor: image_cache.make_key(provedor, prompt, W, H, theme) for provedor, (prompt, _) in cadeia.items()}
+    if cache and usar_cache:
+        # Arte já paga vale mesmo de provedor fora do ar: consulta todos, na ordem antiga.
+        # O SQLite roda no executor de disco, fora do event loop
+        provedor, data = await executors.run_disk(_buscar_no_cache, cache, chaves)
+        if data is not None:
+            print(f"[Cache Imagens] Capítulo {chapter_index + 1} reaproveitado de {provedor}.")
+            image_router.concluir(rota, f"cache:{provedor}")
+            return _salvar_imagem(data, nome, assets_dir, store)
+
+    ordem = rota["ordem"]
+    if orcamento is not None and orcamento.degradar("arte_pillow", chapter_index):
+        rota["pulados"].update(dict.fromkeys(ordem, "prazo do job"))
+        ordem = []
+
+    for provedor in ordem:
+        if not image_router.liberar(provedor):
+            rota["pulados"][provedor] = "circuito aberto (prova em andamento)"
             continue
+        inicio = time.monotonic()
+        chamada = cadeia[provedor][1](image_cache.seed_for(chaves[provedor]) if cache else None)
+        try:
+            data = await asyncio.wait_for(chamada, orcamento.ate("arte_pillow") if orcamento is not None else None)
+        except asyncio.TimeoutError:
+            image_router.interromper(provedor, "interrompido pelo prazo do job", rota)
+            orcamento.registrar("arte_pillow", chapter_index, f"{provedor} interrompido pelo prazo")
+            break
+        except asyncio.CancelledError:
+            # Capítulo cancelado (ex.: o job falhou): devolve a prova do half-open
+            image_router.interromper(provedor, "cancelado", rota)
+            raise
+        image_router.registrar(provedor, bool(data), time.monotonic() - inicio, rota)
+        if data:
+            if cache:
+                await executors.run_disk(cache.set, chaves[provedor], provedor, data)
+            image_router.concluir(rota, provedor)
+            return _salvar_imagem(data, nome, assets_dir, store)
+
+    data = await asyncio.to_thread(_criar_arte, chapter_title, chapter_index, theme, colorful_mode)
+    image_router.concluir(rota, "svg" if FALLBACK_ART == "vector" else "pillow")
+    return _salvar_imagem(data, nome, assets_dir, store)
+
+
+def generate_chapter_image(
+    chapter_title: str,
+    chapter_index: int,
+    content_snippet: str,
+    theme: str,
+    assets_dir: str = None,
+    colorful_mode: bool = False,
+    store: AssetStore = None,
+    usar_cache: bool = True,
+    rota_saida: dict = None,
+    orcamento: Orcamento = None,
+) -> str:
+    """Versão síncrona de `generate_chapter_image_async`, para threads sem event loop."""
+    async def _gerar():
+        async with novo_cliente_http() as client:
+            return await generate_chapter_image_async(
+                client, chapter_title, chapter_index, content_snippet, theme, assets_dir, colorful_mode, store,
+                usar_cache, rota_saida, orcamento,
+            )
 
-        filename = f"chapter_{i + 1}.png"
-        output_path = str(Path(assets_dir) / filename)
+    return asyncio.run(_gerar())
 
-        # Extract chapter context to inject into prompt for specific details
-        chapter_content_snippet = chapter.get("content", "")[:700].replace("\n", " ").strip()
-        
-        # Prompt dinâmico de IA (Ilustração vs Corporativo/Educação)
-        is_corporate = any(kw in theme for kw in ["Wireframes", "Business", "Infográficos", "Gráficos", "Minimalista"])
-        
-        if is_corporate:
-            if colorful_mode:
-                 ai_prompt = (
-                    f"Vertical portrait wallpaper 9:16 aspect ratio. Create a clean, professional, high-end {theme} background "
-                    f"for a business or academic chapter titled '{chapter['title']}'. The visual should be abstract, conceptual, "
-                    f"or a clean diagram loosely inspired by: '{chapter_content_snippet}'. No text in the image. "
-                    f"Corporate, clean presentation style."
-                )
-            else:
-                 ai_prompt = (
-                    f"Create a clean, professional, high-end {theme} specific graphic, chart, or illustration "
-                    f"for a business or academic chapter titled '{chapter['title']}'. Ensure it looks like a premium "
-                    f"editorial asset, loosely inspired by: '{chapter_content_snippet}'. No text in the image. "
-                    f"Corporate, clean presentation style."
-                )
-        else:
-            # IA inteligente para ler cenas: Se tiver dialogo ou lutas e for mangá/ficção:
-            is_action_scene = any(word in chapter_content_snippet.lower() for word in ["espada", "luta", "correu", "tiro", "sangue", "grito"])
-            is_dialog_scene = ("\"" in chapter_content_snippet or "—" in chapter_content_snippet or "disse" in chapter_content_snippet.lower())
-            
-            scene_focus = "focus on the characters, hero, and environment"
-            if is_action_scene:
-                scene_focus = "focus heavily on the high-stakes action scene, combat motion, and dramatic environment"
-            elif is_dialog_scene:
-                scene_focus = "focus on an expressive dialogue scene between characters, showing their emotions and interactions"
-
-            if colorful_mode:
-                ai_prompt = (
-                    f"Vertical portrait wallpaper 9:16 aspect ratio. Create a highly detailed illustration for a book chapter titled "
-                    f"'{chapter['title']}'. The visual MUST vividly {scene_focus} described in this excerpt: "
-                    f"'{chapter_content_snippet}'. Style: {theme}. The image should be an edge-to-edge wallpaper, "
-                    f"immersively capturing the specific scene moment. No text."
-                )
-            else:
-                ai_prompt = (
-                    f"Create a highly detailed, elegant illustration for a book chapter titled "
-                    f"'{chapter['title']}'. The visual MUST vividly {scene_focus} described in this excerpt: "
-                    f"'{chapter_content_snippet}'. Style: {theme}. The image should be atmospheric "
-                    f"and capture the scene specifically. No text in the image. "
-                    f"Wide format (16:9), high quality, editorial illustration style."
+
+def generate_placeholder_image(
+    chapter_title: str,
+    chapter_index: int,
+    theme: str,
+    assets_dir: str = None,
+    colorful_mode: bool = False,
+    store: AssetStore = None,
+) -> str:
+    """Placeholder determinístico (arte procedural, sem provedores) para o PDF de rascunho."""
+    data = _criar_arte(chapter_title, chapter_index, theme, colorful_mode)
+    return _salvar_imagem(data, f"placeholder_{chapter_index + 1}", assets_dir, store)
+
+
+def _buscar_no_cache(cache: image_cache.ImageCache, chaves: dict[str, str]):
+    """
+    Primeira imagem em cache entre os provedores, como (provedor, bytes); bloqueante (SQLite).
+    Conta um único hit/miss para o capítulo, não um por provedor consultado.
+    """
+    for provedor, chave in chaves.items():
+        data = cache.peek(chave)
+        if data is not None:
+            cache.record(True)
+            return provedor, data
+    cache.record(False)
+    return None, None
+
+
+def _salvar_imagem(data: bytes, nome: str, assets_dir: str | None, store: AssetStore | None) -> str:
+    """Entrega a imagem ao store do job (URI asset://) ou grava em disco (caminho)."""
+    if store is not None:
+        return store.put(nome, data)
+    Path(assets_dir).mkdir(parents=True, exist_ok=True)
+    extensao = {"image/jpeg": "jpg", "image/svg+xml": "svg"}.get(sniff_mime(data), "png")
+    output_path = str(Path(assets_dir) / f"{nome}.{extensao}")
+    with open(output_path, "wb") as f:
+        f.write(data)
+    return output_path
+
+
+async def generate_all_images_async(
+    chapters: list[dict],
+    theme: str,
+    assets_dir: str = None,
+    colorful_mode: bool = False,
+    frequency: str = "Em todos os Capítulos",
+    store: AssetStore = None,
+    usar_cache: bool = True,
+    rotas: dict = None,
+    orcamento: Orcamento = None,
+) -> list[str]:
+    """
+    Gera as imagens de todos os capítulos ao mesmo tempo, respeitando a frequência definida.
+
+    Cada capítulo percorre a cadeia de provedores por conta própria; o teto por
+    provedor vem do rate limiter e o teto global de IMAGE_CONCURRENCY. O tempo
+    da fase tende ao da imagem mais lenta. A ordem dos capítulos é mantida.
+    `rotas` (índice do capítulo → decisão do roteador) recebe os metadados de roteamento.
+    `orcamento` (prazo do job) reduz a frequência e troca provedores por Pillow quando em risco;
+    a frequência é reavaliada quando o capítulo ganha vaga no semáforo.
+    """
+    semaforo = asyncio.Semaphore(IMAGE_CONCURRENCY)
+
+    async with novo_cliente_http() as client:
+        async def _capitulo(i: int, chapter: dict) -> str | None:
+            if not should_generate_image(i, frequency):
+                return None
+            async with semaforo:
+                if orcamento is not None and not should_generate_image(i, frequency, orcamento):
+                    return None
+                return await generate_chapter_image_async(
+                    client,
+                    chapter_title=chapter["title"],
+                    chapter_index=i,
+                    content_snippet=chapter.get("content", ""),
+                    theme=theme,
+                    assets_dir=assets_dir,
+                    colorful_mode=colorful_mode,
+                    store=store,
+                    usar_cache=usar_cache,
+                    rota_saida=rotas.setdefault(i, {}) if rotas is not None else None,
+                    orcamento=orcamento,
                 )
 
-        # Roteador Multi-API (Replicate Flux -> Nano Banana -> Pollinations -> Pillow)
-        # O Replicate (LPU Flux) toma a dianteira na Produção Premium se a API Key for viável.
-        replicate_prompt = ai_prompt + f" Detailed aesthetics: {theme}"
-        
-        if not _try_replicate_image(replicate_prompt, output_path, colorful_mode, theme):
-            if not _try_gemini_image(ai_prompt, output_path, colorful_mode):
-                if not _try_pollinations_image(replicate_prompt, output_path, colorful_mode):
-                    _create_pillow_image(
-                        chapter_title=chapter["title"],
-                        chapter_index=i,
-                        theme=theme,
-                        output_path=output_path,
-                        colorful_mode=colorful_mode
-                    )
+        return list(await asyncio.gather(*(_capitulo(i, ch) for i, ch in enumerate(chapters))))
+
+
+def generate_all_images(
+    chapters: list[dict],
+    theme: str,
+    assets_dir: str = None,
+    colorful_mode: bool = False,
+    frequency: str = "Em todos os Capítulos",
+    store: AssetStore = None,
+    usar_cache: bool = True,
+    rotas: dict = None,
+    orcamento: Orcamento = None,
+) -> list[str]:
+    """Versão síncrona de `generate_all_images_async`, para threads sem event loop."""
+    return asyncio.run(generate_all_images_async(
+        chapters, theme, assets_dir, colorful_mode, frequency, store, usar_cache, rotas, orcamento,
+    ))
+
+
+# ---------------------------------------------------------------
+# Micro-benchmark do fallback Pillow  (python -m api.image_generator)
+# ---------------------------------------------------------------
+def benchmark(n: int = 20, theme: str = "Sci-Fi Neon") -> dict:
+    """
+    Tempo médio por imagem e pico de memória (RSS) de `_create_pillow_image`, nos dois formatos,
+    e tempo/tamanho médio da versão vetorial (`_create_svg_image`) em 800x1200.
+    """
+    import contextlib
+    import io
+    import resource
+
+    resultado = {}
+    rss_inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with contextlib.redirect_stdout(io.StringIO()):
+        _create_pillow_image("Aquecimento", 0, theme)
+        for colorful_mode in (False, True):
+            inicio = time.perf_counter()
+            for i in range(n):
+                _create_pillow_image(f"Capítulo de teste {i + 1}", i, theme, colorful_mode)
+            resultado["800x1200" if colorful_mode else "800x450"] = round((time.perf_counter() - inicio) / n * 1000, 1)
+    # ru_maxrss é em KB no Linux
+    resultado["pico_rss_mb"] = round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_inicial) / 1024, 1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        tamanhos = {"raster": 0, "svg": 0}
+        inicio = time.perf_counter()
+        for i in range(n):
+            tamanhos["svg"] += len(_create_svg_image(f"Capítulo de teste {i + 1}", i, theme, True))
+        resultado["svg_800x1200"] = round((time.perf_counter() - inicio) / n * 1000, 2)
+        for i in range(n):
+            tamanhos["raster"] += len(_create_pillow_image(f"Capítulo de teste {i + 1}", i, theme, True))
+    resultado["kb_medio"] = {fmt: round(total / n / 1024, 1) for fmt, total in tamanhos.items()}
+    print(
+        f"800x450: {resultado['800x450']} ms/img | 800x1200: {resultado['800x1200']} ms/img | "
+        f"pico de memória: +{resultado['pico_rss_mb']} MB\n"
+        f"SVG 800x1200: {resultado['svg_800x1200']} ms/img | "
+        f"tamanho médio: JPEG {resultado['kb_medio']['raster']} KB, SVG {resultado['kb_medio']['svg']} KB"
+    )
+    return resultado
 
-        paths.append(output_path)
 
-    return paths
+if __name__ == "__main__":
+    benchmark()
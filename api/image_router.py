@@ -0,0 +1,195 @@
+"""
+Roteador dos Provedores de Imagem
+==================================
+A cadeia fixa (Replicate → Gemini → Pollinations → Pillow) fazia cada
+capítulo pagar por todo provedor fora do ar ou estrangulado antes do próximo.
+
+Aqui cada provedor tem uma janela móvel (IMAGE_ROUTER_WINDOW chamadas) com
+sucesso/falha e latência, e a cada capítulo a ordem é recalculada:
+
+    custo = (p · t_ok + (1 − p) · t_falha) / (p · qualidade ^ IMAGE_QUALITY_WEIGHT)
+
+isto é, o tempo esperado por imagem boa, penalizando provedores de menor
+qualidade (peso 0 = só latência). `p` é suavizado (Laplace) e, sem
+amostras, valem as latências iniciais de _PERFIS — que reproduzem a ordem antiga.
+
+Provedores sem credencial são pulados. Falhas seguidas abrem o circuit
+breaker do provedor (provider_health): enquanto aberto ele não é tentado,
+e depois de `reset_timeout` uma única chamada de prova decide se volta.
+
+`planejar()` devolve a decisão (ordem, pulados, custos), que o gerador
+completa com as tentativas e grava nos metadados do job.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from api import provider_health
+
+
+_JANELA = int(os.getenv("IMAGE_ROUTER_WINDOW", "50"))
+_PESO_QUALIDADE = float(os.getenv("IMAGE_QUALITY_WEIGHT", "2.0"))
+_LIMITES_HISTOGRAMA = (1, 2, 4, 8, 16, 32)
+
+# provedor → modelo (mesma chave do rate limiter), qualidade relativa,
+# latência inicial de sucesso/falha (s) e variável de credencial exigida
+_PERFIS = {
+    "replicate": {
+        "modelo": "black-forest-labs/flux-schnell",
+        "qualidade": 1.0,
+        "t_ok": 6.0,
+        "t_falha": 3.0,
+        "credencial": "REPLICATE_API_TOKEN",
+    },
+    "gemini-image": {
+        "modelo": "gemini-2.5-flash-image",
+        "qualidade": 0.9,
+        "t_ok": 8.0,
+        "t_falha": 4.0,
+        "credencial": "GEMINI_API_KEY",
+    },
+    "pollinations": {
+        "modelo": "*",
+        "qualidade": 0.6,
+        "t_ok": 5.0,
+        "t_falha": 6.0,
+        "credencial": None,
+    },
+}
+PROVEDORES = tuple(_PERFIS)
+
+
+class _Historico:
+    """Últimas N chamadas de um provedor: (sucesso, segundos)."""
+
+    def __init__(self, tamanho: int):
+        self._amostras: deque[tuple[bool, float]] = deque(maxlen=tamanho)
+
+    def registrar(self, ok: bool, segundos: float):
+        self._amostras.append((ok, segundos))
+
+    def taxa_sucesso(self) -> float:
+        sucessos = sum(1 for ok, _ in self._amostras if ok)
+        return (sucessos + 1) / (len(self._amostras) + 2)
+
+    def mediana(self, ok: bool) -> float | None:
+        valores = sorted(s for sucesso, s in self._amostras if sucesso == ok)
+        return valores[len(valores) // 2] if valores else None
+
+    def percentil(self, p: float) -> float | None:
+        valores = sorted(s for ok, s in self._amostras if ok)
+        return valores[min(len(valores) - 1, int(p / 100 * len(valores)))] if valores else None
+
+    def histograma(self) -> dict[str, int]:
+        contagem = {f"<={limite}s": 0 for limite in _LIMITES_HISTOGRAMA}
+        contagem[f">{_LIMITES_HISTOGRAMA[-1]}s"] = 0
+        for _, segundos in self._amostras:
+            faixa = next((f"<={l}s" for l in _LIMITES_HISTOGRAMA if segundos <= l), f">{_LIMITES_HISTOGRAMA[-1]}s")
+            contagem[faixa] += 1
+        return contagem
+
+    def __len__(self) -> int:
+        return len(self._amostras)
+
+
+_historicos = {nome: _Historico(_JANELA) for nome in PROVEDORES}
+_ultima_rota: dict | None = None
+_lock = threading.Lock()
+
+
+def _configurado(nome: str) -> bool:
+    credencial = _PERFIS[nome]["credencial"]
+    return credencial is None or bool(os.getenv(credencial, ""))
+
+
+def _breaker(nome: str) -> provider_health.CircuitBreaker:
+    return provider_health.get_breaker(nome, _PERFIS[nome]["modelo"])
+
+
+def _custo(nome: str) -> float:
+    """Tempo esperado por imagem boa, ponderado pela qualidade (menor é melhor)."""
+    perfil = _PERFIS[nome]
+    with _lock:
+        historico = _historicos[nome]
+        p = historico.taxa_sucesso()
+        t_ok = historico.mediana(True) or perfil["t_ok"]
+        t_falha = historico.mediana(False) or perfil["t_falha"]
+    return (p * t_ok + (1 - p) * t_falha) / (p * perfil["qualidade"] ** _PESO_QUALIDADE)
+
+
+def planejar() -> dict:
+    """Ordem dos provedores para esta imagem, os pulados (com motivo) e os custos."""
+    pulados, custos = {}, {}
+    for nome in PROVEDORES:
+        if not _configurado(nome):
+            pulados[nome] = "sem credencial"
+        elif _breaker(nome).state == provider_health.OPEN:
+            pulados[nome] = "circuito aberto (falhas seguidas)"
+        else:
+            custos[nome] = round(_custo(nome), 2)
+    return {
+        "ordem": sorted(custos, key=custos.get),
+        "pulados": pulados,
+        "custos": custos,
+        "tentativas": [],
+        "provedor": None,
+    }
+
+
+def liberar(nome: str) -> bool:
+    """Confirma a tentativa na hora de chamar (consome a prova do half-open)."""
+    return _breaker(nome).allow()
+
+
+def registrar(nome: str, ok: bool, segundos: float, rota: dict | None = None):
+    """Resultado de uma chamada: alimenta a janela, o breaker e a rota do capítulo."""
+    with _lock:
+        _historicos[nome].registrar(ok, segundos)
+    breaker = _breaker(nome)
+    if ok:
+        breaker.record_success()
+    else:
+        breaker.record_failure()
+    if rota is not None:
+        rota["tentativas"].append({"provedor": nome, "ok": ok, "segundos": round(segundos, 2)})
+
+
+def interromper(nome: str, motivo: str, rota: dict | None = None):
+    """Chamada cancelada por nós (ex.: prazo do job): não conta como falha do provedor."""
+    _breaker(nome).record_neutral()
+    if rota is not None:
+        rota["pulados"][nome] = motivo
+
+
+def concluir(rota: dict, provedor: str):
+    """Fecha a rota com quem entregou a imagem ("cache:<provedor>", "pillow"...)."""
+    global _ultima_rota
+    rota["provedor"] = provedor
+    with _lock:
+        _ultima_rota = rota
+
+
+def stats() -> dict:
+    provedores = {}
+    for nome in PROVEDORES:
+        with _lock:
+            historico = _historicos[nome]
+            resumo = {
+                "chamadas": len(historico),
+                "taxa_sucesso": round(historico.taxa_sucesso(), 3),
+                "p50_s": historico.percentil(50),
+                "p90_s": historico.percentil(90),
+                "histograma": historico.histograma(),
+            }
+        provedores[nome] = {
+            **resumo,
+            "configurado": _configurado(nome),
+            "circuito": _breaker(nome).state,
+            "custo": round(_custo(nome), 2),
+            "qualidade": _PERFIS[nome]["qualidade"],
+        }
+    with _lock:
+        ultima = _ultima_rota
+    return {"peso_qualidade": _PESO_QUALIDADE, "provedores": provedores, "ultima_rota": ultima}
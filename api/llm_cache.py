@@ -0,0 +1,137 @@
+"""
+Cache Persistente de Prompts/Respostas de LLM
+==============================================
+Cache em disco (SQLite) endereçado por conteúdo: a chave é o SHA-256 de
+(modelo, prompt, instrução de sistema, configuração de geração).
+
+- TTL por entrada (padrão: LLM_CACHE_TTL_S)
+- Evicção LRU quando o tamanho total passa de LLM_CACHE_MAX_MB
+- Desligável globalmente com LLM_CACHE_DISABLED=1; cada chamador pode
+  ainda pular a leitura (bypass) para forçar uma resposta nova.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+_DEFAULT_PATH = _PROJECT_ROOT / ".cache" / "llm_cache.sqlite3"
+_DEFAULT_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", str(7 * 24 * 3600)))
+_DEFAULT_MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+
+def make_key(model: str, prompt: str, system: str | None = None, config: dict | None = None) -> str:
+    """Hash estável de tudo que influencia a resposta do modelo."""
+    payload = json.dumps(
+        {"model": model, "prompt": prompt, "system": system or "", "config": config or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Cache SQLite com TTL por entrada e evicção LRU por tamanho total."""
+
+    def __init__(self, path: str | Path, max_bytes: int = _DEFAULT_MAX_BYTES, default_ttl: float = _DEFAULT_TTL_S):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON entries(last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._conn.commit()
+                self._misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self._hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str, ttl: float | None = None):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now + (ttl if ttl is not None else self.default_ttl), now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """Remove expirados e, se ainda acima do limite, os menos usados recentemente."""
+        self._conn.execute("DELETE FROM entries WHERE expires_at < ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excesso = total - self.max_bytes
+        liberado = 0
+        vitimas = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC"):
+            vitimas.append((key,))
+            liberado += size
+            if liberado >= excesso:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", vitimas)
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {
+            "entries": count,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+        }
+
+
+_cache: LLMCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> LLMCache | None:
+    """Singleton do cache, ou None se desativado via LLM_CACHE_DISABLED=1."""
+    global _cache
+    if os.getenv("LLM_CACHE_DISABLED", "0") == "1":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = LLMCache(os.getenv("LLM_CACHE_PATH", str(_DEFAULT_PATH)))
+            except sqlite3.Error as e:
+                print(f"[Cache LLM] Desativado (Erro: {e})")
+                return None
+        return _cache
@@ -7,6 +7,7 @@ Três fluxos:
   3. /generate-ebook     → aceita conteúdo Markdown pronto
 """
 
+import json
 import os
 import uuid
 from pathlib import Path
@@ -20,11 +21,19 @@ from pydantic import BaseModel, Field
 
 from api.models import EbookRequest, EbookFormRequest
 from api.text_corrector import corrigir_capitulos, corrigir_texto
-from api.image_generator import generate_all_images
+from api.image_generator import generate_all_images_async
 from api.pdf_engine import generate_pdf
 from api.epub_engine import create_epub, inject_qr_codes
-from api.content_generator import gerar_todos_capitulos
-from api.chat_handler import processar_mensagem
+from api.asset_store import AssetStore
+from api.deadline import novo_orcamento
+from api.content_generator import gerar_todos_capitulos_async, hedge_stats
+from api.chat_handler import processar_mensagem_sessao
+from api.rate_limiter import snapshot_limits
+from api import (
+    chat_sessions, executors, image_cache, image_router, pdf_profiles, render_pool, renditions, speculative,
+    text_corrector, themes,
+)
+from api.provider_health import snapshot_health
 import zipfile
 import markdown
 
@@ -52,12 +61,26 @@ app = FastAPI(
     redoc_url="/redoc",
 )
 
+@app.on_event("startup")
+def _aquecer_render_pool():
+    # Sobe os workers já no boot: o aquecimento do WeasyPrint sai do caminho do usuário
+    render_pool.get_pool()
+
+
+@app.on_event("shutdown")
+def _encerrar_executores():
+    executors.shutdown()
+    render_pool.shutdown()
+    text_corrector.shutdown()
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Job-Budget"],
 )
 
 
@@ -70,12 +93,27 @@ class ChatMessage(BaseModel):
 
 
 class ChatRequest(BaseModel):
-    history: list[ChatMessage] = Field(default_factory=list)
+    session_id: Optional[str] = Field(
+        default=None,
+        description="Sessão devolvida pelo /chat anterior; com ela basta enviar a mensagem nova",
+    )
+    history: list[ChatMessage] = Field(
+        default_factory=list,
+        description="Histórico completo, usado só para abrir uma sessão nova",
+    )
     message: str
     theme: Optional[str] = "Minimalista Moderno"
     style: Optional[str] = "Profissional"
     audience: Optional[str] = "Público geral"
     language: Optional[str] = "Português Brasileiro"
+    speculative: Optional[bool] = Field(
+        default=None,
+        description="Começar a escrever os capítulos assim que o roteiro ficar pronto (padrão: SPECULATIVE_GENERATION)",
+    )
+    use_cache: bool = Field(
+        default=True,
+        description="Reaproveitar respostas já geradas para a mesma conversa (False força nova chamada)",
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -97,37 +135,72 @@ async def health_check():
         "servico": "BookBot V5",
         "versao": "5.0.0",
         "gemini": bool(os.getenv("GEMINI_API_KEY")),
+        "executores": executors.stats(),
+        "render_pool": render_pool.stats(),
+        "pdf_profiles": pdf_profiles.stats(),
+        "languagetool": text_corrector.stats(),
+    }
+
+
+@app.get("/limits", tags=["Saúde"])
+async def rate_limits():
+    """Limites atuais (req/s e concorrência) de cada provedor/modelo já usado."""
+    return snapshot_limits()
+
+
+@app.get("/providers", tags=["Saúde"])
+async def providers_health():
+    """Circuit breakers, modelos indisponíveis, hedging, caches e roteamento de imagens."""
+    return {
+        **snapshot_health(),
+        "hedging": hedge_stats(),
+        "speculative": speculative.stats(),
+        "chat_sessions": chat_sessions.get_store().stats(),
+        "image_cache": cache.stats() if (cache := image_cache.get_cache()) else None,
+        "image_router": image_router.stats(),
     }
 
 
+@app.get("/themes", tags=["E-book"])
+async def list_themes():
+    """Temas visuais disponíveis (nome, aliases aceitos e fontes)."""
+    return [
+        {"name": t.name, "aliases": list(t.aliases), "fonts": t.fonts}
+        for t in map(themes.get_theme, themes.list_themes())
+    ]
+
+
 @app.post("/chat", tags=["Chat"])
 async def chat_endpoint(request: ChatRequest):
     """
     Endpoint de chat — processa mensagem e retorna resposta + dados do ebook se prontos.
     """
     try:
-        historico = [
-            {"role": m.role, "content": m.content}
-            for m in request.history
-        ]
-
-        # Build context from sidebar settings
-        contexto_extra = (
-            f"\n[CONFIGURAÇÕES DO USUÁRIO: "
-            f"Tema='{request.theme}', "
-            f"Estilo='{request.style}', "
-            f"Público='{request.audience}', "
-            f"Idioma='{request.language}']"
+        resultado = await executors.run_llm(
+            processar_mensagem_sessao,
+            mensagem_usuario=request.message,
+            session_id=request.session_id,
+            historico=[{"role": m.role, "content": m.content} for m in request.history],
+            theme=request.theme,
+            style=request.style,
+            audience=request.audience,
+            language=request.language,
+            usar_cache=request.use_cache,
         )
 
-        resultado = processar_mensagem(
-            historico=historico,
-            mensagem_usuario=request.message + contexto_extra,
-        )
+        ebook_data = resultado["ebook_data"]
+        especular = speculative.SPECULATIVE_ENABLED if request.speculative is None else request.speculative
+        if ebook_data and especular and ebook_data.get("chapters"):
+            # Melhor esforço: um roteiro malformado do LLM não pode derrubar a resposta do chat
+            try:
+                speculative.iniciar(ebook_data["title"], ebook_data["chapters"])
+            except Exception as e:
+                print(f"[Especulativo] Roteiro inválido para especular ({e}), seguindo sem adiantar capítulos.")
 
         return {
             "response": resultado["response"],
             "ebook_data": resultado["ebook_data"],
+            "session_id": resultado["session_id"],
         }
 
     except Exception as e:
@@ -137,65 +210,122 @@ async def chat_endpoint(request: ChatRequest):
         )
 
 
+# ---------------------------------------------------------------------------
+# Etapas bloqueantes (rodam nos executores, nunca no event loop)
+# ---------------------------------------------------------------------------
+def _preparar_capitulos_markdown(chapters, store: AssetStore) -> list[dict]:
+    """Corrige, converte para HTML e injeta QR codes nos capítulos já escritos."""
+    chapters_data = []
+    for ch in chapters:
+        content_md = ch.content
+        # Corrige ortografia
+        content_md = corrigir_texto(content_md)
+        # Converte HTML
+        content_html = markdown.markdown(content_md)
+        # Tenta gerar QR Codes
+        content_html = inject_qr_codes(content_html, None, len(chapters_data), store=store)
+
+        chapters_data.append({
+            "title": ch.title,
+            "content": content_md,
+            "content_md": content_md,
+            "content_html": content_html,
+        })
+    return chapters_data
+
+
+def _empacotar_zip(output_zip_path: str, title: str, pdf_path: str, epub_path: str):
+    with zipfile.ZipFile(output_zip_path, 'w') as zipf:
+        zipf.write(pdf_path, arcname=f"{title}.pdf")
+        zipf.write(epub_path, arcname=f"{title}.epub")
+
+
 @app.post("/generate-from-form", tags=["E-book"])
 async def generate_from_form(request: EbookFormRequest):
     """Gerar ebook a partir do formulário/chat (conteúdo gerado via Gemini)."""
     job_id = uuid.uuid4().hex[:12]
-    job_assets_dir = str(_ASSETS_DIR / job_id)
+    # Imagens e QR codes do job ficam em memória (asset://) até o ZIP sair
+    store = AssetStore(job_id, _ASSETS_DIR / job_id)
     output_pdf_path = str(_OUTPUT_DIR / f"ebook_{job_id}.pdf")
     output_epub_path = str(_OUTPUT_DIR / f"ebook_{job_id}.epub")
     output_zip_path = str(_OUTPUT_DIR / f"ebook_bundle_{job_id}.zip")
+    # Prazo do job: perto dele as etapas degradam (modelo rápido, sem revisão, menos arte)
+    orcamento = novo_orcamento(request.deadline_s)
 
     try:
         chapters_input = [
             {"title": ch.title, "pages": ch.pages}
             for ch in request.chapters
         ]
-        chapters_data = gerar_todos_capitulos(
-            titulo_livro=request.title,
-            capitulos=chapters_input,
-            tema=request.theme,
+        chapters_data = None
+        especulacao = (
+            speculative.reivindicar(request.title, chapters_input)
+            if request.use_cache else None
         )
-
-        chapters_data = corrigir_capitulos(chapters_data)
-
-        image_paths = generate_all_images(
+        if especulacao is not None:
+            try:
+                chapters_data = await especulacao
+                print(f"[Especulativo] '{request.title}' adotado do trabalho iniciado no chat.")
+            except Exception as e:
+                print(f"[Especulativo] Trabalho especulativo falhou ({e}), gerando do zero...")
+        if chapters_data is None:
+            chapters_data = await gerar_todos_capitulos_async(
+                titulo_livro=request.title,
+                capitulos=chapters_input,
+                usar_cache=request.use_cache,
+                orcamento=orcamento,
+            )
+
+        chapters_data = await executors.run_render(corrigir_capitulos, chapters_data, orcamento)
+
+        # Imagens: quase tudo é espera de rede pelos provedores (async, capítulos em paralelo)
+        image_paths = await generate_all_images_async(
             chapters=chapters_data,
             theme=request.theme,
-            assets_dir=job_assets_dir,
+            store=store,
+            usar_cache=request.use_cache,
+            orcamento=orcamento,
         )
+        # Um decode por imagem: versão do perfil do PDF para todas e versão EPUB para a capa
+        await executors.run_render(renditions.preparar_livro, store, image_paths, request.pdf_profile, ("epub",))
 
         # 3. Gerar PDF
-        pdf_path = generate_pdf(
+        pdf_path = await executors.run_render(
+            generate_pdf,
             title=request.title,
             author=request.author,
             theme=request.theme,
             chapters=chapters_data,
             image_paths=image_paths,
             output_path=output_pdf_path,
+            assets=store,
+            profile=request.pdf_profile,
         )
 
         # 4. Gerar EPUB
-        epub_path = create_epub(
+        epub_path = await executors.run_render(
+            create_epub,
             title=request.title,
             author=request.author,
             chapters_data=chapters_data,
             output_path=output_epub_path,
-            cover_image_path=image_paths[0] if image_paths else None
+            cover_image_path=image_paths[0] if image_paths else None,
+            assets=store,
+            chapter_images=image_paths,
         )
 
         # 5. Criar ZIP com ambos os formatos
-        with zipfile.ZipFile(output_zip_path, 'w') as zipf:
-            zipf.write(pdf_path, arcname=f"{request.title}.pdf")
-            zipf.write(epub_path, arcname=f"{request.title}.epub")
+        await executors.run_disk(_empacotar_zip, output_zip_path, request.title, pdf_path, epub_path)
 
+        headers = {"Content-Disposition": f'attachment; filename="{request.title}_bundle.zip"'}
+        if orcamento.ativo:
+            # Prazo, tempo gasto e degradações aplicadas (JSON ASCII, cabe num header)
+            headers["X-Job-Budget"] = json.dumps(orcamento.relatorio())
         return FileResponse(
             path=output_zip_path,
             media_type="application/zip",
             filename=f"{request.title}_bundle.zip",
-            headers={
-                "Content-Disposition": f'attachment; filename="{request.title}_bundle.zip"'
-            },
+            headers=headers,
         )
 
     except Exception as e:
@@ -203,61 +333,56 @@ async def generate_from_form(request: EbookFormRequest):
             status_code=500,
             detail=f"Erro na geração do e-book: {str(e)}",
         )
+    finally:
+        store.release()
 
 
 @app.post("/generate-ebook", tags=["E-book"])
 async def generate_ebook(request: EbookRequest):
     """Gerar ebook a partir de conteúdo Markdown já escrito."""
     job_id = uuid.uuid4().hex[:12]
-    job_assets_dir = str(_ASSETS_DIR / job_id)
+    # Imagens e QR codes do job ficam em memória (asset://) até o ZIP sair
+    store = AssetStore(job_id, _ASSETS_DIR / job_id)
     output_pdf_path = str(_OUTPUT_DIR / f"ebook_{job_id}.pdf")
     output_epub_path = str(_OUTPUT_DIR / f"ebook_{job_id}.epub")
     output_zip_path = str(_OUTPUT_DIR / f"ebook_bundle_{job_id}.zip")
 
     try:
-        chapters_data = []
-        for ch in request.chapters:
-            content_md = ch.content
-            # Corrige ortografia
-            content_md = corrigir_texto(content_md)
-            # Converte HTML
-            content_html = markdown.markdown(content_md)
-            # Tenta gerar QR Codes
-            content_html = inject_qr_codes(content_html, job_assets_dir, len(chapters_data))
-            
-            chapters_data.append({
-                "title": ch.title,
-                "content": content_md,
-                "content_md": content_md,
-                "content_html": content_html,
-            })
-
-        image_paths = generate_all_images(
+        chapters_data = await executors.run_render(
+            _preparar_capitulos_markdown, request.chapters, store
+        )
+
+        image_paths = await generate_all_images_async(
             chapters=chapters_data,
             theme=request.theme,
-            assets_dir=job_assets_dir,
+            store=store,
         )
+        await executors.run_render(renditions.preparar_livro, store, image_paths, request.pdf_profile, ("epub",))
 
-        pdf_path = generate_pdf(
+        pdf_path = await executors.run_render(
+            generate_pdf,
             title=request.title,
             author=request.author,
             theme=request.theme,
             chapters=chapters_data,
             image_paths=image_paths,
             output_path=output_pdf_path,
+            assets=store,
+            profile=request.pdf_profile,
         )
 
-        epub_path = create_epub(
+        epub_path = await executors.run_render(
+            create_epub,
             title=request.title,
             author=request.author,
             chapters_data=chapters_data,
             output_path=output_epub_path,
-            cover_image_path=image_paths[0] if image_paths else None
+            cover_image_path=image_paths[0] if image_paths else None,
+            assets=store,
+            chapter_images=image_paths,
         )
 
-        with zipfile.ZipFile(output_zip_path, 'w') as zipf:
-            zipf.write(pdf_path, arcname=f"{request.title}.pdf")
-            zipf.write(epub_path, arcname=f"{request.title}.epub")
+        await executors.run_disk(_empacotar_zip, output_zip_path, request.title, pdf_path, epub_path)
 
         return FileResponse(
             path=output_zip_path,
@@ -273,3 +398,5 @@ async def generate_ebook(request: EbookRequest):
             status_code=500,
             detail=f"Erro na geração do e-book: {str(e)}",
         )
+    finally:
+        store.release()
@@ -2,7 +2,10 @@
 
 from typing import Optional
 
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from api.pdf_profiles import validate_profile
+from api.themes import validate_theme
 
 
 # ---------------------------------------------------------------------------
@@ -30,6 +33,20 @@ class EbookRequest(BaseModel):
     chapters: list[Chapter] = Field(
         ..., description="Lista de capítulos com conteúdo", min_length=1
     )
+    pdf_profile: Optional[str] = Field(
+        default=None,
+        description="Perfil de saída do PDF: screen, ebook ou print (padrão: PDF_PROFILE)",
+    )
+
+    @field_validator("theme")
+    @classmethod
+    def validar_tema(cls, v: str) -> str:
+        return validate_theme(v)
+
+    @field_validator("pdf_profile")
+    @classmethod
+    def validar_perfil(cls, v: Optional[str]) -> Optional[str]:
+        return validate_profile(v) if v is not None else None
 
     @model_validator(mode="after")
     def validar_contagem(self):
@@ -63,6 +80,29 @@ class EbookFormRequest(BaseModel):
     chapters: list[FormChapter] = Field(
         ..., description="Lista de capítulos (título + páginas)", min_length=1
     )
+    use_cache: bool = Field(
+        default=True,
+        description="Reaproveitar textos já gerados para os mesmos prompts (False força nova geração)",
+    )
+    deadline_s: Optional[float] = Field(
+        default=None,
+        description="Prazo do job em segundos; perto dele a geração degrada em vez de atrasar (padrão: JOB_DEADLINE_S)",
+        gt=0,
+    )
+    pdf_profile: Optional[str] = Field(
+        default=None,
+        description="Perfil de saída do PDF: screen, ebook ou print (padrão: PDF_PROFILE)",
+    )
+
+    @field_validator("theme")
+    @classmethod
+    def validar_tema(cls, v: str) -> str:
+        return validate_theme(v)
+
+    @field_validator("pdf_profile")
+    @classmethod
+    def validar_perfil(cls, v: Optional[str]) -> Optional[str]:
+        return validate_profile(v) if v is not None else None
 
     @model_validator(mode="after")
     def validar_contagem(self):
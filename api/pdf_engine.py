@@ -7,18 +7,33 @@ e design tokens premium.
 """
 
 import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 import markdown
 from jinja2 import Environment, FileSystemLoader
 from weasyprint import HTML, CSS
+from weasyprint.text.fonts import FontConfiguration
+
+from api import pdf_profiles, render_pool, renditions, themes, url_fetcher
+from api.asset_store import AssetStore, is_asset_uri
 
 
 _THIS_DIR = Path(__file__).resolve().parent
 _PROJECT_ROOT = _THIS_DIR.parent
 _TEMPLATES_DIR = _PROJECT_ROOT / "templates"
 
+# Render no próprio processo (RENDER_POOL_SIZE=0): folhas parseadas ficam em cache.
+# As chaves são as strings de page_css, já únicas por (tema, sangria, modo, página).
+_font_config = FontConfiguration()
+_css_cache: dict[str | None, CSS] = {}
+_css_lock = threading.Lock()
+
 
 def _markdown_to_html(md_text: str) -> str:
     """Converte Markdown para HTML com extensões comuns."""
@@ -41,8 +56,20 @@ def render_ebook_html(
     colorful_mode: bool = False,
     epigraph: str = None,
     epigraph_author: str = None,
+    secoes: list[str] = None,
+    capitulo_inicial: int = 0,
+    total_capitulos: int = None,
+    assets: AssetStore = None,
 ) -> str:
-    """Renderiza o HTML completo do e-book a partir do template Jinja2."""
+    """
+    Renderiza o HTML do e-book a partir do template Jinja2.
+
+    `secoes` restringe o documento a partes do livro ("capa", "sumario",
+    "capitulos", "contracapa"); `capitulo_inicial` e `total_capitulos`
+    mantêm numeração e âncoras `#cap-N` globais quando `chapters` é um trecho.
+    Arte vetorial (SVG) do `assets` entra inline no hero do capítulo; no modo
+    colorido segue como imagem de fundo (`asset://`).
+    """
     env = Environment(
         loader=FileSystemLoader(str(_TEMPLATES_DIR)),
         autoescape=False,
@@ -58,14 +85,20 @@ def render_ebook_html(
             html_content = _markdown_to_html(ch.get("content", ch.get("content_md", "")))
             
         img_path = image_paths[i] if i < len(image_paths) else None
+        image_svg = None
 
-        if img_path:
+        if img_path and not is_asset_uri(img_path):
             img_path = Path(img_path).resolve().as_uri()
+        elif img_path and assets is not None and not colorful_mode:
+            item = assets.get(img_path)
+            if item is not None and item[1] == "image/svg+xml":
+                image_svg = item[0].decode("utf-8")
 
         rendered_chapters.append({
             "title": ch["title"],
             "html_content": html_content,
             "image_path": img_path,
+            "image_svg": image_svg,
         })
 
     html_str = template.render(
@@ -77,31 +110,62 @@ def render_ebook_html(
         colorful_mode=colorful_mode,
         epigraph=epigraph,
         epigraph_author=epigraph_author,
+        secoes=secoes,
+        capitulo_inicial=capitulo_inicial,
+        total_capitulos=total_capitulos,
     )
     return html_str
 
 
-def compile_pdf(html_content: str, output_path: str, additional_css: str = None) -> str:
-    """Compila HTML + CSS em PDF via WeasyPrint."""
-    css_path = _TEMPLATES_DIR / "style.css"
+def compile_pdf(html_content: str, output_path: str, additional_css: str = None,
+                assets: dict[str, tuple[bytes, str]] = None, opcoes: dict = None) -> str:
+    """
+    Compila HTML + CSS em PDF via WeasyPrint.
+
+    Por padrão o layout roda no pool de workers aquecidos (ver render_pool);
+    com RENDER_POOL_SIZE=0 roda aqui mesmo, no processo atual.
+    `assets` são as imagens `asset://` referenciadas pelo HTML (ver asset_store).
+    `opcoes` são as opções do WeasyPrint do perfil de saída (ver pdf_profiles).
+    """
+    pool = render_pool.get_pool()
+    if pool is not None:
+        return pool.render(html_content, output_path, additional_css, assets=assets, opcoes=opcoes)
+
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
+    fetcher = url_fetcher.novo_url_fetcher(assets)
     html_doc = HTML(
         string=html_content,
         base_url=str(_PROJECT_ROOT),
+        url_fetcher=fetcher,
     )
-    stylesheets = [CSS(filename=str(css_path))]
-    
+    stylesheets = [_css_parseado(None)]
     if additional_css:
-        stylesheets.append(CSS(string=additional_css))
+        stylesheets.append(_css_parseado(additional_css))
 
     html_doc.write_pdf(
         output_path,
         stylesheets=stylesheets,
+        font_config=_font_config,
+        **(opcoes or {}),
     )
     return os.path.abspath(output_path)
 
 
+def _css_parseado(css: str | None) -> CSS:
+    """CSS já parseado (None = style.css base); o parse acontece uma vez por folha."""
+    with _css_lock:
+        folha = _css_cache.get(css)
+        if folha is None:
+            fetcher = url_fetcher.novo_url_fetcher()
+            if css is None:
+                folha = CSS(filename=str(_TEMPLATES_DIR / "style.css"), font_config=_font_config, url_fetcher=fetcher)
+            else:
+                folha = CSS(string=css, font_config=_font_config, url_fetcher=fetcher)
+            _css_cache[css] = folha
+        return folha
+
+
 def generate_pdf(
     title: str,
     author: str,
@@ -110,424 +174,303 @@ def generate_pdf(
     image_paths: list[str] | dict[int, str],
     output_path: str,
     bleed_mm: int = 3,
-    colorful_mode: bool = False
+    colorful_mode: bool = False,
+    render_mode: str = None,
+    assets: AssetStore = None,
+    profile: str = None,
 ) -> str:
-    """Compila HTML final e renderiza PDF via Weasyprint com sangria (bleed)."""
+    """
+    Compila HTML final e renderiza PDF via Weasyprint com sangria (bleed).
+
+    `render_mode`: "single" (um documento só), "parallel" (ver
+    compile_pdf_paralelo) ou None/"auto" (PDF_RENDER_MODE; paralelo a partir
+    de PDF_PARALLEL_MIN_CHAPTERS capítulos quando há pool de render).
+    Com `assets`, `image_paths` podem ser URIs `asset://` lidas direto da memória.
+    `profile`: perfil de saída ("screen", "ebook", "print"; None → PDF_PROFILE),
+    que define DPI e qualidade das imagens e o subset de fontes.
+    """
+    perfil = pdf_profiles.get_profile(profile)
+    opcoes = perfil.weasyprint_options()
+    inicio = time.perf_counter()
+
     # Transform dict to list if legacy code sends a dict
     if isinstance(image_paths, dict):
         ordered_paths = []
         for i in range(len(chapters)):
             ordered_paths.append(image_paths.get(i, ""))
         image_paths = ordered_paths
+    # Imagens do store entram já no tamanho/qualidade do perfil (ver renditions)
+    image_paths = renditions.renditions(assets, image_paths, renditions.pdf_rendition(perfil.name))
+
+    # CSS por tema vem do registro (templates/themes/*.json), memoizado por
+    # (tema, sangria, modo colorido, página): após o aquecimento não há rebuild
+    style = themes.page_css(theme, bleed_mm, colorful_mode)
+
+    if _usar_paralelo(render_mode, len(chapters)):
+        caminho = compile_pdf_paralelo(
+            title, author, theme, chapters, image_paths, output_path, style, bleed_mm, colorful_mode, assets,
+            opcoes,
+        )
+    else:
+        html_content = render_ebook_html(title, author, theme, chapters, image_paths, colorful_mode, assets=assets)
+        caminho = compile_pdf(html_content, output_path, style, _payload(assets, html_content), opcoes)
+    pdf_profiles.registrar(perfil, caminho, time.perf_counter() - inicio)
+    return caminho
+
+
+_ASSET_REF = re.compile(r"asset://[^\s\"'()<>]+")
+
+
+def _payload(assets: AssetStore | None, html_content: str) -> dict | None:
+    """Assets `asset://` citados no HTML (imagens de capítulo, QR codes), para seguir com o job."""
+    if assets is None:
+        return None
+    return assets.payload(set(_ASSET_REF.findall(html_content)))
+
+
+# =====================================================================
+# Render paralelo por capítulo
+# =====================================================================
+_RENDER_MODE = os.getenv("PDF_RENDER_MODE", "auto")
+_PARALELO_MIN_CAPITULOS = int(os.getenv("PDF_PARALLEL_MIN_CHAPTERS", "8"))
+_PT_POR_PX = 0.75  # WeasyPrint escreve 1px CSS = 0.75pt
 
-    html_content = render_ebook_html(title, author, theme, chapters, image_paths, colorful_mode)
-
-    # =====================================================================
-    # CSS Dinâmico por Tema — TODOS os tokens visuais que mudam por tema
-    # Inclui: cores, gradientes, fontes, cover card bg, glows, patterns
-    # =====================================================================
-    css_dict = {
-        "Minimalista Moderno": """:root {
-            --color-bg: #ffffff;
-            --color-bg-warm: #fafafa;
-            --color-bg-cool: #f5f5f5;
-            --color-text: #1a1a1a;
-            --color-text-secondary: #666666;
-            --color-text-light: #999999;
-            --color-accent: #111111;
-            --color-accent-light: #444444;
-            --color-accent-soft: rgba(0,0,0,0.04);
-            --color-accent-border: rgba(0,0,0,0.08);
-            --gradient-accent: linear-gradient(135deg, #222 0%, #555 100%);
-            --gradient-dark: linear-gradient(160deg, #0a0a0a 0%, #1a1a1a 40%, #333 70%, #555 100%);
-            --gradient-warm: linear-gradient(135deg, #fafafa 0%, #f0f0f0 100%);
-            --color-cover-card-bg: rgba(10, 10, 10, 0.70);
-            --color-cover-glow-1: rgba(100, 100, 100, 0.10);
-            --color-cover-glow-2: rgba(80, 80, 80, 0.08);
-            --color-cover-pattern-1: rgba(100, 100, 100, 0.05);
-            --color-cover-pattern-2: rgba(80, 80, 80, 0.04);
-            --color-accent-shadow: rgba(0, 0, 0, 0.15);
-            --shadow-card: 0 2px 20px rgba(0, 0, 0, 0.06);
-            --shadow-glow: 0 0 40px rgba(0, 0, 0, 0.08);
-            --font-body: 'Inter', 'Helvetica Neue', Arial, sans-serif;
-            --font-display: 'Inter', 'Helvetica Neue', Arial, sans-serif;
-        }""",
-
-        "Fantasia Épica": """:root {
-            --color-bg: #FDF6E3;
-            --color-bg-warm: #F8E9C9;
-            --color-bg-cool: #FAF1DD;
-            --color-text: #2C1E16;
-            --color-text-secondary: #5D4037;
-            --color-text-light: #8D6E63;
-            --color-accent: #8B4513;
-            --color-accent-light: #CD853F;
-            --color-accent-soft: rgba(139,69,19,0.06);
-            --color-accent-border: rgba(139,69,19,0.15);
-            --gradient-accent: linear-gradient(135deg, #8B4513 0%, #D2691E 50%, #CD853F 100%);
-            --gradient-dark: linear-gradient(160deg, #1a0f08 0%, #2C1E16 40%, #5D4037 70%, #8B4513 100%);
-            --gradient-warm: linear-gradient(135deg, #FDF6E3 0%, #F8E9C9 100%);
-            --color-cover-card-bg: rgba(44, 30, 22, 0.70);
-            --color-cover-glow-1: rgba(139, 69, 19, 0.20);
-            --color-cover-glow-2: rgba(205, 133, 63, 0.15);
-            --color-cover-pattern-1: rgba(139, 69, 19, 0.08);
-            --color-cover-pattern-2: rgba(205, 133, 63, 0.06);
-            --color-accent-shadow: rgba(139, 69, 19, 0.3);
-            --shadow-card: 0 2px 20px rgba(139, 69, 19, 0.08);
-            --shadow-glow: 0 0 40px rgba(139, 69, 19, 0.12);
-            --font-body: Georgia, 'Palatino Linotype', serif;
-            --font-display: 'Playfair Display', Georgia, 'Garamond', serif;
-        }""",
-
-        "Executive Dark": """:root {
-            --color-bg: #0d1117;
-            --color-bg-warm: #161b22;
-            --color-bg-cool: #21262d;
-            --color-text: #c9d1d9;
-            --color-text-secondary: #8b949e;
-            --color-text-light: #6e7681;
-            --color-accent: #2f81f7;
-            --color-accent-light: #58a6ff;
-            --color-accent-soft: rgba(47,129,247,0.1);
-            --color-accent-border: rgba(47,129,247,0.4);
-            --gradient-accent: linear-gradient(135deg, #2f81f7 0%, #1f6feb 100%);
-            --gradient-dark: linear-gradient(160deg, #010409 0%, #0d1117 40%, #161b22 70%, #2f81f7 100%);
-            --gradient-warm: linear-gradient(135deg, #161b22 0%, #21262d 100%);
-            --color-cover-card-bg: rgba(1, 4, 9, 0.85);
-            --color-cover-glow-1: rgba(47, 129, 247, 0.15);
-            --color-cover-glow-2: rgba(88, 166, 255, 0.10);
-            --color-cover-pattern-1: rgba(47, 129, 247, 0.05);
-            --color-cover-pattern-2: rgba(88, 166, 255, 0.03);
-            --color-accent-shadow: rgba(47, 129, 247, 0.2);
-            --shadow-card: 0 4px 30px rgba(0, 0, 0, 0.5);
-            --shadow-glow: 0 0 50px rgba(47, 129, 247, 0.15);
-            --font-body: 'Inter', -apple-system, BlinkMacSystemFont, "Segoe UI", sans-serif;
-            --font-display: 'Inter', -apple-system, sans-serif;
-        }""",
-
-        "Tech Startup": """:root {
-            --color-bg: #ffffff;
-            --color-bg-warm: #f8f9fa;
-            --color-bg-cool: #f1f3f5;
-            --color-text: #212529;
-            --color-text-secondary: #495057;
-            --color-text-light: #868e96;
-            --color-accent: #5c7cfa;
-            --color-accent-light: #748ffc;
-            --color-accent-soft: rgba(92,124,250,0.08);
-            --color-accent-border: rgba(92,124,250,0.2);
-            --gradient-accent: linear-gradient(135deg, #5c7cfa 0%, #845ef7 100%);
-            --gradient-dark: linear-gradient(160deg, #182440 0%, #2b3a67 40%, #4c5ea3 70%, #5c7cfa 100%);
-            --gradient-warm: linear-gradient(135deg, #f8f9fa 0%, #f1f3f5 100%);
-            --color-cover-card-bg: rgba(24, 36, 64, 0.8);
-            --color-cover-glow-1: rgba(92, 124, 250, 0.2);
-            --color-cover-glow-2: rgba(132, 94, 247, 0.15);
-            --color-cover-pattern-1: rgba(92, 124, 250, 0.08);
-            --color-cover-pattern-2: rgba(132, 94, 247, 0.05);
-            --color-accent-shadow: rgba(92, 124, 250, 0.25);
-            --shadow-card: 0 10px 40px rgba(0, 0, 0, 0.08);
-            --shadow-glow: 0 0 60px rgba(92, 124, 250, 0.15);
-            --font-body: 'Open Sans', 'Helvetica Neue', sans-serif;
-            --font-display: 'Poppins', 'Montserrat', sans-serif;
-        }""",
-
-        "Didático Cursos": """:root {
-            --color-bg: #FCFCFD;
-            --color-bg-warm: #F4F5F7;
-            --color-bg-cool: #EBECF0;
-            --color-text: #172B4D;
-            --color-text-secondary: #42526E;
-            --color-text-light: #6B778C;
-            --color-accent: #0052CC;
-            --color-accent-light: #2684FF;
-            --color-accent-soft: rgba(0,82,204,0.05);
-            --color-accent-border: rgba(0,82,204,0.15);
-            --gradient-accent: linear-gradient(135deg, #0052CC 0%, #0065FF 100%);
-            --gradient-dark: linear-gradient(160deg, #091E42 0%, #172B4D 40%, #253858 70%, #0052CC 100%);
-            --gradient-warm: linear-gradient(135deg, #F4F5F7 0%, #EBECF0 100%);
-            --color-cover-card-bg: rgba(9, 30, 66, 0.85);
-            --color-cover-glow-1: rgba(0, 82, 204, 0.15);
-            --color-cover-glow-2: rgba(38, 132, 255, 0.1);
-            --color-cover-pattern-1: rgba(0, 82, 204, 0.06);
-            --color-cover-pattern-2: rgba(38, 132, 255, 0.04);
-            --color-accent-shadow: rgba(0, 82, 204, 0.2);
-            --shadow-card: 0 4px 12px rgba(9, 30, 66, 0.08);
-            --shadow-glow: 0 0 30px rgba(0, 82, 204, 0.1);
-            --font-body: 'Roboto', 'Helvetica Neue', sans-serif;
-            --font-display: 'Roboto Slab', serif;
-        }""",
-
-        "Acadêmico Clean": """:root {
-            --color-bg: #FFFFFF;
-            --color-bg-warm: #FBFBFB;
-            --color-bg-cool: #F5F5F5;
-            --color-text: #222222;
-            --color-text-secondary: #555555;
-            --color-text-light: #888888;
-            --color-accent: #7C2A3B;
-            --color-accent-light: #A4384E;
-            --color-accent-soft: rgba(124,42,59,0.05);
-            --color-accent-border: rgba(124,42,59,0.15);
-            --gradient-accent: linear-gradient(135deg, #7C2A3B 0%, #521C27 100%);
-            --gradient-dark: linear-gradient(160deg, #1C0A0D 0%, #38131A 40%, #521C27 70%, #7C2A3B 100%);
-            --gradient-warm: linear-gradient(135deg, #FBFBFB 0%, #F5F5F5 100%);
-            --color-cover-card-bg: rgba(28, 10, 13, 0.85);
-            --color-cover-glow-1: rgba(124, 42, 59, 0.15);
-            --color-cover-glow-2: rgba(164, 56, 78, 0.1);
-            --color-cover-pattern-1: rgba(124, 42, 59, 0.05);
-            --color-cover-pattern-2: rgba(164, 56, 78, 0.03);
-            --color-accent-shadow: rgba(124, 42, 59, 0.2);
-            --shadow-card: 0 4px 15px rgba(0,0,0,0.05);
-            --shadow-glow: 0 0 30px rgba(124, 42, 59, 0.1);
-            --font-body: 'Times New Roman', 'Lora', serif;
-            --font-display: 'Times New Roman', 'Lora', serif;
-        }""",
-
-        "Agência Digital (Vibrante)": """:root {
-            --color-bg: #ffffff;
-            --color-bg-warm: #fef6fa;
-            --color-bg-cool: #fcf0f5;
-            --color-text: #212529;
-            --color-text-secondary: #495057;
-            --color-text-light: #adb5bd;
-            --color-accent: #f03e3e;
-            --color-accent-light: #ff6b6b;
-            --color-accent-soft: rgba(240,62,62,0.08);
-            --color-accent-border: rgba(240,62,62,0.2);
-            --gradient-accent: linear-gradient(135deg, #f03e3e 0%, #fd7e14 100%);
-            --gradient-dark: linear-gradient(160deg, #340909 0%, #5c1818 40%, #ab2929 70%, #f03e3e 100%);
-            --gradient-warm: linear-gradient(135deg, #fef6fa 0%, #fcf0f5 100%);
-            --color-cover-card-bg: rgba(52, 9, 9, 0.85);
-            --color-cover-glow-1: rgba(240, 62, 62, 0.2);
-            --color-cover-glow-2: rgba(253, 126, 20, 0.15);
-            --color-cover-pattern-1: rgba(240, 62, 62, 0.08);
-            --color-cover-pattern-2: rgba(253, 126, 20, 0.05);
-            --color-accent-shadow: rgba(240, 62, 62, 0.25);
-            --shadow-card: 0 10px 30px rgba(240, 62, 62, 0.15);
-            --shadow-glow: 0 0 50px rgba(240, 62, 62, 0.2);
-            --font-body: 'Montserrat', sans-serif;
-            --font-display: 'Bebas Neue', 'Montserrat', sans-serif;
-        }""",
-
-        "Dark Mode Elegante": """:root {
-            --color-bg: #121212;
-            --color-bg-warm: #181818;
-            --color-bg-cool: #282828;
-            --color-text: #e0e0e0;
-            --color-text-secondary: #a0a0a0;
-            --color-text-light: #606060;
-            --color-accent: #bb86fc;
-            --color-accent-light: #dfb8ff;
-            --color-accent-soft: rgba(187,134,252,0.1);
-            --color-accent-border: rgba(187,134,252,0.3);
-            --gradient-accent: linear-gradient(135deg, #bb86fc 0%, #3700b3 100%);
-            --gradient-dark: linear-gradient(160deg, #000000 0%, #121212 40%, #181818 70%, #bb86fc 100%);
-            --gradient-warm: linear-gradient(135deg, #181818 0%, #282828 100%);
-            --color-cover-card-bg: rgba(0, 0, 0, 0.8);
-            --color-cover-glow-1: rgba(187, 134, 252, 0.15);
-            --color-cover-glow-2: rgba(55, 0, 179, 0.1);
-            --color-cover-pattern-1: rgba(187, 134, 252, 0.06);
-            --color-cover-pattern-2: rgba(55, 0, 179, 0.04);
-            --color-accent-shadow: rgba(187, 134, 252, 0.2);
-            --shadow-card: 0 4px 20px rgba(0,0,0,0.8);
-            --shadow-glow: 0 0 40px rgba(187, 134, 252, 0.15);
-            --font-body: 'Proxima Nova', 'Inter', sans-serif;
-            --font-display: 'Proxima Nova', 'Inter', sans-serif;
-        }""",
-
-        "Corporativo Clean": """:root {
-            --color-bg: #ffffff;
-            --color-bg-warm: #f0f4f8;
-            --color-bg-cool: #e8ecf1;
-            --color-text: #1a1a2e;
-            --color-text-secondary: #4a5568;
-            --color-text-light: #718096;
-            --color-accent: #003366;
-            --color-accent-light: #1a73e8;
-            --color-accent-soft: rgba(0,51,102,0.05);
-            --color-accent-border: rgba(0,51,102,0.12);
-            --gradient-accent: linear-gradient(135deg, #003366 0%, #00509e 50%, #1a73e8 100%);
-            --gradient-dark: linear-gradient(160deg, #0a1628 0%, #152238 40%, #1d3557 70%, #003366 100%);
-            --gradient-warm: linear-gradient(135deg, #f0f4f8 0%, #e8ecf1 100%);
-            --color-cover-card-bg: rgba(10, 22, 40, 0.72);
-            --color-cover-glow-1: rgba(0, 51, 102, 0.18);
-            --color-cover-glow-2: rgba(26, 115, 232, 0.12);
-            --color-cover-pattern-1: rgba(0, 51, 102, 0.06);
-            --color-cover-pattern-2: rgba(26, 115, 232, 0.04);
-            --color-accent-shadow: rgba(0, 51, 102, 0.25);
-            --shadow-card: 0 2px 20px rgba(0, 51, 102, 0.08);
-            --shadow-glow: 0 0 40px rgba(0, 51, 102, 0.10);
-            --font-body: 'Inter', 'Roboto', 'Segoe UI', sans-serif;
-            --font-display: 'Playfair Display', Georgia, serif;
-        }""",
-
-        "Sci-Fi Neon": """:root {
-            --color-bg: #0b0c10;
-            --color-bg-warm: #13141a;
-            --color-bg-cool: #1f2833;
-            --color-text: #c5c6c7;
-            --color-text-secondary: #a3a5a7;
-            --color-text-light: #7d7f81;
-            --color-accent: #45a29e;
-            --color-accent-light: #66fcf1;
-            --color-accent-soft: rgba(69,162,158,0.08);
-            --color-accent-border: rgba(102,252,241,0.15);
-            --gradient-accent: linear-gradient(135deg, #45a29e 0%, #66fcf1 50%, #00f5d4 100%);
-            --gradient-dark: linear-gradient(160deg, #020304 0%, #0b0c10 40%, #1f2833 70%, #45a29e 100%);
-            --gradient-warm: linear-gradient(135deg, #13141a 0%, #1f2833 100%);
-            --color-cover-card-bg: rgba(5, 6, 8, 0.75);
-            --color-cover-glow-1: rgba(69, 162, 158, 0.25);
-            --color-cover-glow-2: rgba(102, 252, 241, 0.15);
-            --color-cover-pattern-1: rgba(69, 162, 158, 0.10);
-            --color-cover-pattern-2: rgba(102, 252, 241, 0.06);
-            --color-accent-shadow: rgba(102, 252, 241, 0.35);
-            --shadow-card: 0 2px 20px rgba(69, 162, 158, 0.10);
-            --shadow-glow: 0 0 40px rgba(102, 252, 241, 0.20);
-            --font-body: 'Inter', 'Courier New', monospace;
-            --font-display: 'Playfair Display', 'Courier New', monospace;
-        }""",
-
-        "Romance Clássico": """:root {
-            --color-bg: #FFFAFC;
-            --color-bg-warm: #FFF0F5;
-            --color-bg-cool: #FFE8EF;
-            --color-text: #4A3B3F;
-            --color-text-secondary: #705B61;
-            --color-text-light: #9a8b90;
-            --color-accent: #b76e79;
-            --color-accent-light: #d18d96;
-            --color-accent-soft: rgba(183,110,121,0.07);
-            --color-accent-border: rgba(183,110,121,0.18);
-            --gradient-accent: linear-gradient(135deg, #b76e79 0%, #d18d96 50%, #e8a5b0 100%);
-            --gradient-dark: linear-gradient(160deg, #1a0f12 0%, #2d1f24 40%, #4A3B3F 70%, #b76e79 100%);
-            --gradient-warm: linear-gradient(135deg, #FFFAFC 0%, #FFF0F5 100%);
-            --color-cover-card-bg: rgba(26, 15, 18, 0.68);
-            --color-cover-glow-1: rgba(183, 110, 121, 0.22);
-            --color-cover-glow-2: rgba(232, 165, 176, 0.15);
-            --color-cover-pattern-1: rgba(183, 110, 121, 0.08);
-            --color-cover-pattern-2: rgba(209, 141, 150, 0.06);
-            --color-accent-shadow: rgba(183, 110, 121, 0.3);
-            --shadow-card: 0 2px 20px rgba(183, 110, 121, 0.08);
-            --shadow-glow: 0 0 40px rgba(183, 110, 121, 0.12);
-            --font-body: Georgia, 'Palatino Linotype', serif;
-            --font-display: 'Playfair Display', Georgia, serif;
-        }""",
-
-        "Cyberpunk": """:root {
-            --color-bg: #12041D;
-            --color-bg-warm: #1A0A29;
-            --color-bg-cool: #240F38;
-            --color-text: #E0E0FF;
-            --color-text-secondary: #B0B0CC;
-            --color-text-light: #8080AA;
-            --color-accent: #FF00FF;
-            --color-accent-light: #F3E600;
-            --color-accent-soft: rgba(255,0,255,0.08);
-            --color-accent-border: rgba(255,0,255,0.20);
-            --gradient-accent: linear-gradient(135deg, #FF00FF 0%, #F3E600 50%, #00FFFF 100%);
-            --gradient-dark: linear-gradient(160deg, #050108 0%, #12041D 40%, #240F38 70%, #FF00FF 100%);
-            --gradient-warm: linear-gradient(135deg, #1A0A29 0%, #240F38 100%);
-            --color-cover-card-bg: rgba(5, 1, 8, 0.75);
-            --color-cover-glow-1: rgba(255, 0, 255, 0.25);
-            --color-cover-glow-2: rgba(243, 230, 0, 0.15);
-            --color-cover-pattern-1: rgba(255, 0, 255, 0.10);
-            --color-cover-pattern-2: rgba(0, 255, 255, 0.06);
-            --color-accent-shadow: rgba(255, 0, 255, 0.35);
-            --shadow-card: 0 2px 20px rgba(255, 0, 255, 0.10);
-            --shadow-glow: 0 0 40px rgba(255, 0, 255, 0.20);
-            --font-body: 'Inter', 'Consolas', monospace;
-            --font-display: 'Playfair Display', 'Consolas', monospace;
-        }""",
-
-        "Vintage / Retrô": """:root {
-            --color-bg: #F5E6D0;
-            --color-bg-warm: #E8D5BF;
-            --color-bg-cool: #DBC7AA;
-            --color-text: #3E2723;
-            --color-text-secondary: #5D4037;
-            --color-text-light: #8D6E63;
-            --color-accent: #8D6E63;
-            --color-accent-light: #A1887F;
-            --color-accent-soft: rgba(141,110,99,0.07);
-            --color-accent-border: rgba(141,110,99,0.18);
-            --gradient-accent: linear-gradient(135deg, #6D4C41 0%, #8D6E63 50%, #A1887F 100%);
-            --gradient-dark: linear-gradient(160deg, #1a100c 0%, #3E2723 40%, #5D4037 70%, #8D6E63 100%);
-            --gradient-warm: linear-gradient(135deg, #F5E6D0 0%, #E8D5BF 100%);
-            --color-cover-card-bg: rgba(26, 16, 12, 0.70);
-            --color-cover-glow-1: rgba(141, 110, 99, 0.20);
-            --color-cover-glow-2: rgba(161, 136, 127, 0.12);
-            --color-cover-pattern-1: rgba(141, 110, 99, 0.08);
-            --color-cover-pattern-2: rgba(109, 76, 65, 0.06);
-            --color-accent-shadow: rgba(141, 110, 99, 0.3);
-            --shadow-card: 0 2px 20px rgba(141, 110, 99, 0.08);
-            --shadow-glow: 0 0 40px rgba(141, 110, 99, 0.12);
-            --font-body: 'Palatino Linotype', 'Book Antiqua', Palatino, serif;
-            --font-display: 'Playfair Display', 'Palatino Linotype', serif;
-        }""",
-
-        "Aquarela Suave": """:root {
-            --color-bg: #fdfefe;
-            --color-bg-warm: #f4f8fa;
-            --color-bg-cool: #edf2f5;
-            --color-text: #4d5e6f;
-            --color-text-secondary: #7d8e9e;
-            --color-text-light: #a0b0c0;
-            --color-accent: #5DADE2;
-            --color-accent-light: #AED6F1;
-            --color-accent-soft: rgba(93,173,226,0.07);
-            --color-accent-border: rgba(93,173,226,0.18);
-            --gradient-accent: linear-gradient(135deg, #3498DB 0%, #5DADE2 50%, #85C1E9 100%);
-            --gradient-dark: linear-gradient(160deg, #0a1929 0%, #1a2f45 40%, #2c5f8a 70%, #5DADE2 100%);
-            --gradient-warm: linear-gradient(135deg, #f4f8fa 0%, #edf2f5 100%);
-            --color-cover-card-bg: rgba(10, 25, 41, 0.68);
-            --color-cover-glow-1: rgba(93, 173, 226, 0.22);
-            --color-cover-glow-2: rgba(174, 214, 241, 0.15);
-            --color-cover-pattern-1: rgba(93, 173, 226, 0.08);
-            --color-cover-pattern-2: rgba(52, 152, 219, 0.05);
-            --color-accent-shadow: rgba(93, 173, 226, 0.3);
-            --shadow-card: 0 2px 20px rgba(93, 173, 226, 0.08);
-            --shadow-glow: 0 0 40px rgba(93, 173, 226, 0.12);
-            --font-body: 'Inter', 'Verdana', sans-serif;
-            --font-display: 'Playfair Display', Georgia, serif;
-        }""",
-    }
-    
-    theme_base = theme.split(" - ")[0] if " - " in theme else theme
-    theme_css = css_dict.get(theme_base, css_dict["Minimalista Moderno"])
-
-    # Injetamos CSS adicional base para PDF + Sangria KDP
-    style = f"""
-    @page {{
-        size: A5;
-        margin: {bleed_mm}mm;
-        bleed: {bleed_mm}mm;
-    }}
-    @page colorful_page {{
-        margin: 0;
-        bleed: {bleed_mm}mm;
-    }}
-    {theme_css}
-    .chapter-img {{
-        width: 100%;
-        max-height: 400px;
-        object-fit: cover;
-        margin-bottom: 20px;
-        border-radius: 8px;
-    }}
-    .colorful-mode {{
-        page: colorful_page;
-        min-height: 100vh;
-        background-size: cover;
-        background-position: center;
-        background-repeat: no-repeat;
-        padding: 15mm;
-        box-sizing: border-box;
-    }}
-    .colorful-mode .glass-container {{
-        background-color: rgba(255, 255, 255, 0.92);
-        padding: 30px;
-        border-radius: 12px;
-        min-height: 85vh;
-    }}
+# Nas partes o rodapé fica vazio: a numeração global é carimbada depois do merge
+_CSS_PARTE = """
+    @page { @bottom-center { content: none; } }
+"""
+# Documento só com a numeração: páginas vazias e transparentes, mesmas regras @page
+_CSS_NUMERACAO = """
+    html, body { background: transparent !important; }
+    .np { height: 1px; break-after: page; }
+    .np:last-child { break-after: auto; }
+"""
+
+
+def _usar_paralelo(render_mode: str | None, n_capitulos: int) -> bool:
+    modo = render_mode or _RENDER_MODE
+    if modo == "single":
+        return False
+    pool = render_pool.get_pool()
+    if pool is None or pool.size < 2:
+        return False
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        return False
+    return modo == "parallel" or n_capitulos >= _PARALELO_MIN_CAPITULOS
+
+
+def compile_pdf_paralelo(
+    title: str,
+    author: str,
+    theme: str,
+    chapters: list[dict],
+    image_paths: list[str],
+    output_path: str,
+    style: str,
+    bleed_mm: int = 3,
+    colorful_mode: bool = False,
+    assets: AssetStore = None,
+    opcoes: dict = None,
+) -> str:
     """
-    return compile_pdf(html_content, output_path, style)
+    Layout de capa+sumário, de cada capítulo e da contracapa como documentos
+    separados, em paralelo no pool de render, seguido de merge (pypdf):
+
+    1. cada parte devolve o PDF e os metadados das páginas (âncoras, links,
+       marcadores, página nomeada)
+    2. um documento só de rodapés, com o total de páginas, carimba a
+       numeração global (mesmas regras @page do render único)
+    3. links do sumário para `#cap-N` e os marcadores são refeitos com os
+       índices globais das páginas
+    """
+    pool = render_pool.get_pool()
+    pasta = Path(output_path).with_suffix(".partes")
+    pasta.mkdir(parents=True, exist_ok=True)
+
+    # O :first de style.css é a capa; nas outras partes a 1ª página é uma página comum
+    css_frente = style + _CSS_PARTE
+    css_miolo = style + _CSS_PARTE + f"@page :first {{ margin: {bleed_mm}mm; }}"
+
+    total = len(chapters)
+    # (html, css, imagens da parte) — cada parte leva só os próprios assets para o worker
+    partes = [(
+        render_ebook_html(
+            title, author, theme, [{"title": ch["title"], "content_html": ""} for ch in chapters], [],
+            colorful_mode, secoes=["capa", "sumario"],
+        ),
+        css_frente,
+        None,
+    )]
+    for i, ch in enumerate(chapters):
+        html = render_ebook_html(
+            title, author, theme, [ch], image_paths[i:i + 1], colorful_mode,
+            secoes=["capitulos"], capitulo_inicial=i, total_capitulos=total, assets=assets,
+        )
+        partes.append((html, css_miolo, _payload(assets, html)))
+    partes.append((
+        render_ebook_html(title, author, theme, [], [], colorful_mode, secoes=["contracapa"]),
+        css_miolo,
+        None,
+    ))
+
+    try:
+        with ThreadPoolExecutor(max_workers=pool.size, thread_name_prefix="pdf-parte") as executor:
+            futuros = [
+                executor.submit(
+                    pool.render, html, str(pasta / f"parte_{n:03d}.pdf"), css,
+                    metadados=True, assets=imagens, opcoes=opcoes,
+                )
+                for n, (html, css, imagens) in enumerate(partes)
+            ]
+            resultados = [f.result() for f in futuros]
+
+        nomes = [pagina["nome"] for _, paginas in resultados for pagina in paginas]
+        numeracao = pool.render(
+            _html_numeracao(nomes), str(pasta / "numeracao.pdf"), style + _CSS_NUMERACAO, opcoes=opcoes
+        )
+        _mesclar_partes(resultados, numeracao, output_path, title, author)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    return os.path.abspath(output_path)
+
+
+def _html_numeracao(nomes_paginas: list[str]) -> str:
+    divs = "".join(
+        f'<div class="np" style="page: {nome}"></div>' if nome else '<div class="np"></div>'
+        for nome in nomes_paginas
+    )
+    return f'<html lang="pt-BR"><body>{divs}</body></html>'
+
+
+def _mesclar_partes(resultados: list[tuple[str, list[dict]]], numeracao_path: str,
+                    output_path: str, title: str, author: str):
+    from pypdf import PdfReader, PdfWriter
+    from pypdf.annotations import Link
+    from pypdf.generic import Fit
+
+    writer = PdfWriter()
+    paginas, parte_da_pagina = [], []
+    for n, (caminho, meta) in enumerate(resultados):
+        writer.append(caminho, import_outline=False)
+        paginas.extend(meta)
+        parte_da_pagina.extend([n] * len(meta))
+
+    numeros = PdfReader(numeracao_path)
+    for pagina, numero in zip(writer.pages, numeros.pages):
+        pagina.merge_page(numero)
+
+    def _ponto(i: int, x: float, y: float) -> tuple[float, float]:
+        return x * _PT_POR_PX, (paginas[i]["altura"] - y) * _PT_POR_PX
+
+    # Âncoras globais (primeira ocorrência vence, como no render único)
+    ancoras: dict[str, tuple[int, tuple[float, float]]] = {}
+    for i, pagina in enumerate(paginas):
+        for nome, pos in pagina["ancoras"].items():
+            ancoras.setdefault(nome, (i, pos))
+
+    # Links entre partes (os internos a uma parte o WeasyPrint já escreveu)
+    for i, pagina in enumerate(paginas):
+        for alvo, (x, y, largura, altura) in pagina["links"]:
+            destino = ancoras.get(alvo)
+            if destino is None or parte_da_pagina[destino[0]] == parte_da_pagina[i]:
+                continue
+            j, (ax, ay) = destino
+            x0, y0 = _ponto(i, x, y + altura)
+            x1, y1 = _ponto(i, x + largura, y)
+            left, top = _ponto(j, ax, ay)
+            writer.add_annotation(i, Link(rect=(x0, y0, x1, y1), target_page_index=j, fit=Fit.xyz(left, top)))
+
+    # Marcadores (outline) reconstruídos na ordem do livro
+    pilha = []
+    for i, pagina in enumerate(paginas):
+        for nivel, rotulo, (x, y) in pagina["marcadores"]:
+            while pilha and pilha[-1][0] >= nivel:
+                pilha.pop()
+            left, top = _ponto(i, x, y)
+            item = writer.add_outline_item(
+                rotulo, i, parent=pilha[-1][1] if pilha else None, fit=Fit.xyz(left, top)
+            )
+            pilha.append((nivel, item))
+
+    writer.add_metadata({"/Title": f"{title} — {author}", "/Author": author})
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "wb") as f:
+        writer.write(f)
+
+
+# =====================================================================
+# Benchmarks: render único × paralelo  (python -m api.pdf_engine)
+#             perfis de saída           (python -m api.pdf_engine perfis)
+# =====================================================================
+def benchmark(tamanhos=(5, 20, 50), theme: str = "Minimalista Moderno") -> list[dict]:
+    """Mede os dois modos em livros sintéticos de 5, 20 e 50 capítulos (3 páginas cada)."""
+    pasta = _PROJECT_ROOT / "output" / "benchmark"
+    resultados = []
+    for n in tamanhos:
+        capitulos = _capitulos_sinteticos(n)
+        linha = {"capitulos": n}
+        for modo in ("single", "parallel"):
+            inicio = time.perf_counter()
+            generate_pdf(
+                "Benchmark", "BookBot", theme, capitulos, [],
+                str(pasta / f"bench_{n}_{modo}.pdf"), render_mode=modo,
+            )
+            linha[modo] = round(time.perf_counter() - inicio, 2)
+        linha["ganho"] = round(linha["single"] / linha["parallel"], 2)
+        resultados.append(linha)
+        print(f"{n:>3} capítulos | único {linha['single']:>7.2f}s | paralelo {linha['parallel']:>7.2f}s | {linha['ganho']}x")
+    return resultados
+
+
+def benchmark_perfis(capitulos: int = 10, theme: str = "Minimalista Moderno") -> list[dict]:
+    """Tamanho e tempo de cada perfil de saída num livro sintético com imagem em todo capítulo."""
+    from api.image_generator import _create_pillow_image
+
+    store = AssetStore("benchmark", _PROJECT_ROOT / "output" / "benchmark" / "assets")
+    try:
+        imagens = [
+            store.put(f"chapter_{i + 1}", _create_pillow_image(f"Capítulo {i + 1}", i, theme))
+            for i in range(capitulos)
+        ]
+        resultados = []
+        for nome in pdf_profiles.PROFILES:
+            generate_pdf(
+                "Benchmark", "BookBot", theme, _capitulos_sinteticos(capitulos), imagens,
+                str(_PROJECT_ROOT / "output" / "benchmark" / f"perfil_{nome}.pdf"),
+                render_mode="single", assets=store, profile=nome,
+            )
+            resultados.append(pdf_profiles.stats()[nome]["ultimo"])
+    finally:
+        store.release()
+    for r in resultados:
+        print(f"{r['perfil']:>7} | {r['bytes'] / 1024:>8.0f} KB | {r['segundos']:>6.2f}s")
+    return resultados
+
+
+def _capitulos_sinteticos(n: int) -> list[dict]:
+    paragrafo = (
+        "A tipografia de um e-book é o que o leitor sente antes de ler. "
+        "Espaçamento, hifenização e ritmo vertical fazem o texto respirar. " * 6
+    )
+    corpo = "\n\n".join(
+        f"## Seção {s}\n\n{paragrafo}\n\n{paragrafo}\n\n- item um\n- item dois\n" for s in range(1, 4)
+    )
+    return [{"title": f"Capítulo de teste {i + 1}", "content": corpo} for i in range(n)]
+
+
+if __name__ == "__main__":
+    # Aquece o pool antes de medir: o custo de subida não é do render
+    pool = render_pool.get_pool()
+    if pool is not None:
+        generate_pdf("Aquecimento", "BookBot", "Minimalista Moderno",
+                     [{"title": "Aquecimento", "content": "Texto."}], [],
+                     str(_PROJECT_ROOT / "output" / "benchmark" / "aquecimento.pdf"), render_mode="single")
+    import sys
+
+    if "perfis" in sys.argv[1:]:
+        benchmark_perfis()
+    else:
+        benchmark()
+    render_pool.shutdown()
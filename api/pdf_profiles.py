@@ -0,0 +1,104 @@
+"""
+Perfis de Saída do PDF
+=======================
+As imagens entram no PDF do jeito que o provedor devolveu (até 800x1200,
+JPEG q92), sem controle de resolução: o tamanho dos arquivos em `output/`
+varia muito, e isso pesa no upload para o Supabase e no download.
+
+Cada perfil fixa, para a página A5:
+  - `dpi`           → resolução máxima das imagens (o WeasyPrint reamostra acima disso)
+  - `jpeg_quality`  → recompressão JPEG (None mantém os bytes originais)
+  - `optimize_images` e o subset de fontes (`full_fonts`/`hinting`)
+
+Perfis: screen (padrão, PDF_PROFILE), ebook e print (KDP, 300 DPI).
+Cada render registra tamanho e tempo por perfil → `stats()` (/health).
+"""
+
+import os
+import threading
+from dataclasses import asdict, dataclass
+
+
+@dataclass(frozen=True)
+class PdfProfile:
+    name: str
+    dpi: int
+    jpeg_quality: int | None
+    optimize_images: bool = True
+    full_fonts: bool = False
+    hinting: bool = False
+
+    def weasyprint_options(self) -> dict:
+        """Opções do WeasyPrint: as de imagem valem no layout, as de fonte na escrita do PDF."""
+        return {
+            "dpi": self.dpi,
+            "jpeg_quality": self.jpeg_quality,
+            "optimize_images": self.optimize_images,
+            "full_fonts": self.full_fonts,
+            "hinting": self.hinting,
+        }
+
+
+PROFILES = {
+    # Leitura em tela/celular: imagens leves, fontes em subset
+    "screen": PdfProfile("screen", dpi=96, jpeg_quality=70),
+    # Leitores e tablets com tela densa
+    "ebook": PdfProfile("ebook", dpi=150, jpeg_quality=82),
+    # Impressão (KDP pede 300 DPI); subset de fontes é aceito pela KDP
+    "print": PdfProfile("print", dpi=300, jpeg_quality=92),
+}
+_ALIASES = {"kdp": "print", "tela": "screen", "impressao": "print", "impressão": "print"}
+
+DEFAULT_PROFILE = os.getenv("PDF_PROFILE", "screen")
+
+
+def validate_profile(nome: str) -> str:
+    """Nome canônico do perfil; ValueError com a lista de válidos se não existir."""
+    chave = (nome or "").strip().casefold()
+    chave = _ALIASES.get(chave, chave)
+    if chave not in PROFILES:
+        raise ValueError(f"Perfil de PDF desconhecido: '{nome}'. Válidos: {', '.join(PROFILES)}")
+    return chave
+
+
+def get_profile(nome: str | None = None) -> PdfProfile:
+    """Perfil pelo nome (None → PDF_PROFILE)."""
+    return PROFILES[validate_profile(nome or DEFAULT_PROFILE)]
+
+
+# ---------------------------------------------------------------
+# Relatório por perfil (processo inteiro)
+# ---------------------------------------------------------------
+_stats = {nome: {"renders": 0, "bytes_total": 0, "segundos_total": 0.0, "ultimo": None} for nome in PROFILES}
+_lock = threading.Lock()
+
+
+def registrar(perfil: PdfProfile, caminho: str, segundos: float) -> dict:
+    """Registra o tamanho e o tempo de um PDF gerado; retorna o relatório desse render."""
+    relatorio = {
+        "perfil": perfil.name,
+        "bytes": os.path.getsize(caminho),
+        "segundos": round(segundos, 3),
+    }
+    with _lock:
+        item = _stats[perfil.name]
+        item["renders"] += 1
+        item["bytes_total"] += relatorio["bytes"]
+        item["segundos_total"] += segundos
+        item["ultimo"] = relatorio
+    print(f"[PDF] perfil {perfil.name}: {relatorio['bytes'] / 1024:.0f} KB em {segundos:.2f}s")
+    return relatorio
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            nome: {
+                **asdict(PROFILES[nome]),
+                "renders": item["renders"],
+                "bytes_medio": item["bytes_total"] // item["renders"] if item["renders"] else None,
+                "segundos_medio": round(item["segundos_total"] / item["renders"], 3) if item["renders"] else None,
+                "ultimo": item["ultimo"],
+            }
+            for nome, item in _stats.items()
+        }
@@ -0,0 +1,179 @@
+"""
+Saúde dos Provedores de LLM — Circuit Breaker + Cache de Modelos
+=================================================================
+Registro único no processo com um circuit breaker por (provedor, modelo)
+e um cache com TTL dos modelos que responderam 404/"not found".
+
+Fluxo do breaker:
+  closed    → chamadas passam; N falhas seguidas abrem o circuito
+  open      → chamadas são puladas na hora até `reset_timeout` expirar
+  half_open → uma única chamada de prova; sucesso fecha, falha reabre
+
+429/quota não conta como falha: quem cuida disso é o rate limiter.
+"""
+
+import threading
+import time
+
+from api.rate_limiter import is_rate_limit_error
+
+
+_FAILURE_THRESHOLD = 3
+_RESET_TIMEOUT_S = 30.0
+_UNAVAILABLE_TTL_S = 600.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def is_not_found_error(error: Exception) -> bool:
+    """Reconhece 'modelo inexistente/indisponível' (404)."""
+    error_str = str(error)
+    return "404" in error_str or "not found" in error_str.lower()
+
+
+class CircuitBreaker:
+    """Circuit breaker clássico (closed/open/half-open), seguro para threads."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = _FAILURE_THRESHOLD,
+        reset_timeout: float = _RESET_TIMEOUT_S,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """True se a chamada deve ser tentada agora."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_neutral(self):
+        """Resultado que não diz nada sobre a saúde (ex.: 429): só libera o probe."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            state = self._current_state()
+            self._failures += 1
+            self._probe_in_flight = False
+            if state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            retry_in = 0.0
+            if state == OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "retry_in_s": round(retry_in, 1),
+            }
+
+
+_breakers: dict[tuple[str, str], CircuitBreaker] = {}
+# (provedor, modelo) → instante (monotonic) até o qual o modelo é considerado inexistente
+_unavailable_until: dict[tuple[str, str], float] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(provider: str, model: str) -> CircuitBreaker:
+    """Retorna o breaker compartilhado do (provedor, modelo), criando-o sob demanda."""
+    key = (provider, model)
+    with _registry_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(f"{provider}/{model}")
+            _breakers[key] = breaker
+        return breaker
+
+
+def is_available(provider: str, model: str) -> bool:
+    """Consulta o cache de disponibilidade (entradas expiram após o TTL)."""
+    key = (provider, model)
+    with _registry_lock:
+        until = _unavailable_until.get(key)
+        if until is None:
+            return True
+        if time.monotonic() >= until:
+            del _unavailable_until[key]
+            return True
+        return False
+
+
+def should_try(provider: str, model: str) -> bool:
+    """Decide se vale a pena chamar o (provedor, modelo) agora ou pular direto."""
+    return is_available(provider, model) and get_breaker(provider, model).allow()
+
+
+def is_healthy(provider: str, model: str) -> bool:
+    """Como `should_try`, mas sem consumir o probe do half-open (só consulta)."""
+    return is_available(provider, model) and get_breaker(provider, model).state != OPEN
+
+
+def record_success(provider: str, model: str):
+    get_breaker(provider, model).record_success()
+
+
+def record_failure(provider: str, model: str, error: Exception):
+    """Classifica o erro: 404 → cache de indisponível; 429 → ignorado; resto → breaker."""
+    breaker = get_breaker(provider, model)
+    if is_not_found_error(error):
+        with _registry_lock:
+            _unavailable_until[(provider, model)] = time.monotonic() + _UNAVAILABLE_TTL_S
+        breaker.record_neutral()  # o cache de disponibilidade já bloqueia o modelo
+    elif is_rate_limit_error(error):
+        breaker.record_neutral()
+    else:
+        breaker.record_failure()
+
+
+def snapshot_health() -> dict:
+    """Estado dos breakers e modelos marcados como indisponíveis."""
+    now = time.monotonic()
+    with _registry_lock:
+        breakers = list(_breakers.values())
+        unavailable = {
+            f"{provider}/{model}": round(until - now, 1)
+            for (provider, model), until in _unavailable_until.items()
+            if until > now
+        }
+    return {
+        "breakers": {b.name: b.snapshot() for b in breakers},
+        "unavailable_models": unavailable,
+    }
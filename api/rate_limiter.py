@@ -0,0 +1,174 @@
+"""
+Rate Limiter Adaptativo por Provedor
+=====================================
+Limitador único para o processo inteiro, um por (provedor, modelo).
+Combina um token bucket (requisições por segundo + rajada) com
+controle de concorrência AIMD: cada 429 corta os limites pela metade,
+cada sucesso os faz crescer aos poucos até o teto configurado.
+
+Em vez de `time.sleep` fixo após um 429, os chamadores pedem uma
+permissão e esperam na fila (barato) até que o provedor tenha folga.
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+
+# (provedor, modelo) → rate (req/s), burst, concorrência máxima
+# Valores iniciais conservadores; o AIMD ajusta em tempo de execução.
+_DEFAULTS = {
+    ("groq", "llama3-70b-8192"): {"rate": 0.5, "burst": 5, "max_concurrency": 8},
+    ("gemini", "*"): {"rate": 0.25, "burst": 3, "max_concurrency": 4},
+    ("gemini-image", "gemini-2.5-flash-image"): {"rate": 0.15, "burst": 2, "max_concurrency": 2},
+    ("replicate", "black-forest-labs/flux-schnell"): {"rate": 1.0, "burst": 4, "max_concurrency": 4},
+    ("pollinations", "*"): {"rate": 1.0, "burst": 4, "max_concurrency": 4},
+}
+_FALLBACK = {"rate": 0.5, "burst": 2, "max_concurrency": 2}
+
+# Intervalo de polling das esperas assíncronas quando não há slot de concorrência
+_ASYNC_POLL_S = 0.05
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Heurística usada em todo o projeto para reconhecer um 429/quota."""
+    error_str = str(error).lower()
+    return "429" in error_str or "quota" in error_str or "rate limit" in error_str
+
+
+class AdaptiveLimiter:
+    """Token bucket + concorrência AIMD, seguro para threads e para asyncio."""
+
+    def __init__(self, name: str, rate: float, burst: int, max_concurrency: int):
+        self.name = name
+        self.max_rate = rate
+        self.max_concurrency = max_concurrency
+        self.burst = burst
+
+        self._rate = rate
+        self._tokens = float(burst)
+        self._limit = float(max_concurrency)
+        self._in_flight = 0
+        self._last_refill = time.monotonic()
+        self._throttles = 0
+        self._successes = 0
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+
+    # -----------------------------------------------------------
+    # Estado interno (chamar sempre com o lock adquirido)
+    # -----------------------------------------------------------
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self._rate)
+        self._last_refill = now
+
+    def _try_take(self) -> float:
+        """Tenta reservar uma permissão. Retorna 0 se conseguiu, senão quanto esperar (s)."""
+        self._refill()
+        if self._in_flight >= int(self._limit):
+            return _ASYNC_POLL_S
+        if self._tokens < 1:
+            return (1 - self._tokens) / self._rate
+        self._tokens -= 1
+        self._in_flight += 1
+        return 0.0
+
+    def _release(self, throttled: bool, sucesso: bool):
+        """Devolve a permissão; só 429 reduz e só sucesso aumenta (erros e cancelamentos são neutros)."""
+        with self._cond:
+            self._in_flight -= 1
+            if throttled:
+                # Multiplicative decrease: metade da vazão e da concorrência
+                self._throttles += 1
+                self._limit = max(1.0, self._limit / 2)
+                self._rate = max(self.max_rate / 32, self._rate / 2)
+                self._tokens = 0.0
+            elif sucesso:
+                # Additive increase: ~+1 de concorrência a cada `limit` sucessos
+                self._successes += 1
+                self._limit = min(self.max_concurrency, self._limit + 1 / self._limit)
+                self._rate = min(self.max_rate, self._rate + self.max_rate / 10)
+            self._cond.notify_all()
+
+    # -----------------------------------------------------------
+    # API pública
+    # -----------------------------------------------------------
+    @contextmanager
+    def acquire(self):
+        """
+        Bloqueia até haver permissão. Exceções de rate limit dentro do bloco
+        reduzem os limites; blocos sem exceção contam como sucesso. Outras
+        exceções e cancelamentos (ex.: o perdedor de um hedge) só liberam a permissão.
+        """
+        with self._cond:
+            while (wait := self._try_take()) > 0:
+                self._cond.wait(timeout=wait)
+        throttled = sucesso = False
+        try:
+            yield self
+            sucesso = True
+        except Exception as e:
+            throttled = is_rate_limit_error(e)
+            raise
+        finally:
+            self._release(throttled, sucesso)
+
+    @asynccontextmanager
+    async def acquire_async(self):
+        """Versão assíncrona de `acquire` — espera com `asyncio.sleep`, sem travar o loop."""
+        while True:
+            with self._lock:
+                wait = self._try_take()
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        throttled = sucesso = False
+        try:
+            yield self
+            sucesso = True
+        except Exception as e:
+            throttled = is_rate_limit_error(e)
+            raise
+        finally:
+            self._release(throttled, sucesso)
+
+    def snapshot(self) -> dict:
+        """Limites atuais, para observabilidade."""
+        with self._lock:
+            self._refill()
+            return {
+                "rate_per_s": round(self._rate, 4),
+                "max_rate_per_s": self.max_rate,
+                "concurrency_limit": int(self._limit),
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._in_flight,
+                "tokens": round(self._tokens, 2),
+                "throttles": self._throttles,
+                "successes": self._successes,
+            }
+
+
+_limiters: dict[tuple[str, str], AdaptiveLimiter] = {}
+_registry_lock = threading.Lock()
+
+
+def get_limiter(provider: str, model: str = "*") -> AdaptiveLimiter:
+    """Retorna o limitador compartilhado do (provedor, modelo), criando-o sob demanda."""
+    key = (provider, model)
+    with _registry_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            cfg = _DEFAULTS.get(key) or _DEFAULTS.get((provider, "*")) or _FALLBACK
+            limiter = AdaptiveLimiter(f"{provider}/{model}", **cfg)
+            _limiters[key] = limiter
+        return limiter
+
+
+def snapshot_limits() -> dict:
+    """Estado de todos os limitadores já usados neste processo."""
+    with _registry_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.snapshot() for limiter in limiters}
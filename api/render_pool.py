@@ -0,0 +1,266 @@
+"""
+Pool de Processos de Render (WeasyPrint)
+=========================================
+O layout do WeasyPrint é Python puro: segura o GIL durante o livro inteiro
+e, a cada job, refaz o parse de `templates/style.css`, a descoberta de fontes
+do fontconfig/Pango e o carregamento dos dicionários de hifenização.
+
+Aqui cada worker é um processo de vida longa que, ao subir:
+  - importa o WeasyPrint e cria uma FontConfiguration única
+  - faz o parse do style.css base uma vez só
+  - renderiza um documento mínimo (pt-BR, `hyphens: auto`) para aquecer
+    fontes e hifenização
+  - usa o url_fetcher offline, cujo cache de fontes vive junto com o worker
+
+Depois disso recebe jobs por um Pipe. Cada job tem timeout próprio (o worker
+travado é morto e substituído) e o worker é reciclado após RENDER_POOL_MAX_JOBS
+renders, para conter vazamento de memória.
+
+`render()` é bloqueante: quem chama já está numa thread do executor "render".
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+_BASE_CSS = _PROJECT_ROOT / "templates" / "style.css"
+
+POOL_SIZE = int(os.getenv("RENDER_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+_MAX_JOBS = int(os.getenv("RENDER_POOL_MAX_JOBS", "50"))
+_TIMEOUT_S = float(os.getenv("RENDER_POOL_TIMEOUT_S", "300"))
+# Folhas de estilo extras (CSS por tema) mantidas já parseadas em cada worker
+_CSS_CACHE_MAX = 32
+
+_WARMUP_HTML = """<html lang="pt-BR"><body>
+<h1>Aquecimento</h1>
+<p style="hyphens: auto">Paralelepípedo inconstitucionalissimamente extraordinário.</p>
+</body></html>"""
+
+
+# ---------------------------------------------------------------
+# Lado do worker (processo filho)
+# ---------------------------------------------------------------
+def _worker_main(conn):
+    from weasyprint import CSS, HTML
+    from weasyprint.text.fonts import FontConfiguration
+
+    from api.url_fetcher import novo_url_fetcher
+
+    fetcher = novo_url_fetcher()
+    font_config = FontConfiguration()
+    base_css = CSS(filename=str(_BASE_CSS), font_config=font_config, url_fetcher=fetcher)
+    css_cache: dict[str, CSS] = {}
+
+    HTML(string=_WARMUP_HTML, base_url=str(_PROJECT_ROOT), url_fetcher=fetcher).write_pdf(
+        stylesheets=[base_css], font_config=font_config
+    )
+    conn.send(("pronto", os.getpid()))
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        html_content, output_path, additional_css, coletar_metadados, assets, opcoes = job
+        opcoes = opcoes or {}
+        try:
+            stylesheets = [base_css]
+            if additional_css:
+                css = css_cache.get(additional_css)
+                if css is None:
+                    if len(css_cache) >= _CSS_CACHE_MAX:
+                        css_cache.pop(next(iter(css_cache)))
+                    css = CSS(string=additional_css, font_config=font_config, url_fetcher=fetcher)
+                    css_cache[additional_css] = css
+                stylesheets.append(css)
+
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            # Fetcher por job só para o HTML: as imagens do job vêm junto (asset://)
+            fetcher_job = novo_url_fetcher(assets) if assets else fetcher
+            # Opções do perfil: as de imagem valem no layout, as de fonte na escrita
+            documento = HTML(string=html_content, base_url=str(_PROJECT_ROOT), url_fetcher=fetcher_job).render(
+                stylesheets=stylesheets, font_config=font_config, **opcoes
+            )
+            documento.write_pdf(output_path, **opcoes)
+            caminho = os.path.abspath(output_path)
+            conn.send(("ok", (caminho, _metadados(documento)) if coletar_metadados else caminho))
+        except Exception as e:
+            conn.send(("erro", f"{type(e).__name__}: {e}"))
+
+
+def _metadados(documento) -> list[dict]:
+    """Por página: tamanho, página nomeada, âncoras, links internos e marcadores (px CSS)."""
+    paginas = []
+    for page in documento.pages:
+        page_type = getattr(page._page_box, "page_type", None)
+        paginas.append({
+            "largura": page.width,
+            "altura": page.height,
+            "nome": getattr(page_type, "name", "") or "",
+            "ancoras": dict(page.anchors),
+            "links": [(alvo, tuple(ret)) for tipo, alvo, ret, *_ in page.links if tipo == "internal"],
+            "marcadores": [(nivel, rotulo, tuple(alvo)) for nivel, rotulo, alvo, *_ in page.bookmarks],
+        })
+    return paginas
+
+
+# ---------------------------------------------------------------
+# Lado do servidor
+# ---------------------------------------------------------------
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, filho = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(filho,), daemon=True)
+        self.process.start()
+        filho.close()
+        self.jobs = 0
+        self.pronto = False
+
+    def aguardar_pronto(self, timeout: float):
+        if self.pronto:
+            return
+        if not self.conn.poll(timeout):
+            raise TimeoutError("Worker de render não terminou o aquecimento a tempo.")
+        status, _ = self.conn.recv()
+        self.pronto = status == "pronto"
+
+    def encerrar(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=2)
+        self.matar()
+
+    def matar(self):
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=2)
+        self.conn.close()
+
+
+class RenderPool:
+    """Pool fixo de workers WeasyPrint aquecidos, com timeout por job e reciclagem."""
+
+    def __init__(self, size: int = POOL_SIZE, max_jobs: int = _MAX_JOBS, timeout: float = _TIMEOUT_S):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        # spawn: o processo web tem várias threads, e fork com threads vivas é frágil
+        self._ctx = multiprocessing.get_context("spawn")
+        self._livres: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._fechado = False
+        self._stats = {"renders": 0, "erros": 0, "timeouts": 0, "reciclados": 0}
+        for _ in range(size):
+            self._livres.put(_Worker(self._ctx))
+
+    def render(self, html_content: str, output_path: str, additional_css: str | None = None,
+               timeout: float | None = None, metadados: bool = False,
+               assets: dict[str, tuple[bytes, str]] | None = None, opcoes: dict | None = None):
+        """
+        Renderiza o PDF num worker livre (espera um vagar) e retorna o caminho absoluto.
+        Com `metadados=True` retorna (caminho, páginas) — ver `_metadados`.
+        `assets` são as imagens `asset://` usadas pelo HTML, enviadas junto com o job.
+        `opcoes` são as opções do WeasyPrint do perfil de saída (ver pdf_profiles).
+        """
+        timeout = self.timeout if timeout is None else timeout
+        worker = self._livres.get()
+        substituir = False
+        inicio = time.monotonic()
+        try:
+            worker.aguardar_pronto(timeout)
+            worker.conn.send((html_content, output_path, additional_css, metadados, assets, opcoes))
+            if not worker.conn.poll(max(0.0, timeout - (time.monotonic() - inicio))):
+                substituir = True
+                self._contar("timeouts")
+                raise TimeoutError(f"Render do PDF passou de {timeout:.0f}s.")
+            status, valor = worker.conn.recv()
+        except TimeoutError:
+            substituir = True
+            raise
+        except (EOFError, OSError) as e:
+            substituir = True
+            self._contar("erros")
+            raise RuntimeError(f"Worker de render morreu durante o job: {e}") from e
+        finally:
+            self._devolver(worker, substituir)
+
+        if status != "ok":
+            self._contar("erros")
+            raise RuntimeError(f"Falha no render do PDF: {valor}")
+        self._contar("renders")
+        return valor
+
+    def _devolver(self, worker: _Worker, substituir: bool):
+        worker.jobs += 1
+        if not substituir and worker.jobs < self.max_jobs:
+            self._livres.put(worker)
+            return
+        if substituir:
+            worker.matar()
+        else:
+            worker.encerrar()
+            self._contar("reciclados")
+        with self._lock:
+            if self._fechado:
+                return
+        self._livres.put(_Worker(self._ctx))
+
+    def _contar(self, chave: str):
+        with self._lock:
+            self._stats[chave] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "workers": self.size,
+                "livres": self._livres.qsize(),
+                "max_jobs_por_worker": self.max_jobs,
+            }
+
+    def close(self):
+        with self._lock:
+            self._fechado = True
+        while True:
+            try:
+                self._livres.get_nowait().encerrar()
+            except queue.Empty:
+                break
+
+
+_pool: RenderPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> RenderPool | None:
+    """Singleton do pool; None se desativado com RENDER_POOL_SIZE=0 (render no próprio processo)."""
+    global _pool
+    if POOL_SIZE <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = RenderPool()
+        return _pool
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+def stats() -> dict | None:
+    """Estatísticas do pool, sem criá-lo (None se ainda não subiu ou está desativado)."""
+    with _pool_lock:
+        return _pool.stats() if _pool is not None else None
@@ -0,0 +1,207 @@
+"""
+Renditions das Imagens do Job
+==============================
+A mesma imagem em tamanho cheio ia para o PDF (que o WeasyPrint reamostra a
+cada render), para a capa do EPUB e, em base64, para a capa 3D — cada
+consumidor relendo e reencodando o original.
+
+Aqui cada asset é decodificado uma vez e dele saem versões nomeadas, no
+formato certo para cada destino:
+
+    pdf-screen / pdf-ebook / pdf-print → página A5 no DPI do perfil, JPEG na qualidade do perfil
+    epub                               → até 1600x2560 (capa), JPEG q85
+    thumb                              → miniatura web 320x480, WebP (JPEG sem suporte a WebP)
+    texture                            → textura WebGL 1024x1024 (potência de dois), JPEG q85, recortada
+                                         antes na proporção da face da capa 3D (2:3), que a desfaz no mapeamento UV
+
+O decode usa `draft` (JPEG decodificado já em 1/2, 1/4 ou 1/8 pelo DCT) e
+`reduce` (redução inteira) antes do LANCZOS; as versões menores saem da
+maior já reduzida. Imagens com transparência viram PNG (ou WebP). Se a
+imagem já cabe e já está no formato, os bytes originais são reaproveitados.
+Arte vetorial (SVG) serve a todos os destinos como está.
+
+As renditions ficam no asset store do job, ao lado do original
+(`asset://job/chapter_1@epub`), e são liberadas junto com ele.
+"""
+
+import math
+from dataclasses import dataclass
+from io import BytesIO
+
+from PIL import Image, features
+
+from api.asset_store import AssetStore, is_asset_uri, sniff_mime
+from api.pdf_profiles import PROFILES, get_profile
+
+
+_A5_MM = (148, 210)
+_WEBP = features.check("webp")
+
+
+@dataclass(frozen=True)
+class Rendition:
+    name: str
+    max_width: int
+    max_height: int
+    format: str
+    quality: int
+    power_of_two: bool = False
+    # Proporção largura/altura em que a imagem é recortada (centro) antes de redimensionar
+    aspect: float | None = None
+
+    def tamanho(self, largura: int, altura: int) -> tuple[int, int]:
+        """Tamanho final para uma imagem largura x altura (nunca amplia, salvo a textura)."""
+        if self.power_of_two:
+            return self.max_width, self.max_height
+        escala = min(1.0, self.max_width / largura, self.max_height / altura)
+        return max(1, round(largura * escala)), max(1, round(altura * escala))
+
+
+def _rendition_pdf(perfil) -> Rendition:
+    largura, altura = (math.ceil(mm / 25.4 * perfil.dpi) for mm in _A5_MM)
+    return Rendition(f"pdf-{perfil.name}", largura, altura, "JPEG", perfil.jpeg_quality or 92)
+
+
+RENDITIONS = {
+    **{f"pdf-{nome}": _rendition_pdf(perfil) for nome, perfil in PROFILES.items()},
+    "epub": Rendition("epub", 1600, 2560, "JPEG", 85),
+    "thumb": Rendition("thumb", 320, 480, "WEBP" if _WEBP else "JPEG", 75),
+    # A face da capa no engine_3d é um BoxGeometry 3 x 4.5
+    "texture": Rendition("texture", 1024, 1024, "JPEG", 85, power_of_two=True, aspect=3 / 4.5),
+}
+
+_MIME = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+
+def pdf_rendition(profile: str | None = None) -> str:
+    """Nome da rendition usada pelo PDF no perfil dado (None → PDF_PROFILE)."""
+    return f"pdf-{get_profile(profile).name}"
+
+
+# ---------------------------------------------------------------
+# Decode único → várias saídas
+# ---------------------------------------------------------------
+def _recortar(img: Image.Image, aspecto: float) -> Image.Image:
+    """Recorte central na proporção largura/altura `aspecto`."""
+    if abs(img.width / img.height - aspecto) < 0.01:
+        return img
+    if img.width / img.height > aspecto:
+        largura = round(img.height * aspecto)
+        x = (img.width - largura) // 2
+        return img.crop((x, 0, x + largura, img.height))
+    altura = round(img.width / aspecto)
+    y = (img.height - altura) // 2
+    return img.crop((0, y, img.width, y + altura))
+
+
+def _encaixar(img: Image.Image, tamanho: tuple[int, int]) -> Image.Image:
+    if img.size == tamanho:
+        return img
+    fator = min(img.width // tamanho[0], img.height // tamanho[1])
+    if fator >= 2:
+        img = img.reduce(fator)
+    return img.resize(tamanho, Image.LANCZOS)
+
+
+def _codificar(img: Image.Image, rendition: Rendition) -> tuple[bytes, str]:
+    formato = rendition.format
+    transparente = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    if transparente and formato == "JPEG":
+        formato = "PNG"
+    if not transparente:
+        img = img.convert("RGB")
+    buffer = BytesIO()
+    if formato == "PNG":
+        img.save(buffer, "PNG", optimize=True)
+    else:
+        img.save(buffer, formato, quality=rendition.quality)
+    return buffer.getvalue(), _MIME[formato]
+
+
+def gerar(data: bytes, nomes) -> dict[str, tuple[bytes, str]]:
+    """Decodifica `data` uma vez e devolve `nome → (bytes, mime)` de cada rendition pedida."""
+    pedidas = [RENDITIONS[nome] for nome in dict.fromkeys(nomes)]
+    mime_original = sniff_mime(data)
+    if mime_original == "image/svg+xml":
+        return {r.name: (data, mime_original) for r in pedidas}
+    img = Image.open(BytesIO(data))
+    original = img.size
+    tamanhos = {r.name: r.tamanho(*original) for r in pedidas}
+
+    # O draft do JPEG só pode reduzir até o maior tamanho pedido
+    maior = max(tamanhos.values(), key=lambda t: t[0] * t[1])
+    img.draft(img.mode if img.mode in ("RGB", "L") else "RGB", maior)
+    img.load()
+    if img.mode not in ("RGB", "RGBA", "L", "LA"):
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+
+    saidas = {}
+    anterior = img
+    for r in sorted(pedidas, key=lambda r: tamanhos[r.name][0] * tamanhos[r.name][1], reverse=True):
+        tamanho = tamanhos[r.name]
+        if tamanho == original and _MIME[r.format] == mime_original and not r.power_of_two:
+            saidas[r.name] = (data, mime_original)
+            continue
+        # Versões menores partem da anterior já reduzida, se ela ainda cobre o tamanho
+        origem = anterior if anterior.width >= tamanho[0] and anterior.height >= tamanho[1] else img
+        if r.aspect:
+            origem = _recortar(origem, r.aspect)
+        versao = _encaixar(origem, tamanho)
+        saidas[r.name] = _codificar(versao, r)
+        if not r.power_of_two:
+            anterior = versao
+    return saidas
+
+
+# ---------------------------------------------------------------
+# Integração com o asset store
+# ---------------------------------------------------------------
+def _uri(uri: str, nome: str) -> str:
+    return f"{uri}@{nome}"
+
+
+def preparar(store: AssetStore, uris, nomes) -> int:
+    """
+    Gera de uma vez (um decode por imagem) as renditions `nomes` dos assets em
+    `uris` que ainda não as têm. Retorna quantas imagens foram decodificadas.
+    """
+    decodificadas = 0
+    for uri in dict.fromkeys(u for u in uris if is_asset_uri(u)):
+        faltam = [nome for nome in nomes if _uri(uri, nome) not in store]
+        item = store.get(uri) if faltam else None
+        if item is None or item[1] == "image/svg+xml":
+            continue
+        for nome, (dados, mime) in gerar(item[0], faltam).items():
+            store.put(uri.rsplit("/", 1)[1] + f"@{nome}", dados, mime)
+        decodificadas += 1
+    return decodificadas
+
+
+def preparar_livro(store: AssetStore, image_paths: list, profile: str | None = None, capa=()) -> int:
+    """
+    Renditions do livro numa passada: todas as imagens na versão do PDF do
+    perfil e a capa (primeira imagem do livro) também nas versões `capa` ("epub", "thumb"...).
+    """
+    pdf = pdf_rendition(profile)
+    refs = [ref for ref in image_paths if ref]
+    decodificadas = preparar(store, refs[:1], [pdf, *capa])
+    return decodificadas + preparar(store, refs[1:], [pdf])
+
+
+def rendition(store: AssetStore | None, ref: str | None, nome: str) -> str | None:
+    """
+    URI da rendition `nome` de um asset (gerada agora se ainda não existir).
+    Caminhos em disco, SVGs e referências vazias voltam como vieram.
+    """
+    if store is None or not is_asset_uri(ref) or ref not in store:
+        return ref
+    preparar(store, [ref], [nome])
+    return _uri(ref, nome) if _uri(ref, nome) in store else ref
+
+
+def renditions(store: AssetStore | None, refs, nome: str) -> list:
+    """`rendition` para uma lista (ex.: image_paths), com um decode por imagem."""
+    refs = list(refs)
+    if store is not None:
+        preparar(store, refs, [nome])
+    return [rendition(store, ref, nome) for ref in refs]
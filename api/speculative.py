@@ -0,0 +1,91 @@
+"""
+Geração Especulativa a partir do Chat
+======================================
+Quando o /chat devolve um `ebook_data` completo, o usuário quase sempre
+clica em gerar segundos depois. Com o modo especulativo ligado, a escrita
+dos capítulos já começa em segundo plano, indexada por um hash do roteiro
+(título + capítulos/páginas). O tema visual fica de fora, como no prompt:
+trocar a capa antes de gerar ainda adota o trabalho. Um /generate-from-form com o mesmo
+roteiro adota o trabalho em voo (ou pronto) em vez de recomeçar.
+
+Especulações não reivindicadas são canceladas após SPECULATIVE_TTL_S.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+
+from api.content_generator import gerar_todos_capitulos_async
+
+
+SPECULATIVE_ENABLED = os.getenv("SPECULATIVE_GENERATION", "0") == "1"
+_TTL_S = float(os.getenv("SPECULATIVE_TTL_S", "300"))
+_MAX_EM_VOO = int(os.getenv("SPECULATIVE_MAX_IN_FLIGHT", "4"))
+
+# chave do roteiro → (tarefa, timer de expiração)
+_especulacoes: dict[str, tuple[asyncio.Task, asyncio.TimerHandle]] = {}
+_stats = {"iniciadas": 0, "adotadas": 0, "expiradas": 0}
+
+
+def outline_key(title: str, chapters: list[dict]) -> str:
+    """Hash estável do roteiro, no mesmo formato que o frontend envia ao /generate-from-form."""
+    payload = json.dumps(
+        {
+            "title": title.strip(),
+            "chapters": [[c["title"].strip(), int(c.get("pages") or 5)] for c in chapters],
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _expirar(chave: str):
+    item = _especulacoes.pop(chave, None)
+    if item is not None:
+        tarefa, _ = item
+        if not tarefa.done():
+            tarefa.cancel()
+        _stats["expiradas"] += 1
+        print(f"[Especulativo] Roteiro {chave[:10]} não reivindicado em {_TTL_S:.0f}s, descartado.")
+
+
+def iniciar(title: str, chapters: list[dict]) -> str | None:
+    """
+    Dispara a escrita especulativa dos capítulos no event loop atual.
+    Retorna a chave do roteiro, ou None se já havia especulação igual ou o limite foi atingido.
+    """
+    chave = outline_key(title, chapters)
+    if chave in _especulacoes or len(_especulacoes) >= _MAX_EM_VOO:
+        return None
+
+    loop = asyncio.get_running_loop()
+    capitulos = [{"title": c["title"], "pages": int(c.get("pages") or 5)} for c in chapters]
+    tarefa = loop.create_task(gerar_todos_capitulos_async(
+        titulo_livro=title,
+        capitulos=capitulos,
+    ))
+    # Recupera a exceção para não poluir o log com "Task exception was never retrieved"
+    tarefa.add_done_callback(lambda t: t.cancelled() or t.exception())
+    _especulacoes[chave] = (tarefa, loop.call_later(_TTL_S, _expirar, chave))
+    _stats["iniciadas"] += 1
+    print(f"[Especulativo] Escrevendo '{title}' ({len(capitulos)} capítulos) antes do clique...")
+    return chave
+
+
+def reivindicar(title: str, chapters: list[dict]) -> asyncio.Task | None:
+    """Retira a especulação que bate com o roteiro (em voo ou concluída), se existir."""
+    item = _especulacoes.pop(outline_key(title, chapters), None)
+    if item is None:
+        return None
+    tarefa, timer = item
+    timer.cancel()
+    if tarefa.cancelled():
+        return None
+    _stats["adotadas"] += 1
+    return tarefa
+
+
+def stats() -> dict:
+    return {**_stats, "em_voo": len(_especulacoes), "ativo": SPECULATIVE_ENABLED, "ttl_s": _TTL_S}
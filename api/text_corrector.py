@@ -3,27 +3,381 @@ Módulo de Correção Ortográfica e Gramatical
 =============================================
 Utiliza language-tool-python para analisar e corrigir
 automaticamente erros em cada capítulo antes da renderização.
+
+O capítulo inteiro ia para uma única instância do LanguageTool, com a
+sintaxe Markdown junto: blocos de código e URLs eram "corrigidos" e um
+capítulo longo esperava sozinho pelo único servidor Java.
+
+Agora:
+  - o Markdown é segmentado e só a prosa é verificada: blocos e trechos de
+    código, URLs, destinos de links/imagens, HTML, marcadores de título,
+    lista, citação e ênfase ficam de fora
+  - os parágrafos são agrupados em blocos de até LANGUAGETOOL_CHUNK_CHARS
+    caracteres (sempre quebrando entre parágrafos)
+  - os blocos são verificados em paralelo num pool de LANGUAGETOOL_WORKERS
+    instâncias — cada uma um servidor Java local próprio ou, com
+    LANGUAGETOOL_URL (lista separada por vírgulas), clientes de servidores
+    HTTP do LanguageTool já no ar
+  - cada correção volta para o offset exato no texto original; correções
+    que atravessam um trecho removido (ex.: em volta de um `código`) são descartadas
+
+`python -m api.text_corrector` mede um capítulo sintético de ~15 mil
+palavras com 1, 2 e 4 workers.
 """
 
+import bisect
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import language_tool_python
 
+from api.deadline import Orcamento
+
+
+_IDIOMA = "pt-BR"
+_WORKERS = int(os.getenv("LANGUAGETOOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+_URLS = [url.strip() for url in os.getenv("LANGUAGETOOL_URL", "").split(",") if url.strip()]
+_CHUNK_CHARS = int(os.getenv("LANGUAGETOOL_CHUNK_CHARS", "3000"))
+
+
+# ---------------------------------------------------------------
+# Segmentação do Markdown: só a prosa vai para o LanguageTool
+# ---------------------------------------------------------------
+_CERCA = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_REGUA = re.compile(r"^ {0,3}(?:([-*_])( *\1){2,}|=+) *$")  # régua ou sublinhado de título
+_TABELA_SEPARADOR = re.compile(r"^ *\|?( *:?-+:? *\|)+ *:?-*:? *$")
+_DEFINICAO_LINK = re.compile(r"^ {0,3}\[[^\]]+\]:\s")
+_HTML_BLOCO = re.compile(r"^ {0,3}</?[A-Za-z!][^>]*>")
+# Marcadores no início da linha: título, citação, item de lista (com checkbox)
+_PREFIXO = re.compile(r"^ {0,3}(?:#{1,6}(?:\s+|$)|>\s?|[-*+]\s+(?:\[[ xX]\]\s+)?|\d{1,9}[.)]\s+)*")
+# Trechos que não são prosa dentro de uma linha
+_INLINE = re.compile(
+    r"(`+).+?\1"                               # código inline
+    r"|!\[[^\]]*\]\([^)]*\)"                   # imagem (texto alternativo incluso)
+    r"|\]\([^)]*\)"                            # destino de link: ](url "título")
+    r"|\[\^[^\]]+\]"                           # referência de nota de rodapé
+    r"|<(?:https?://|mailto:)[^>]+>"           # autolink
+    r"|</?[A-Za-z][^>]*>"                      # tag HTML
+    r"|(?:https?://|www\.)[^\s<>()\[\]]+"      # URL solta
+    r"|[\w.+-]+@[\w-]+\.[\w.-]+"               # e-mail
+    r"|\*{1,3}|~~|(?<!\w)_{1,3}|_{1,3}(?!\w)"  # ênfase
+    r"|\[|\]"                                  # colchetes de link
+    r"|\s+#+\s*$"                              # fechamento de título ATX
+)
+
+
+def _trechos_linha(linha: str, inicio: int, tabela: bool) -> list:
+    """Trechos de prosa de uma linha, em offsets do texto original."""
+    prefixo = _PREFIXO.match(linha)
+    pos = prefixo.end() if prefixo else 0
+    itens = []
+    for m in _INLINE.finditer(linha, pos):
+        if m.start() > pos:
+            itens.append((inicio + pos, inicio + m.start()))
+        pos = m.end()
+    if pos < len(linha):
+        itens.append((inicio + pos, inicio + len(linha)))
+    if not tabela:
+        return itens
+    # Em tabelas, cada célula é um parágrafo à parte
+    celulas = []
+    for ini, fim in itens:
+        trecho = ini
+        for j in range(ini, fim):
+            if linha[j - inicio] == "|":
+                celulas += [(trecho, j), "\n\n"]
+                trecho = j + 1
+        celulas.append((trecho, fim))
+    return celulas
+
+
+def _paragrafos(texto: str) -> list[list]:
+    """
+    Divide o Markdown em parágrafos de prosa, pulando código, HTML e afins.
+    Cada parágrafo é uma lista de trechos (início, fim) do original e de
+    separadores (str), que entram no texto verificado sem correspondência no original.
+    """
+    paragrafos: list[list] = []
+    atual: list = []
+    cerca = None
+    anterior_em_branco = True
+    inicio = 0
+
+    def fechar():
+        nonlocal atual
+        if any(isinstance(item, tuple) for item in atual):
+            paragrafos.append(atual)
+        atual = []
+
+    for linha_com_quebra in texto.splitlines(keepends=True):
+        linha = linha_com_quebra.rstrip("\r\n")
+        pos, inicio = inicio, inicio + len(linha_com_quebra)
+
+        if cerca is not None:
+            if linha.lstrip().startswith(cerca):
+                cerca = None
+            continue
+        abertura = _CERCA.match(linha)
+        if abertura:
+            fechar()
+            cerca = abertura.group(1)
+            continue
+        em_branco = not linha.strip()
+        # Código indentado só começa depois de linha em branco (senão é continuação)
+        codigo_indentado = (linha.startswith("    ") or linha.startswith("\t")) and anterior_em_branco and not atual
+        if (
+            em_branco
+            or codigo_indentado
+            or _REGUA.match(linha)
+            or _TABELA_SEPARADOR.match(linha)
+            or _DEFINICAO_LINK.match(linha)
+            or _HTML_BLOCO.match(linha)
+        ):
+            fechar()
+            anterior_em_branco = em_branco or (codigo_indentado and anterior_em_branco)
+            continue
+        anterior_em_branco = False
+
+        tabela = linha.lstrip().startswith("|")
+        titulo = linha.lstrip().startswith("#")
+        if tabela or titulo:
+            fechar()
+        trechos = [t for t in _trechos_linha(linha, pos, tabela) if not isinstance(t, tuple) or t[1] > t[0]]
+        if atual and trechos:
+            atual.append("\n")
+        atual.extend(trechos)
+        if tabela or titulo:
+            fechar()
+    fechar()
+    return paragrafos
 
-# Singleton do LanguageTool para reutilização
-_tool: language_tool_python.LanguageTool | None = None
 
+class _Bloco:
+    """Texto enviado ao LanguageTool e o mapa de volta para o original."""
 
-def _get_tool() -> language_tool_python.LanguageTool | None:
-    """Retorna a instância singleton do LanguageTool (PT-BR) se disponível."""
-    global _tool
-    if _tool is None:
+    __slots__ = ("texto", "_inicios", "_trechos")
+
+    def __init__(self, original: str, paragrafos: list[list]):
+        partes, self._inicios, self._trechos = [], [], []
+        tamanho = 0
+        for n, paragrafo in enumerate(paragrafos):
+            itens = (["\n\n"] if n else []) + paragrafo
+            for item in itens:
+                if isinstance(item, tuple):
+                    self._inicios.append(tamanho)
+                    self._trechos.append(item)
+                    parte = original[item[0]:item[1]]
+                else:
+                    parte = item
+                partes.append(parte)
+                tamanho += len(parte)
+        self.texto = "".join(partes)
+
+    def para_original(self, offset: int, comprimento: int) -> tuple[int, int] | None:
+        """Converte (offset, comprimento) do bloco no intervalo do original, se contíguo."""
+        i = bisect.bisect_right(self._inicios, offset) - 1
+        if i < 0:
+            return None
+        ini, fim = self._trechos[i]
+        desloc = offset - self._inicios[i]
+        if desloc + comprimento > fim - ini:
+            return None  # cai num separador ou atravessa um trecho removido
+        return ini + desloc, ini + desloc + comprimento
+
+
+def segmentar(texto: str, limite: int = _CHUNK_CHARS) -> list[_Bloco]:
+    """Blocos de prosa do Markdown com até `limite` caracteres, quebrados entre parágrafos."""
+    blocos, grupo, tamanho = [], [], 0
+    for paragrafo in _paragrafos(texto):
+        chars = sum(fim - ini for ini, fim in (t for t in paragrafo if isinstance(t, tuple)))
+        if grupo and tamanho + chars > limite:
+            blocos.append(_Bloco(texto, grupo))
+            grupo, tamanho = [], 0
+        grupo.append(paragrafo)
+        tamanho += chars
+    if grupo:
+        blocos.append(_Bloco(texto, grupo))
+    return blocos
+
+
+def _offsets_python(texto: str):
+    """
+    O LanguageTool (Java) conta offsets em unidades UTF-16; fora do BMP
+    (emojis) isso diverge do índice Python. Devolve o conversor adequado.
+    """
+    if all(ord(c) <= 0xFFFF for c in texto):
+        return lambda offset: offset
+    unidades = [0]
+    for c in texto:
+        unidades.append(unidades[-1] + (2 if ord(c) > 0xFFFF else 1))
+    return lambda offset: bisect.bisect_left(unidades, offset)
+
+
+def _correcoes(bloco: _Bloco, matches) -> list[tuple[int, int, str]]:
+    """Correções do bloco como (início, fim, substituição) no texto original."""
+    converter = _offsets_python(bloco.texto)
+    correcoes = []
+    for match in matches:
+        if not match.replacements:
+            continue
+        ini = converter(match.offset)
+        fim = converter(match.offset + match.errorLength)
+        intervalo = bloco.para_original(ini, fim - ini)
+        if intervalo is not None:
+            correcoes.append((*intervalo, match.replacements[0]))
+    return correcoes
+
+
+def _aplicar(texto: str, correcoes: list[tuple[int, int, str]]) -> str:
+    """Aplica as correções do fim para o começo, descartando sobreposições."""
+    partes, limite = [], len(texto)
+    for ini, fim, substituicao in sorted(correcoes, reverse=True):
+        if fim > limite:
+            continue
+        partes += [texto[fim:limite], substituicao]
+        limite = ini
+    partes.append(texto[:limite])
+    return "".join(reversed(partes))
+
+
+# ---------------------------------------------------------------
+# Pool de instâncias do LanguageTool
+# ---------------------------------------------------------------
+class PoolLanguageTool:
+    """
+    N instâncias do LanguageTool, cada uma usada por uma thread por vez.
+    Sem URLs, cada instância sobe o seu servidor Java local; com URLs, as
+    instâncias são clientes HTTP distribuídos entre os servidores informados.
+    """
+
+    def __init__(self, tamanho: int = _WORKERS, urls: list[str] | None = None):
+        urls = _URLS if urls is None else urls
+        self.modo = "http" if urls else "local"
+        self._livres: list = []
+        self._cond = threading.Condition()
+        self._blocos = 0
+        self._segundos = 0.0
+
+        def criar(i: int):
+            try:
+                if urls:
+                    tool = language_tool_python.LanguageTool(_IDIOMA, remote_server=urls[i % len(urls)])
+                else:
+                    tool = language_tool_python.LanguageTool(_IDIOMA)
+            except Exception as e:
+                print(f"[Aviso] Instância {i + 1} do LanguageTool não subiu (Erro: {e}). O Java está instalado?")
+                return
+            with self._cond:
+                self._livres.append(tool)
+
+        # Os servidores Java levam segundos para subir: sobem todos ao mesmo tempo
+        threads = [threading.Thread(target=criar, args=(i,)) for i in range(max(1, tamanho))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self._instancias = list(self._livres)
+        self._executor = (
+            ThreadPoolExecutor(max_workers=len(self._instancias), thread_name_prefix="bookbot-languagetool")
+            if self._instancias else None
+        )
+
+    @property
+    def tamanho(self) -> int:
+        return len(self._instancias)
+
+    def _verificar(self, bloco: _Bloco) -> list[tuple[int, int, str]]:
+        with self._cond:
+            while not self._livres:
+                self._cond.wait()
+            tool = self._livres.pop()
+        inicio = time.perf_counter()
         try:
-            _tool = language_tool_python.LanguageTool('pt-BR')
+            matches = tool.check(bloco.texto)
         except Exception as e:
-            print(f"[Aviso] Corretor ortográfico desativado (Erro: {e}). O Java está instalado?")
-            return None
-    return _tool
+            print(f"[Aviso] LanguageTool falhou num bloco de {len(bloco.texto)} caracteres (Erro: {e}).")
+            matches = []
+        finally:
+            with self._cond:
+                self._livres.append(tool)
+                self._blocos += 1
+                self._segundos += time.perf_counter() - inicio
+                self._cond.notify()
+        return _correcoes(bloco, matches)
+
+    def verificar(self, blocos: list[_Bloco], pular=None) -> list[list[tuple[int, int, str]]]:
+        """
+        Verifica os blocos em paralelo e devolve as correções de cada um.
+        `pular(i)` é consultado quando o bloco i sai da fila (True → sem correções).
+        """
+        def tarefa(i: int):
+            if pular is not None and pular(i):
+                return []
+            return self._verificar(blocos[i])
+
+        if len(blocos) == 1 and pular is None:
+            return [self._verificar(blocos[0])]
+        return list(self._executor.map(tarefa, range(len(blocos))))
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "modo": self.modo,
+                "instancias": len(self._instancias),
+                "livres": len(self._livres),
+                "blocos_verificados": self._blocos,
+                "segundos_verificando": round(self._segundos, 1),
+            }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        for tool in self._instancias:
+            try:
+                tool.close()
+            except Exception:
+                pass
+
+
+_pool: PoolLanguageTool | None = None
+_pool_falhou = False
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> PoolLanguageTool | None:
+    """Pool singleton (PT-BR), ou None se nenhuma instância do LanguageTool subiu."""
+    global _pool, _pool_falhou
+    with _pool_lock:
+        if _pool is None and not _pool_falhou:
+            pool = PoolLanguageTool()
+            if pool.tamanho:
+                _pool = pool
+            else:
+                print("[Aviso] Corretor ortográfico desativado: nenhuma instância do LanguageTool disponível.")
+                _pool_falhou = True
+        return _pool
+
+
+def stats() -> dict | None:
+    with _pool_lock:
+        return _pool.stats() if _pool is not None else None
+
 
+def shutdown():
+    """Encerra os servidores Java locais do pool."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
 
+
+# ---------------------------------------------------------------
+# API pública
+# ---------------------------------------------------------------
 def corrigir_texto(texto: str) -> str:
     """
     Corrige erros ortográficos e gramaticais de um texto.
@@ -38,41 +392,127 @@ def corrigir_texto(texto: str) -> str:
     str
         Texto corrigido.
     """
-    tool = _get_tool()
-    if not tool:
+    pool = get_pool()
+    if not pool:
         return texto  # Fallback: retorna o texto original sem corrigir
 
-    matches = tool.check(texto)
-    texto_corrigido = language_tool_python.utils.correct(texto, matches)
-    return texto_corrigido
+    blocos = segmentar(texto)
+    if not blocos:
+        return texto
+    correcoes = [c for lista in pool.verificar(blocos) for c in lista]
+    return _aplicar(texto, correcoes)
 
 
-def corrigir_capitulos(chapters: list[dict[str, str]]) -> list[dict[str, str]]:
+def corrigir_capitulos(
+    chapters: list[dict[str, str]],
+    orcamento: Orcamento | None = None,
+) -> list[dict[str, str]]:
     """
     Corrige o texto de todos os capítulos.
 
+    Os blocos de todos os capítulos vão juntos para o pool, na ordem dos
+    capítulos, para que nenhuma instância fique ociosa entre um capítulo e outro.
+
     Parameters
     ----------
     chapters : list[dict]
         Lista de dicts com 'title' e 'content'.
+    orcamento : Orcamento, opcional
+        Prazo do job: com ele em risco, os capítulos restantes seguem sem revisão.
 
     Returns
     -------
     list[dict]
         Mesma lista com 'content' corrigido.
     """
+    pool = get_pool()
+    if not pool:
+        return [ch.copy() for ch in chapters]
+
+    # Pega a chave correta baseada de onde a requisição veio
+    textos = [ch.get("content_md") or ch.get("content", "") for ch in chapters]
+    blocos, donos = [], []
+    for i, texto in enumerate(textos):
+        for bloco in segmentar(texto):
+            blocos.append(bloco)
+            donos.append(i)
+
+    def pular(j: int) -> bool:
+        return orcamento is not None and orcamento.degradar("sem_revisao", donos[j])
+
+    correcoes: list[list] = [[] for _ in chapters]
+    for j, lista in enumerate(pool.verificar(blocos, pular) if blocos else []):
+        correcoes[donos[j]].extend(lista)
+
     resultado = []
-    for ch in chapters:
-        # Pega a chave correta baseada de onde a requisição veio
-        texto = ch.get("content_md") or ch.get("content", "")
-        conteudo_corrigido = corrigir_texto(texto)
-        
+    for ch, texto, lista in zip(chapters, textos, correcoes):
+        conteudo_corrigido = _aplicar(texto, lista)
+
         # Preserva todas as outras chaves do dict
         novo_ch = ch.copy()
         if "content_md" in novo_ch:
             novo_ch["content_md"] = conteudo_corrigido
         if "content" in novo_ch:
             novo_ch["content"] = conteudo_corrigido
-            
+
         resultado.append(novo_ch)
     return resultado
+
+
+# ---------------------------------------------------------------
+# Benchmark  (python -m api.text_corrector)
+# ---------------------------------------------------------------
+_PARAGRAFO_TESTE = (
+    "A inteligencia artificial esta mudando a forma como nós escrevemos livros, "
+    "e cada capitulo precisa ser revisado com cuidado antes de ir para a gráfica. "
+    "Veja o exemplo em [documentação](https://exemplo.com/docs?id=1) e use `pip install pacote` para instalar. "
+    "Os autores **sempre** devem conferir se as concordancias estão corretas, pois os leitor percebe."
+)
+_CODIGO_TESTE = "```python\ndef funcao_exemplo(x):\n    return x * 2  # comentario sem acento\n```"
+
+
+def benchmark(palavras: int = 15000, workers=(1, 2, 4)) -> list[dict]:
+    """Tempo para corrigir um capítulo sintético de ~`palavras` palavras com cada número de workers."""
+    por_paragrafo = len(_PARAGRAFO_TESTE.split())
+    partes = []
+    for i in range(palavras // por_paragrafo):
+        partes.append(_PARAGRAFO_TESTE)
+        if i % 5 == 4:
+            partes += [f"## Seção {i // 5 + 1}", _CODIGO_TESTE]
+    capitulo = "\n\n".join(partes)
+
+    inicio = time.perf_counter()
+    blocos = segmentar(capitulo)
+    segmentacao_ms = (time.perf_counter() - inicio) * 1000
+    prosa = sum(len(b.texto) for b in blocos)
+    print(
+        f"Capítulo: {len(capitulo.split())} palavras, {len(capitulo)} caracteres → "
+        f"{len(blocos)} blocos com {prosa} caracteres de prosa (segmentação: {segmentacao_ms:.1f} ms)"
+    )
+
+    resultados = []
+    base = None
+    for n in workers:
+        pool = PoolLanguageTool(n)
+        if not pool.tamanho:
+            print("LanguageTool indisponível: benchmark interrompido.")
+            break
+        try:
+            pool.verificar(segmentar(_PARAGRAFO_TESTE))  # aquecimento
+            inicio = time.perf_counter()
+            corrigido = _aplicar(capitulo, [c for lista in pool.verificar(blocos) for c in lista])
+            segundos = time.perf_counter() - inicio
+        finally:
+            pool.close()
+        base = base or segundos
+        intocado = corrigido.count(_CODIGO_TESTE) == capitulo.count(_CODIGO_TESTE)
+        resultados.append({"workers": pool.tamanho, "segundos": round(segundos, 2), "speedup": round(base / segundos, 2)})
+        print(
+            f"{pool.tamanho} worker(s): {segundos:.2f}s (speedup {base / segundos:.2f}x) | "
+            f"código preservado: {'sim' if intocado else 'NÃO'}"
+        )
+    return resultados
+
+
+if __name__ == "__main__":
+    benchmark()
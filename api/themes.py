@@ -0,0 +1,147 @@
+"""
+Registro de Temas Visuais
+==========================
+Fonte única dos temas: um JSON por tema em `templates/themes/`, com os
+tokens CSS (`:root`), as fontes e a paleta usada pelas imagens/capas.
+Os arquivos são lidos uma vez por processo.
+
+- `list_themes()`       → nomes canônicos, na ordem de exibição
+- `validate_theme(nome)`→ nome canônico (aceita aliases) ou ValueError
+- `get_theme(nome)`     → registro do tema (tema padrão se desconhecido)
+- `page_css(...)`       → CSS de página + tema, memoizado por
+                          (tema, bleed_mm, colorful_mode, tamanho da página)
+"""
+
+import json
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+
+_THEMES_DIR = Path(__file__).resolve().parent.parent / "templates" / "themes"
+DEFAULT_THEME = "Minimalista Moderno"
+
+
+def _rgb(hex_color: str) -> tuple[int, int, int]:
+    h = hex_color.lstrip("#")
+    return tuple(int(h[i:i + 2], 16) for i in (0, 2, 4))
+
+
+@dataclass(frozen=True)
+class Theme:
+    name: str
+    aliases: tuple[str, ...]
+    fonts: dict
+    tokens: dict
+    palette: dict  # bg: [rgb, rgb], accent: [rgb, rgb], glow: rgb
+
+    def root_css(self) -> str:
+        linhas = [f"--{k}: {v};" for k, v in self.tokens.items()]
+        linhas.append(f"--font-body: {self.fonts['body']};")
+        linhas.append(f"--font-display: {self.fonts['display']};")
+        return ":root {\n    " + "\n    ".join(linhas) + "\n}"
+
+
+_temas: dict[str, Theme] | None = None
+_indice: dict[str, str] = {}
+_lock = threading.Lock()
+
+
+def _carregar() -> dict[str, Theme]:
+    global _temas
+    with _lock:
+        if _temas is not None:
+            return _temas
+        registros = []
+        for arquivo in _THEMES_DIR.glob("*.json"):
+            data = json.loads(arquivo.read_text(encoding="utf-8"))
+            paleta = data["palette"]
+            registros.append((data.get("order", 0), Theme(
+                name=data["name"],
+                aliases=tuple(data.get("aliases", [])),
+                fonts=data["fonts"],
+                tokens=data["tokens"],
+                palette={
+                    "bg": [_rgb(c) for c in paleta["bg"]],
+                    "accent": [_rgb(c) for c in paleta["accent"]],
+                    "glow": _rgb(paleta["glow"]),
+                },
+            )))
+        temas = {t.name: t for _, t in sorted(registros, key=lambda r: r[0])}
+        for tema in temas.values():
+            _indice[tema.name.casefold()] = tema.name
+            for alias in tema.aliases:
+                _indice[alias.casefold()] = tema.name
+        _temas = temas
+        return _temas
+
+
+def _canonico(nome: str) -> str | None:
+    _carregar()
+    nome = (nome or "").strip()
+    # "Tema - variação" e "Tema (Arte: ...)" contam como o tema base
+    for candidato in (nome, nome.split(" - ")[0], nome.split(" (")[0]):
+        canonico = _indice.get(candidato.strip().casefold())
+        if canonico:
+            return canonico
+    return None
+
+
+def list_themes() -> list[str]:
+    return list(_carregar())
+
+
+def validate_theme(nome: str) -> str:
+    """Nome canônico do tema; ValueError com a lista de válidos se não existir."""
+    canonico = _canonico(nome)
+    if canonico is None:
+        raise ValueError(f"Tema desconhecido: '{nome}'. Válidos: {', '.join(list_themes())}")
+    return canonico
+
+
+def get_theme(nome: str) -> Theme:
+    """Registro do tema, caindo no tema padrão se o nome não for reconhecido."""
+    return _carregar()[_canonico(nome) or DEFAULT_THEME]
+
+
+@lru_cache(maxsize=128)
+def page_css(theme: str, bleed_mm: int = 3, colorful_mode: bool = False, page_size: str = "A5") -> str:
+    """CSS adicional do PDF: @page com sangria (KDP), tokens do tema e estilos de imagem."""
+    tema = get_theme(theme)
+    # Só o modo colorido usa a página sem margem com imagem de fundo
+    colorful_css = f"""
+    @page colorful_page {{
+        margin: 0;
+        bleed: {bleed_mm}mm;
+    }}
+    .colorful-mode {{
+        page: colorful_page;
+        min-height: 100vh;
+        background-size: cover;
+        background-position: center;
+        background-repeat: no-repeat;
+        padding: 15mm;
+        box-sizing: border-box;
+    }}
+    .colorful-mode .glass-container {{
+        background-color: rgba(255, 255, 255, 0.92);
+        padding: 30px;
+        border-radius: 12px;
+        min-height: 85vh;
+    }}""" if colorful_mode else ""
+    return f"""
+    @page {{
+        size: {page_size};
+        margin: {bleed_mm}mm;
+        bleed: {bleed_mm}mm;
+    }}{colorful_css}
+    {tema.root_css()}
+    .chapter-img {{
+        width: 100%;
+        max-height: 400px;
+        object-fit: cover;
+        margin-bottom: 20px;
+        border-radius: 8px;
+    }}
+    """
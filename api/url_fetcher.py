@@ -0,0 +1,235 @@
+"""
+url_fetcher Offline para o WeasyPrint
+======================================
+`templates/style.css` importa o Google Fonts e os temas pedem Inter,
+Playfair Display, Roboto Slab, Poppins, Bebas Neue etc. Com o fetcher
+padrão, cada render faz requisições HTTP bloqueantes (e trava sem rede).
+
+Este fetcher:
+  - responde `fonts.googleapis.com/css*` com `templates/fonts/fonts.css`
+    (pacote local com @font-face de todas as famílias dos temas)
+  - responde `fonts.gstatic.com/...` com o arquivo local de mesmo nome
+  - responde `asset://job/nome` com os bytes do asset store do job
+  - recusa qualquer outra URL http(s) (RENDER_ALLOW_NETWORK=1 libera)
+  - guarda o que leu num LRU em memória compartilhado entre renders
+
+O pacote de fontes é baixado uma vez, no build (ver Dockerfile):
+    python -m api.url_fetcher
+"""
+
+import mimetypes
+import os
+import re
+import threading
+import urllib.request
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import urlsplit
+
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+FONTS_DIR = _PROJECT_ROOT / "templates" / "fonts"
+_FONTS_CSS = FONTS_DIR / "fonts.css"
+
+_PERMITIR_REDE = os.getenv("RENDER_ALLOW_NETWORK", "0") == "1"
+_CACHE_MAX_BYTES = int(float(os.getenv("FETCH_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
+# Famílias citadas pelo style.css e pelos temas de generate_pdf → eixos pedidos ao Google Fonts
+FAMILIAS = {
+    "Inter": "wght@300;400;500;600;700",
+    "Playfair Display": "ital,wght@0,400;0,500;0,600;0,700;0,800;1,400;1,500",
+    "Open Sans": "wght@400;600;700",
+    "Poppins": "wght@400;600;700",
+    "Montserrat": "wght@400;600;700",
+    "Roboto": "wght@400;500;700",
+    "Roboto Slab": "wght@400;700",
+    "Lora": "ital,wght@0,400;0,700;1,400",
+    "Bebas Neue": "",
+}
+
+_HOSTS_CSS = ("fonts.googleapis.com",)
+_HOSTS_FONTES = ("fonts.gstatic.com",)
+
+
+# ---------------------------------------------------------------
+# LRU de recursos (processo inteiro)
+# ---------------------------------------------------------------
+class _LRUBytes:
+    """LRU por tamanho total: url → (url final, bytes, content-type)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._itens: "OrderedDict[str, tuple[str, bytes, str]]" = OrderedDict()
+        self._total = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, chave: str):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self._misses += 1
+                return None
+            self._itens.move_to_end(chave)
+            self._hits += 1
+            return item
+
+    def set(self, chave: str, item: tuple[str, bytes, str]):
+        tamanho = len(item[1])
+        if tamanho > self.max_bytes:
+            return
+        with self._lock:
+            antigo = self._itens.pop(chave, None)
+            if antigo is not None:
+                self._total -= len(antigo[1])
+            self._itens[chave] = item
+            self._total += tamanho
+            while self._total > self.max_bytes:
+                _, (_, dados, _) = self._itens.popitem(last=False)
+                self._total -= len(dados)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "itens": len(self._itens),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+_cache = _LRUBytes(_CACHE_MAX_BYTES)
+
+
+def cache_stats() -> dict:
+    return _cache.stats()
+
+
+# ---------------------------------------------------------------
+# Fetcher
+# ---------------------------------------------------------------
+def _tipo(caminho: str) -> str:
+    if caminho.endswith(".css"):
+        return "text/css"
+    return mimetypes.guess_type(caminho)[0] or "application/octet-stream"
+
+
+def _ler_local(caminho: Path) -> tuple[str, bytes, str]:
+    chave = f"{caminho.as_uri()}#{caminho.stat().st_mtime_ns}"
+    item = _cache.get(chave)
+    if item is None:
+        item = (caminho.as_uri(), caminho.read_bytes(), _tipo(caminho.name))
+        _cache.set(chave, item)
+    return item
+
+
+def _resolver_local(url: str) -> Path | None:
+    """Caminho local que substitui uma URL de fonte conhecida, se houver."""
+    partes = urlsplit(url)
+    if partes.hostname in _HOSTS_CSS and partes.path.startswith("/css"):
+        return _FONTS_CSS
+    if partes.hostname in _HOSTS_FONTES:
+        candidato = FONTS_DIR / Path(partes.path).name
+        return candidato if candidato.exists() else None
+    return None
+
+
+def _criar_classe():
+    from weasyprint.urls import URLFetcher, URLFetcherResponse
+
+    class OfflineURLFetcher(URLFetcher):
+        """URLFetcher que nunca vai à rede (a não ser com RENDER_ALLOW_NETWORK=1)."""
+
+        def __init__(self, assets: dict[str, tuple[bytes, str]] | None = None, **kwargs):
+            super().__init__(**kwargs)
+            self._assets = assets or {}
+
+        def fetch(self, url, headers=None):
+            esquema = url.split(":", 1)[0].lower()
+            if esquema == "asset":
+                item = self._assets.get(url)
+                if item is None:
+                    raise ValueError(f"Asset não enviado com o job de render: {url}")
+                return self._responder(url, *item)
+            if esquema in ("http", "https"):
+                local = _resolver_local(url)
+                if local is not None:
+                    if not local.exists():
+                        # Pacote não baixado: cai nas fontes de sistema da pilha do tema
+                        return URLFetcherResponse(url, b"", {"Content-Type": "text/css"})
+                    return self._responder(*_ler_local(local))
+                if not _PERMITIR_REDE:
+                    raise ValueError(f"Render offline: acesso à rede bloqueado ({url})")
+            elif esquema == "file":
+                return self._responder(*_ler_local(Path(urllib.request.url2pathname(urlsplit(url).path))))
+
+            item = _cache.get(url)
+            if item is None:
+                resposta = super().fetch(url, headers)
+                try:
+                    item = (resposta.url, resposta.read(), resposta.content_type)
+                finally:
+                    resposta.close()
+                _cache.set(url, item)
+            return self._responder(*item)
+
+        @staticmethod
+        def _responder(url_final: str, dados: bytes, content_type: str):
+            return URLFetcherResponse(url_final, dados, {"Content-Type": content_type})
+
+    return OfflineURLFetcher
+
+
+_classe = None
+_classe_lock = threading.Lock()
+
+
+def novo_url_fetcher(assets: dict[str, tuple[bytes, str]] | None = None):
+    """
+    Instância nova do fetcher offline (barata; o cache é compartilhado entre instâncias).
+    `assets` mapeia `asset://...` → (bytes, mime) para as imagens do job.
+    """
+    global _classe
+    with _classe_lock:
+        if _classe is None:
+            _classe = _criar_classe()
+    return _classe(assets=assets)
+
+
+# ---------------------------------------------------------------
+# Download do pacote de fontes (build)
+# ---------------------------------------------------------------
+def baixar_fontes(destino: Path = FONTS_DIR) -> Path:
+    """Baixa as famílias de FAMILIAS e escreve `fonts.css` apontando para os arquivos locais."""
+    destino.mkdir(parents=True, exist_ok=True)
+    familias = "&".join(
+        "family=" + nome.replace(" ", "+") + (f":{eixos}" if eixos else "")
+        for nome, eixos in FAMILIAS.items()
+    )
+    # User-Agent genérico: o Google responde com TrueType em vez de woff2
+    pedido = urllib.request.Request(
+        f"https://fonts.googleapis.com/css2?{familias}&display=swap",
+        headers={"User-Agent": "Mozilla/5.0"},
+    )
+    with urllib.request.urlopen(pedido, timeout=30) as resposta:
+        css = resposta.read().decode("utf-8")
+
+    def _baixar(match: re.Match) -> str:
+        url = match.group(1)
+        nome = Path(urlsplit(url).path).name
+        arquivo = destino / nome
+        if not arquivo.exists():
+            with urllib.request.urlopen(url, timeout=30) as r:
+                arquivo.write_bytes(r.read())
+        return f"url({nome})"
+
+    css = re.sub(r"url\((https://fonts\.gstatic\.com/[^)]+)\)", _baixar, css)
+    (destino / "fonts.css").write_text(css, encoding="utf-8")
+    return destino / "fonts.css"
+
+
+if __name__ == "__main__":
+    caminho = baixar_fontes()
+    print(f"Pacote de fontes salvo em {caminho.parent}")
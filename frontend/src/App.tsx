@@ -33,7 +33,7 @@ function App() {
 
   const [libraryItems, setLibraryItems] = useState<any[]>([]);
   const [activeJob, setActiveJob] = useState<string | null>(null);
-  const [jobStatus, setJobStatus] = useState<{ message: string; progress: number; status: string }>({ message: '', progress: 0, status: '' });
+  const [jobStatus, setJobStatus] = useState<{ message: string; progress: number; status: string; draftUrl?: string }>({ message: '', progress: 0, status: '' });
 
   const chatEndRef = useRef<HTMLDivElement>(null);
 
@@ -120,7 +120,8 @@ function App() {
           const res = await fetch(`${API_BASE_URL}/api/status/${activeJob}`);
           if (res.ok) {
             const data = await res.json();
-            setJobStatus({ message: data.message, progress: data.progress, status: data.status });
+            const draftUrl = data.draft_pdf_url ? (data.draft_pdf_url.startsWith('/') ? `${API_BASE_URL}${data.draft_pdf_url}` : data.draft_pdf_url) : undefined;
+            setJobStatus({ message: data.message, progress: data.progress, status: data.status, draftUrl });
             console.log("Status: ", data);
             if (data.status === 'complete' || data.status === 'error') {
               clearInterval(interval);
@@ -418,6 +419,11 @@ function App() {
                       <div className="h-full bg-gradient-to-r from-fuchsia-500 to-orange-500 transition-all duration-1000 ease-out" style={{ width: `${jobStatus.progress}%` }}></div>
                     </div>
                     <div className="text-right mt-1 font-mono text-xs text-gray-500">{jobStatus.progress}%</div>
+
+                    {/* Rascunho legível enquanto as ilustrações finais chegam */}
+                    {jobStatus.draftUrl && (
+                      <a href={jobStatus.draftUrl} target="_blank" rel="noopener noreferrer" className="inline-block mt-3 px-3 py-1.5 rounded-lg bg-white/10 hover:bg-white/20 text-xs font-bold text-fuchsia-300">Ler rascunho (PDF)</a>
+                    )}
                   </div>
                 </div>
               )}
@@ -1,18 +1,27 @@
+import asyncio
 import json
+import mimetypes
 import os
 import uuid
 import time
 from pathlib import Path
 
 from fastapi import FastAPI, UploadFile, File, Form, BackgroundTasks, HTTPException
+from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
+from api import renditions
+from api.asset_store import AssetStore
 from api.chat_handler import processar_mensagem
-from api.content_generator import gerar_conteudo_capitulo
-from api.text_corrector import corrigir_capitulos
-from api.image_generator import generate_all_images
+from api.content_generator import gerar_capitulos_em_paralelo
+from api.deadline import Orcamento, novo_orcamento
+from api.text_corrector import corrigir_texto
+from api.image_generator import (
+    IMAGE_CONCURRENCY, generate_chapter_image_async, generate_placeholder_image, novo_cliente_http,
+    should_generate_image,
+)
 from api.pdf_engine import generate_pdf
 from api.epub_engine import create_epub, inject_qr_codes
 from supabase import create_client, Client
@@ -43,6 +52,14 @@ _OUTPUT_DIR = _PROJECT_ROOT / "output"
 _ASSETS_DIR.mkdir(parents=True, exist_ok=True)
 _OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# Capítulos são escritos em paralelo (ver CHAPTER_CONCURRENCY), então o teto é só de segurança
+MAX_CHAPTERS = int(os.getenv("MAX_CHAPTERS", "30"))
+IMAGE_FREQUENCY = "Apenas Imagem de Capa e Hero"
+# Rascunho com placeholders assim que o texto fica pronto (DRAFT_PDF=0 desliga)
+DRAFT_PDF = os.getenv("DRAFT_PDF", "1") == "1"
+# Versões publicadas de cada job: tipo → arquivo em output/
+_ARTEFATOS = {"draft": "{job_id}_draft.pdf", "final": "{job_id}.pdf"}
+
 class GenerateRequest(BaseModel):
     niche: str
     artStyle: str
@@ -50,10 +67,77 @@ class GenerateRequest(BaseModel):
     pageLayout: str
     writingTone: str
     prompt: str
+    useCache: bool = True  # False força nova geração em vez de reaproveitar o cache de LLM
+    pdfProfile: str | None = None  # screen / ebook / print (padrão: PDF_PROFILE)
+    deadlineS: float | None = Field(default=None, gt=0)  # prazo do job em segundos (padrão: JOB_DEADLINE_S)
 
 jobs = {}
+# Prazo dos jobs em andamento (o relatório ao vivo entra no /api/status)
+orcamentos: dict[str, Orcamento] = {}
+
+
+def _atualizar(job_id: str, status: str, progress: int, message: str, **extra):
+    """Troca o estado do job preservando as versões publicadas e o roteamento das imagens."""
+    anterior = jobs.get(job_id, {})
+    jobs[job_id] = {
+        "status": status,
+        "progress": progress,
+        "message": message,
+        "artifacts": anterior.get("artifacts", []),
+        "image_routes": anterior.get("image_routes", {}),
+        **extra,
+    }
+
+
+def _publicar_artefato(job_id: str, tipo: str, caminho: str, inicio: float) -> str:
+    """Sobe a versão do PDF (Supabase, ou rota local) e registra no status do job."""
+    url = f"/api/artifacts/{job_id}/{tipo}"
+    if supabase:
+        nome = os.path.basename(caminho)
+        supabase.storage.from_("ebooks").upload(
+            path=nome,
+            file=os.path.abspath(caminho),
+            file_options={"content-type": "application/pdf", "upsert": "true"}
+        )
+        url = supabase.storage.from_("ebooks").get_public_url(nome)
+    artefatos = jobs[job_id].setdefault("artifacts", [])
+    artefatos.append({
+        "version": len(artefatos) + 1,
+        "kind": tipo,
+        "pdf_url": url,
+        "seconds": round(time.monotonic() - inicio, 1),
+    })
+    return url
+
+
+def _publicar_miniatura(job_id: str, store: AssetStore, capa: str | None) -> str | None:
+    """Miniatura web da capa (rendition "thumb") para a biblioteca: Supabase ou rota local."""
+    item = store.get(renditions.rendition(store, capa, "thumb")) if capa else None
+    if item is None:
+        return None
+    dados, mime = item
+    caminho = _OUTPUT_DIR / f"{job_id}_thumb{mimetypes.guess_extension(mime) or ''}"
+    caminho.write_bytes(dados)
+    if supabase:
+        supabase.storage.from_("ebooks").upload(
+            path=caminho.name,
+            file=str(caminho),
+            file_options={"content-type": mime, "upsert": "true"}
+        )
+        return supabase.storage.from_("ebooks").get_public_url(caminho.name)
+    return f"/api/thumbnails/{job_id}"
+
+
+def _imagem_pronta(tarefa: asyncio.Task) -> bool:
+    return tarefa.done() and not tarefa.cancelled() and tarefa.exception() is None
+
 
 def process_book_task(job_id: str, req: GenerateRequest):
+    # Imagens do job ficam em memória até o PDF sair (asset://), sem passar pelo disco
+    store = AssetStore(job_id, _ASSETS_DIR / job_id)
+    inicio = time.monotonic()
+    # Perto do prazo: modelo mais rápido, revisão pulada, menos imagens, arte Pillow
+    orcamento = orcamentos[job_id] = novo_orcamento(req.deadlineS)
     try:
         jobs[job_id] = {"status": "writing", "progress": 5, "message": "Iniciando Roteirização por IA..."}
         
@@ -81,7 +165,8 @@ def process_book_task(job_id: str, req: GenerateRequest):
             theme=tema_completo,
             style=req.writingTone,
             audience=req.niche,
-            language="Português"
+            language="Português",
+            usar_cache=req.useCache,
         )
         
         ebook_data = process_dict.get("ebook_data")
@@ -89,65 +174,150 @@ def process_book_task(job_id: str, req: GenerateRequest):
             raise Exception("A IA falhou em retornar o JSON com os Capítulos.")
             
         titulo_livro = ebook_data.get("title", "Obra de Arte Digital")
-        capitulos_lista = ebook_data.get("chapters", [])[:6] # Cap_limit to 6 for speed
+        capitulos_lista = ebook_data.get("chapters", [])[:MAX_CHAPTERS]
         total_cap = len(capitulos_lista)
         
         if total_cap == 0:
              raise Exception("A IA não listou Capítulos para esta história.")
 
-        raw_capitulos = []
-        for idx, ch in enumerate(capitulos_lista):
-            jobs[job_id]["message"] = f"Escrevendo Capítulo {idx+1}/{total_cap}..."
-            jobs[job_id]["progress"] = 10 + int((idx / total_cap) * 30)
-            
-            content_md = gerar_conteudo_capitulo(
-                titulo_livro=titulo_livro,
-                titulo_capitulo=ch["title"],
-                numero_capitulo=idx + 1,
-                total_capitulos=total_cap,
-                paginas=ch.get("pages", 3),
-                tema_historia=tema_completo,
-                ideia_principal=req.prompt,
-                idioma="Português",
-                publico_alvo=req.niche,
-                estilo_escrita=req.writingTone,
+        jobs[job_id]["message"] = f"Escrevendo {total_cap} Capítulos em paralelo..."
+        jobs[job_id]["progress"] = 10
+        def _capitulo_pronto(idx: int, concluidos: int):
+            jobs[job_id]["message"] = f"Capítulo {idx+1} pronto ({concluidos}/{total_cap})..."
+            jobs[job_id]["progress"] = 10 + int((concluidos / total_cap) * 30)
+
+        # Capítulo → decisão do roteador de imagens (ordem, pulados, tentativas, provedor final)
+        rotas_imagens = jobs[job_id].setdefault("image_routes", {})
+        output_pdf_path = str(_OUTPUT_DIR / _ARTEFATOS["final"].format(job_id=job_id))
+
+        def _rascunho(raw_capitulos: list[dict], prontas: dict[int, str | None], ilustrados) -> str:
+            """PDF de rascunho (bloqueante): imagens já prontas e placeholders no lugar das que faltam."""
+            imagens_rascunho = [
+                (prontas[i] if i in prontas else generate_placeholder_image(
+                    chapter_title=capitulos_lista[i]["title"],
+                    chapter_index=i,
+                    theme=tema_completo,
+                    colorful_mode=colorful_mode,
+                    store=store,
+                )) if i in ilustrados else None
+                for i in range(total_cap)
+            ]
+            draft_path = generate_pdf(
+                title=titulo_livro,
+                author="BookBot Platform",
+                theme=theme,
+                chapters=raw_capitulos,
+                image_paths=imagens_rascunho,
+                output_path=str(_OUTPUT_DIR / _ARTEFATOS["draft"].format(job_id=job_id)),
+                bleed_mm=bleed,
+                colorful_mode=colorful_mode,
+                assets=store,
+                profile="screen",
             )
-            raw_capitulos.append({
-                "title": ch["title"],
-                "content": content_md,
-                "content_md": content_md
-            })
-            
-        raw_capitulos = corrigir_capitulos(raw_capitulos)
-        
-        # 2. Markdown to HTML
-        jobs[job_id] = {"status": "html", "progress": 45, "message": "Renderizando códigos visuais..."}
-        import markdown
-        job_assets_dir = str(_ASSETS_DIR / job_id)
-        Path(job_assets_dir).mkdir(parents=True, exist_ok=True)
-        output_pdf_path = str(_OUTPUT_DIR / f"{job_id}.pdf")
-        
-        chapters_data = []
-        for i, ch in enumerate(raw_capitulos):
-            content_html = markdown.markdown(ch.get("content", ch.get("content_md", "")))
-            chapters_data.append({
-                "title": ch.get("title", ""),
-                "content": ch.get("content", ""),
-                "content_html": content_html,
-            })
-            
-        # 3. Imagens
-        jobs[job_id] = {"status": "images", "progress": 55, "message": "Estúdio de Imagens Operando..."}
-        image_paths = generate_all_images(
-            chapters=chapters_data,
-            theme=tema_completo,
-            assets_dir=job_assets_dir,
-            colorful_mode=colorful_mode,
-            frequency="Apenas Imagem de Capa e Hero"
-        )
+            return _publicar_artefato(job_id, "draft", draft_path, inicio)
+
+        async def _escrever_e_ilustrar():
+            """
+            Escrita, rascunho e imagens num único event loop: as imagens de todos os
+            capítulos dividem um cliente HTTP (pool de conexões) e o teto IMAGE_CONCURRENCY.
+            """
+            semaforo = asyncio.Semaphore(IMAGE_CONCURRENCY)
+            imagens: dict[int, asyncio.Task] = {}
+
+            async with novo_cliente_http() as client:
+                async def _imagem(idx: int, trecho: str) -> str | None:
+                    async with semaforo:
+                        # Reavaliada quando o capítulo ganha vaga: o prazo pode ter apertado na fila
+                        if not should_generate_image(idx, IMAGE_FREQUENCY, orcamento):
+                            return None
+                        return await generate_chapter_image_async(
+                            client,
+                            chapter_title=capitulos_lista[idx]["title"],
+                            chapter_index=idx,
+                            content_snippet=trecho,
+                            theme=tema_completo,
+                            colorful_mode=colorful_mode,
+                            store=store,
+                            usar_cache=req.useCache,
+                            rota_saida=rotas_imagens.setdefault(idx, {}),
+                            orcamento=orcamento,
+                        )
+
+                # Streaming: a imagem de cada capítulo começa assim que os primeiros 700
+                # caracteres chegam, e cada parágrafo é revisado assim que fecha.
+                def _trecho_inicial(idx: int, trecho: str):
+                    if should_generate_image(idx, IMAGE_FREQUENCY, orcamento):
+                        imagens[idx] = asyncio.create_task(_imagem(idx, trecho))
+
+                try:
+                    conteudos = await gerar_capitulos_em_paralelo(
+                        titulo_livro=titulo_livro,
+                        capitulos=capitulos_lista,
+                        # Só o nicho entra no prompt: o tema visual não muda o texto, e assim
+                        # regerar o livro com outra capa reaproveita os capítulos do cache
+                        tema_historia=req.niche,
+                        ideia_principal=req.prompt,
+                        idioma="Português",
+                        publico_alvo=req.niche,
+                        estilo_escrita=req.writingTone,
+                        ao_concluir=_capitulo_pronto,
+                        usar_cache=req.useCache,
+                        corretor=corrigir_texto,
+                        ao_trecho_inicial=_trecho_inicial,
+                        orcamento=orcamento,
+                    )
+                    raw_capitulos = [
+                        {"title": ch["title"], "content": content_md, "content_md": content_md}
+                        for ch, content_md in zip(capitulos_lista, conteudos)
+                    ]
+
+                    # 2. Markdown to HTML
+                    _atualizar(job_id, "html", 45, "Renderizando códigos visuais...")
+                    import markdown
+
+                    chapters_data = []
+                    for i, ch in enumerate(raw_capitulos):
+                        content_html = markdown.markdown(ch.get("content", ch.get("content_md", "")))
+                        chapters_data.append({
+                            "title": ch.get("title", ""),
+                            "content": ch.get("content", ""),
+                            "content_html": content_html,
+                        })
+
+                    # 3. Rascunho: o texto já está pronto; as imagens que ainda não chegaram
+                    # entram como placeholders Pillow e o livro fica legível bem antes do final.
+                    # O render roda numa thread para o loop seguir buscando as imagens.
+                    prontas = {i: t.result() for i, t in imagens.items() if _imagem_pronta(t)}
+                    if DRAFT_PDF and len(prontas) < len(imagens):
+                        _atualizar(job_id, "draft", 48, "Montando o rascunho do livro...")
+                        draft_url = await asyncio.to_thread(_rascunho, raw_capitulos, prontas, set(imagens))
+                        print(f"[Job {job_id}] Rascunho publicado em {time.monotonic() - inicio:.1f}s")
+                    else:
+                        draft_url = None
+
+                    # 4. Imagens (já disparadas durante a escrita; aqui só aguardamos as que faltam)
+                    _atualizar(
+                        job_id, "images", 55,
+                        "Rascunho pronto! Finalizando as ilustrações..." if draft_url else "Estúdio de Imagens Operando...",
+                        draft_pdf_url=draft_url,
+                    )
+                    image_paths = [await imagens[i] if i in imagens else None for i in range(total_cap)]
+                finally:
+                    # Job falhou no meio: nenhuma imagem segue em voo depois que o cliente fecha
+                    for tarefa in imagens.values():
+                        tarefa.cancel()
+                    await asyncio.gather(*imagens.values(), return_exceptions=True)
+
+            return raw_capitulos, draft_url, image_paths
+
+        raw_capitulos, draft_url, image_paths = asyncio.run(_escrever_e_ilustrar())
+
+        # Um decode por imagem: versão do perfil do PDF para todas e miniatura web da capa
+        renditions.preparar_livro(store, image_paths, req.pdfProfile, ("thumb",))
+        capa = next((ref for ref in image_paths if ref), None)
         
-        # 4. Weasyprint PDF
-        jobs[job_id] = {"status": "weasyprint", "progress": 80, "message": "Compilando Matriz PDF de Alta Qualidade..."}
+        # 5. Weasyprint PDF final (segunda versão quando houve rascunho)
+        _atualizar(job_id, "weasyprint", 80, "Compilando Matriz PDF de Alta Qualidade...", draft_pdf_url=draft_url)
         pdf_path = generate_pdf(
             title=titulo_livro,
             author="BookBot Platform",
@@ -156,43 +326,42 @@ def process_book_task(job_id: str, req: GenerateRequest):
             image_paths=image_paths,
             output_path=output_pdf_path,
             bleed_mm=bleed,
-            colorful_mode=colorful_mode
+            colorful_mode=colorful_mode,
+            assets=store,
+            profile=req.pdfProfile,
         )
         
-        # 5. Cloud Sync Supabase
-        jobs[job_id] = {"status": "sync", "progress": 95, "message": "Sincronizando com a Nuvem..."}
-        pdf_public_url = ""
+        # 6. Cloud Sync Supabase
+        _atualizar(job_id, "sync", 95, "Sincronizando com a Nuvem...", draft_pdf_url=draft_url)
+        pdf_public_url = _publicar_artefato(job_id, "final", pdf_path, inicio)
+        thumbnail_url = _publicar_miniatura(job_id, store, capa)
         if supabase:
-            file_name_in_bucket = f"{job_id}.pdf"
-            supabase.storage.from_("ebooks").upload(
-                path=file_name_in_bucket,
-                file=os.path.abspath(output_pdf_path),
-                file_options={"content-type": "application/pdf"}
-            )
-            pdf_public_url = supabase.storage.from_("ebooks").get_public_url(file_name_in_bucket)
-            
             # Update Database
             supabase.table("generations").update({
                 "status": "finished",
                 "pdf_url": pdf_public_url
             }).eq("id", job_id).execute()
         
-        jobs[job_id] = {
-            "status": "complete", 
-            "progress": 100, 
-            "message": "E-book Finalizado!",
-            "result": {
+        _atualizar(
+            job_id, "complete", 100, "E-book Finalizado!",
+            draft_pdf_url=draft_url,
+            result={
                 "title": titulo_livro,
-                "pdf_url": pdf_public_url
-            }
-        }
+                "pdf_url": pdf_public_url,
+                "thumbnail_url": thumbnail_url,
+                "budget": orcamento.relatorio() if orcamento.ativo else None,
+            },
+        )
         
     except Exception as e:
-        jobs[job_id] = {"status": "error", "message": str(e), "progress": 0}
+        _atualizar(job_id, "error", 0, str(e))
         if supabase:
              supabase.table("generations").update({
                 "status": "error"
              }).eq("id", job_id).execute()
+    finally:
+        store.release()
+        orcamentos.pop(job_id, None)
 
 @app.post("/api/generate")
 async def generate_ebook(req: GenerateRequest, background_tasks: BackgroundTasks):
@@ -222,7 +391,29 @@ async def generate_ebook(req: GenerateRequest, background_tasks: BackgroundTasks
 @app.get("/api/status/{job_id}")
 async def get_status(job_id: str):
     # Retrieve real-time metrics mapped to front-end loader
-    return jobs.get(job_id, {"status": "unknown", "message": "Buscando Status...", "progress": 0})
+    status = jobs.get(job_id, {"status": "unknown", "message": "Buscando Status...", "progress": 0})
+    orcamento = orcamentos.get(job_id)
+    if orcamento is not None and orcamento.ativo:
+        status = {**status, "budget": orcamento.relatorio()}
+    return status
+
+@app.get("/api/artifacts/{job_id}/{kind}")
+async def get_artifact(job_id: str, kind: str):
+    """Versão publicada do PDF do job (draft ou final), servida localmente."""
+    if job_id not in jobs or kind not in _ARTEFATOS:
+        raise HTTPException(status_code=404, detail="Artefato não encontrado.")
+    caminho = _OUTPUT_DIR / _ARTEFATOS[kind].format(job_id=job_id)
+    if not caminho.exists():
+        raise HTTPException(status_code=404, detail="Artefato ainda não publicado.")
+    return FileResponse(str(caminho), media_type="application/pdf", filename=caminho.name)
+
+@app.get("/api/thumbnails/{job_id}")
+async def get_thumbnail(job_id: str):
+    """Miniatura web da capa do job, servida localmente."""
+    miniaturas = sorted(_OUTPUT_DIR.glob(f"{job_id}_thumb.*")) if job_id in jobs else []
+    if not miniaturas:
+        raise HTTPException(status_code=404, detail="Miniatura não encontrada.")
+    return FileResponse(str(miniaturas[0]))
 
 @app.get("/api/library")
 async def get_library():
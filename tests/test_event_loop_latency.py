@@ -0,0 +1,130 @@
+"""
+Regressão: o event loop não pode travar durante renders
+========================================================
+Com o LLM simulado por um `sleep` e o render (PDF) por uma queima de CPU,
+dispara vários /generate-ebook em paralelo e mede /health e /chat ao mesmo
+tempo. Se algum estágio bloqueante voltar a rodar no event loop, o p99 dos
+dois sobe para a duração de um render e o teste falha.
+
+    python -m pytest tests/
+"""
+
+import asyncio
+import statistics
+import time
+
+import pytest
+
+try:
+    import httpx
+
+    from api import main
+except (ImportError, OSError) as e:  # WeasyPrint precisa do Pango; LanguageTool do pacote
+    pytest.skip(f"API indisponível neste ambiente: {e}", allow_module_level=True)
+
+
+_LLM_S = 0.05
+_RENDER_S = 0.6
+_RENDERS = 4
+_AMOSTRAS = 40
+# Folga sobre o p99 em repouso: bem abaixo da duração de um render
+_FOLGA_S = 0.2
+
+
+def _llm_lento(**kwargs) -> dict:
+    time.sleep(_LLM_S)
+    return {"response": "ok", "ebook_data": None, "session_id": kwargs.get("session_id") or "teste"}
+
+
+def _queimar_cpu(segundos: float):
+    # Laço em Python puro: segura o GIL como o layout do WeasyPrint
+    fim = time.perf_counter() + segundos
+    total = 0
+    while time.perf_counter() < fim:
+        for i in range(1000):
+            total += i * i
+    return total
+
+
+def _pdf_lento(output_path: str, **kwargs) -> str:
+    _queimar_cpu(_RENDER_S)
+    with open(output_path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+    return output_path
+
+
+def _epub_rapido(output_path: str, **kwargs) -> str:
+    with open(output_path, "wb") as f:
+        f.write(b"PK")
+    return output_path
+
+
+async def _sem_imagens(chapters, **kwargs) -> list:
+    return [None] * len(chapters)
+
+
+@pytest.fixture
+def api_simulada(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "processar_mensagem_sessao", _llm_lento)
+    monkeypatch.setattr(main, "corrigir_texto", lambda texto: texto)
+    monkeypatch.setattr(main, "inject_qr_codes", lambda html, *a, **k: html)
+    monkeypatch.setattr(main, "generate_all_images_async", _sem_imagens)
+    monkeypatch.setattr(main, "generate_pdf", _pdf_lento)
+    monkeypatch.setattr(main, "create_epub", _epub_rapido)
+    monkeypatch.setattr(main, "_OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(main, "_ASSETS_DIR", tmp_path / "assets")
+    return main.app
+
+
+def _p99(latencias: list[float]) -> float:
+    return statistics.quantiles(latencias, n=100)[98]
+
+
+async def _medir(client: httpx.AsyncClient, n: int = 0, ate: asyncio.Future | None = None) -> dict[str, list[float]]:
+    """Latências de /health e /chat: `n` rodadas ou, com `ate`, até o futuro terminar."""
+    latencias = {"health": [], "chat": []}
+
+    async def uma(nome: str, requisicao):
+        inicio = time.perf_counter()
+        resposta = await requisicao
+        assert resposta.status_code == 200, resposta.text
+        latencias[nome].append(time.perf_counter() - inicio)
+
+    rodadas = 0
+    while (not ate.done()) if ate is not None else rodadas < n:
+        rodadas += 1
+        await asyncio.gather(
+            uma("health", client.get("/health")),
+            uma("chat", client.post("/chat", json={"message": "Oi"})),
+        )
+        await asyncio.sleep(0.01)
+    return latencias
+
+
+def test_health_e_chat_nao_travam_durante_renders(api_simulada):
+    livro = {
+        "title": "Livro de Teste",
+        "author": "Autor",
+        "chapters": [{"title": "Capítulo 1", "content": "Texto do capítulo."}],
+    }
+
+    async def cenario():
+        transporte = httpx.ASGITransport(app=api_simulada)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://teste", timeout=30) as client:
+            repouso = await _medir(client, _AMOSTRAS)
+
+            # Mede do disparo ao fim dos renders: um estágio bloqueante no loop cai dentro da janela
+            renders = asyncio.gather(*(client.post("/generate-ebook", json=livro) for _ in range(_RENDERS)))
+            carga = await _medir(client, ate=renders)
+            return repouso, carga, await renders
+
+    repouso, carga, respostas = asyncio.run(cenario())
+
+    assert all(r.status_code == 200 for r in respostas), [r.text for r in respostas]
+    # Com o loop travado quase nada é medido durante os renders; o p99 já denuncia
+    assert len(carga["health"]) >= 2, "nenhuma medição durante os renders"
+    for nome in ("health", "chat"):
+        p99_repouso, p99_carga = _p99(repouso[nome]), _p99(carga[nome])
+        assert p99_carga < p99_repouso + _FOLGA_S, (
+            f"/{nome}: p99 {p99_carga * 1000:.0f} ms com renders vs {p99_repouso * 1000:.0f} ms em repouso"
+        )
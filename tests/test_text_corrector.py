@@ -0,0 +1,90 @@
+"""
+Segmentação do Markdown e mapa de correções do corretor
+========================================================
+Sem Java: os `Match` do LanguageTool são simulados, com offsets em unidades
+UTF-16 como o servidor devolve. Cobre o que não pode ser corrigido (código,
+destinos de links), emojis antes do erro e correções sobrepostas.
+
+    python -m pytest tests/
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+text_corrector = pytest.importorskip("api.text_corrector")
+
+
+def _utf16(texto: str) -> int:
+    return len(texto.encode("utf-16-le")) // 2
+
+
+def _matches(bloco, erros: dict[str, str]) -> list:
+    """Um Match falso para cada ocorrência de cada erro no texto do bloco."""
+    matches = []
+    for errado, certo in erros.items():
+        pos = bloco.texto.find(errado)
+        while pos != -1:
+            matches.append(SimpleNamespace(
+                offset=_utf16(bloco.texto[:pos]),
+                errorLength=_utf16(errado),
+                replacements=[certo],
+            ))
+            pos = bloco.texto.find(errado, pos + 1)
+    return matches
+
+
+def _corrigir(texto: str, erros: dict[str, str]) -> str:
+    correcoes = []
+    for bloco in text_corrector.segmentar(texto):
+        correcoes += text_corrector._correcoes(bloco, _matches(bloco, erros))
+    return text_corrector._aplicar(texto, correcoes)
+
+
+def test_bloco_de_codigo_cercado_fica_de_fora():
+    texto = "Um errro aqui.\n\n```python\nerrro = 1\n```\n\nOutro errro."
+
+    assert all("errro = 1" not in b.texto for b in text_corrector.segmentar(texto))
+    assert _corrigir(texto, {"errro": "erro"}) == "Um erro aqui.\n\n```python\nerrro = 1\n```\n\nOutro erro."
+
+
+def test_codigo_inline_fica_de_fora():
+    texto = "Use `errro` com cuidado, sem errro."
+
+    (bloco,) = text_corrector.segmentar(texto)
+    assert "`" not in bloco.texto
+    assert _corrigir(texto, {"errro": "erro"}) == "Use `errro` com cuidado, sem erro."
+
+
+def test_destino_de_link_fica_de_fora():
+    texto = "Veja [o errro](https://exemplo.com/errro) e ![errro](img/errro.png)."
+
+    assert _corrigir(texto, {"errro": "erro"}) == "Veja [o erro](https://exemplo.com/errro) e ![errro](img/errro.png)."
+
+
+def test_offsets_utf16_depois_de_emoji():
+    texto = "Um 😀 dia com errro.\n\nMais 🚀🚀 um errro."
+
+    assert _corrigir(texto, {"errro": "erro"}) == "Um 😀 dia com erro.\n\nMais 🚀🚀 um erro."
+
+
+def test_match_que_atravessa_trecho_removido_e_descartado():
+    (bloco,) = text_corrector.segmentar("antes `x` depois")
+    inicio = bloco.texto.index("antes")
+
+    assert bloco.para_original(inicio, len(bloco.texto) - inicio) is None
+    assert bloco.para_original(inicio, len("antes")) == (0, len("antes"))
+
+
+def test_match_sem_sugestao_e_ignorado():
+    (bloco,) = text_corrector.segmentar("Um errro.")
+    match = SimpleNamespace(offset=bloco.texto.index("errro"), errorLength=5, replacements=[])
+
+    assert text_corrector._correcoes(bloco, [match]) == []
+
+
+def test_correcoes_sobrepostas_mantem_so_uma():
+    texto = "abcdef"
+
+    assert text_corrector._aplicar(texto, [(0, 3, "X"), (2, 5, "Y")]) == "abYf"
+    assert text_corrector._aplicar(texto, [(4, 6, "Z"), (0, 2, "W")]) == "WcdZ"